@@ -0,0 +1,191 @@
+import os
+import time
+import json
+import logging
+import threading
+import utils
+
+logger = logging.getLogger("milvus_benchmark.build_monitor")
+
+DEFAULT_SAMPLE_INTERVAL = 5
+DEFAULT_BASELINE_TIME = 30
+DEFAULT_SEARCH_THREADS = 1
+# wait(s) after a failed search, doubled while the searches keep failing
+ERROR_BACKOFF = 0.1
+MAX_ERROR_BACKOFF = 2
+
+
+def get_cpu_rate_probe(cpu_time_probe):
+    """
+    Turn a probe of the cpu time(s) used so far into a probe of the cores used since the last call
+    """
+    last = {"time": time.time(), "cpu_time": cpu_time_probe()}
+
+    def probe():
+        now, cpu_time = time.time(), cpu_time_probe()
+        cores = (cpu_time - last["cpu_time"]) / (now - last["time"]) if now > last["time"] else 0.0
+        last["time"], last["cpu_time"] = now, cpu_time
+        return round(cores, 2)
+
+    return probe
+
+
+class BuildMonitor(object):
+    """
+    Follow an async index build: sample the index progress and server cpu on a fixed interval,
+    while searching in background threads, so that each point of the timeline has the build
+    progress, the server activity and the search latency at that time
+    """
+    def __init__(self, progress_probe, cpu_probe, search, interval=DEFAULT_SAMPLE_INTERVAL,
+                 search_threads=DEFAULT_SEARCH_THREADS):
+        # progress_probe: callable returning {"indexed_rows", "rows", "indexed_segments", "segments"}
+        # cpu_probe: callable returning the cpu cores used by the server
+        # search: callable sending one search
+        self._progress_probe = progress_probe
+        self._cpu_probe = cpu_probe
+        self._search = search
+        self._interval = interval
+        self._search_threads = search_threads
+        self._latencies = []
+        self._errors = 0
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._threads = []
+        self._start_time = None
+        self.baseline = None
+        self.build_time = None
+        self.build_error = None
+        self.series = []
+
+    def _search_loop(self):
+        backoff = ERROR_BACKOFF
+        while not self._stop_event.is_set():
+            start_time = time.perf_counter()
+            try:
+                self._search()
+            except Exception as e:
+                logger.debug(str(e))
+                with self._lock:
+                    self._errors += 1
+                # the server may reject searches during the build, do not spin on it
+                self._stop_event.wait(backoff)
+                backoff = min(backoff * 2, MAX_ERROR_BACKOFF)
+                continue
+            backoff = ERROR_BACKOFF
+            with self._lock:
+                self._latencies.append(time.perf_counter() - start_time)
+
+    def _start_search(self):
+        self._stop_event.clear()
+        self._threads = [threading.Thread(target=self._search_loop, daemon=True) for _ in range(self._search_threads)]
+        for t in self._threads:
+            t.start()
+
+    def _stop_search(self):
+        self._stop_event.set()
+        for t in self._threads:
+            t.join()
+        self._threads = []
+
+    def _pop_latencies(self):
+        with self._lock:
+            latencies, errors = self._latencies, self._errors
+            self._latencies, self._errors = [], 0
+        stats = utils.get_latency_stats(latencies)
+        stats["errors"] = errors
+        return stats
+
+    def measure_baseline(self, during_time=DEFAULT_BASELINE_TIME):
+        """
+        Search latency before the build starts
+        """
+        self._start_search()
+        time.sleep(during_time)
+        self._stop_search()
+        self.baseline = self._pop_latencies()
+        logger.info("Baseline search latency: %s" % self.baseline)
+        return self.baseline
+
+    def _sample(self):
+        try:
+            progress = self._progress_probe()
+        except Exception as e:
+            logger.error("Get index progress failed: %s" % str(e))
+            progress = {}
+        try:
+            cpu = self._cpu_probe()
+        except Exception as e:
+            logger.error("Get server cpu failed: %s" % str(e))
+            cpu = None
+        stats = self._pop_latencies()
+        rows = progress.get("rows")
+        point = {
+            "time": round(time.time() - self._start_time, 1),
+            "progress": round(progress["indexed_rows"] / rows, 4) if rows else None,
+            "indexed_segments": progress.get("indexed_segments"),
+            "segments": progress.get("segments"),
+            "cpu": cpu,
+            "count": stats["count"],
+            "errors": stats["errors"],
+            "p50_ms": stats["p50"] if stats["count"] else None,
+            "p99_ms": stats["p99"] if stats["count"] else None
+        }
+        logger.info(point)
+        self.series.append(point)
+
+    def run(self, build, timeout=None):
+        '''
+        Start the build and sample until it returns
+        @params:
+            build: callable starting the async build and returning a future with result()
+            timeout: seconds to wait for the build
+        '''
+        self._start_time = time.time()
+        self._start_search()
+        done_event = threading.Event()
+
+        def wait_build(future):
+            try:
+                future.result(timeout=timeout)
+            except Exception as e:
+                self.build_error = str(e)
+                logger.error("Build index failed: %s" % str(e))
+            self.build_time = round(time.time() - self._start_time, 2)
+            done_event.set()
+
+        try:
+            future = build()
+            threading.Thread(target=wait_build, args=(future,), daemon=True).start()
+            while not done_event.wait(self._interval):
+                self._sample()
+        finally:
+            self._stop_search()
+        self._sample()
+        return self.build_time
+
+    def analyze(self):
+        """
+        Build time and the impact of the build on search latency compared with the baseline
+        """
+        p99s = [p["p99_ms"] for p in self.series if p["p99_ms"] is not None]
+        res = {
+            "build_time": self.build_time,
+            "build_error": self.build_error,
+            "samples": len(self.series),
+            "max_cpu": max([p["cpu"] for p in self.series if p["cpu"] is not None], default=None),
+            "max_p99_ms": max(p99s) if p99s else None,
+            "baseline_p99_ms": self.baseline["p99"] if self.baseline else None,
+            "search_errors": sum(p["errors"] for p in self.series)
+        }
+        if res["max_p99_ms"] and res["baseline_p99_ms"]:
+            res["p99_ratio"] = round(res["max_p99_ms"] / res["baseline_p99_ms"], 3)
+        return res
+
+    def save(self, file_path):
+        dir_name = os.path.dirname(file_path)
+        if dir_name and not os.path.isdir(dir_name):
+            os.makedirs(dir_name, exist_ok=True)
+        with open(file_path, "w") as f:
+            json.dump({"interval": self._interval, "baseline": self.baseline, "build_time": self.build_time,
+                       "series": self.series}, f)
+        logger.info("Build timeline saved in: %s" % file_path)
@@ -0,0 +1,422 @@
+"""
+Import vector files into a collection with parallel writers, resumable after an interruption.
+
+Sources are npy/fvecs/bvecs/parquet files (--src, repeatable) or a dataset store directory (--dir),
+read with the dataset_store readers. Rows are numbered over the sources in order, the id of a row
+is --id-offset plus its number, so a resumed import inserts the same ids. A directory written by
+collection_export keeps the ids of its id map (plus --id-offset) and skips the rows of deleted entities.
+
+The rows are split into batches of --batch-rows, which are taken by --writers threads. The number
+of batches in flight is limited by additive increase / multiplicative decrease: it is halved when an
+insert fails or takes longer than --max-latency, and grows back by one batch per round of successes.
+A failed batch is retried with backoff, its ids are deleted before each retry as the server may have
+inserted them before the failure was returned.
+
+Progress is appended to the checkpoint file: a batch is marked started before its insert and done
+after it. A resumed import skips the done batches, and deletes the ids of the batches started but
+not done before inserting them again, so nothing is inserted twice.
+
+Usage:
+    python3 bulk_import.py --host 127.0.0.1 --collection corpus_500m --dir /test/milvus/raw_data/corpus/ \
+        --writers 8 --batch-rows 50000 --checkpoint logs/corpus_500m.ckpt --create
+"""
+import os
+import json
+import time
+import queue
+import logging
+import argparse
+import threading
+import numpy as np
+from milvus import DataType
+from client import MilvusClient
+import dataset_store
+import utils
+
+logger = logging.getLogger("milvus_benchmark.bulk_import")
+
+DEFAULT_BATCH_ROWS = 50000
+DEFAULT_WRITERS = 8
+MAX_RETRIES = 10
+MAX_BACKOFF = 30
+REPORT_INTERVAL = 10
+
+
+class Sources(object):
+    """
+    Row ranges over several vector files, read as one sequence of rows
+    """
+    def __init__(self, names, datasets, id_maps=None, missing_id=None):
+        self.names = names
+        self._datasets = datasets
+        # ids of the rows of each source instead of their numbers, rows with missing_id are skipped
+        self._id_maps = id_maps
+        self._missing_id = missing_id
+        dimensions = set(data.shape[1] for data in datasets)
+        if len(dimensions) != 1:
+            raise Exception("Sources have different dimensions: %s" % sorted(dimensions))
+        self.dimension = dimensions.pop()
+        self.offsets = np.cumsum([0] + [len(data) for data in datasets])
+
+    def __len__(self):
+        return int(self.offsets[-1])
+
+    def get_batches(self, batch_rows):
+        '''
+        @return:
+            list of (first row, source index, start, end), a batch does not cross two sources
+        '''
+        batches = []
+        for idx, data in enumerate(self._datasets):
+            for start in range(0, len(data), batch_rows):
+                end = min(start + batch_rows, len(data))
+                batches.append((int(self.offsets[idx]) + start, idx, start, end))
+        return batches
+
+    def get(self, idx, start, end):
+        return self._datasets[idx][start:end]
+
+    def get_ids(self, idx, start, end):
+        '''
+        @return:
+            ids of the rows in the id map of the source and the mask of the rows to insert,
+            None if the source has no id map
+        '''
+        if not self._id_maps or self._id_maps[idx] is None:
+            return None
+        ids = np.asarray(self._id_maps[idx][start:end], dtype=np.int64)
+        return ids, ids != self._missing_id
+
+
+def open_sources(files=None, data_dir=None):
+    if data_dir:
+        store = dataset_store.open_store(data_dir)
+        if "ids" not in store.manifest:
+            return Sources([os.path.abspath(data_dir)], [store])
+        # export of collection_export, the id map files are aligned with the chunks of the vectors
+        id_map = dataset_store.DatasetStore(data_dir, {"dimension": 1, "chunks": store.manifest["ids"]})
+        missing_id = store.manifest["missing_id"] if "missing_id" in store.manifest else -1
+        return Sources([os.path.abspath(data_dir)], [store], id_maps=[id_map], missing_id=missing_id)
+    if not files:
+        raise Exception("No source given")
+    return Sources([os.path.abspath(f) for f in files], [dataset_store.load_vectors(f) for f in files])
+
+
+class Checkpoint(object):
+    """
+    Journal of the import: a header line with the import params, then "S <first row>" when a batch
+    is started and "D <first row>" when it is done
+    """
+    def __init__(self, file_path, header):
+        self._file_path = file_path
+        self._header = header
+        self._lock = threading.Lock()
+        self._file = None
+
+    def load(self):
+        '''
+        @return:
+            first rows of the done batches and of the batches started but not done, empty for a new import
+        '''
+        done, started = set(), set()
+        if not os.path.exists(self._file_path):
+            return done, started
+        with open(self._file_path) as f:
+            header = json.loads(f.readline())
+            if header != self._header:
+                raise Exception("Checkpoint: %s is of another import: %s" % (self._file_path, header))
+            for line in f:
+                items = line.split()
+                # the last line may be cut by the interruption
+                if len(items) != 2 or not items[1].isdigit():
+                    continue
+                (done if items[0] == "D" else started).add(int(items[1]))
+        return done, started - done
+
+    def open(self):
+        dir_name = os.path.dirname(self._file_path)
+        if dir_name and not os.path.isdir(dir_name):
+            os.makedirs(dir_name, exist_ok=True)
+        new = not os.path.exists(self._file_path)
+        self._file = open(self._file_path, "a")
+        if new:
+            self._file.write(json.dumps(self._header) + "\n")
+            self._file.flush()
+
+    def mark(self, state, first_row):
+        with self._lock:
+            self._file.write("%s %d\n" % (state, first_row))
+            self._file.flush()
+
+    def close(self):
+        if self._file:
+            self._file.close()
+            self._file = None
+
+
+class Throttle(object):
+    """
+    Limit the inserts in flight, halved when the server pushes back and grown again on successes
+    """
+    def __init__(self, max_limit, max_latency=None):
+        self._max_limit = max_limit
+        self._max_latency = max_latency
+        self._limit = float(max_limit)
+        self._active = 0
+        self._cond = threading.Condition()
+        self.throttled = 0
+
+    @property
+    def limit(self):
+        return int(self._limit)
+
+    def acquire(self):
+        with self._cond:
+            while self._active >= int(self._limit):
+                self._cond.wait()
+            self._active += 1
+
+    def release(self, ok, latency):
+        with self._cond:
+            self._active -= 1
+            if not ok or (self._max_latency is not None and latency > self._max_latency):
+                self._limit = max(1.0, self._limit / 2)
+                self.throttled += 1
+            else:
+                # one more batch in flight after limit successes
+                self._limit = min(float(self._max_limit), self._limit + 1.0 / self._limit)
+            self._cond.notify_all()
+
+
+class BulkImporter(object):
+    """
+    Insert the batches of the sources with a pool of writer threads sharing one client,
+    each thread of the client has its own connection
+    """
+    def __init__(self, milvus, sources, batch_rows=DEFAULT_BATCH_ROWS, writers=DEFAULT_WRITERS, id_offset=0,
+                 checkpoint=None, max_latency=None, max_retries=MAX_RETRIES, report_interval=REPORT_INTERVAL):
+        self._milvus = milvus
+        self._sources = sources
+        self._batch_rows = batch_rows
+        self._writers = writers
+        self._id_offset = id_offset
+        self._checkpoint = checkpoint
+        self._throttle = Throttle(writers, max_latency=max_latency)
+        self._max_retries = max_retries
+        self._report_interval = report_interval
+        self._fields = milvus.get_info()["fields"]
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._error = None
+        self._rows = 0
+        self._retries = 0
+        self._latencies = []
+
+    def get_entities(self, data, ids):
+        entities = []
+        for field in self._fields:
+            field_type = field["type"]
+            vectors = None
+            if field_type == DataType.FLOAT_VECTOR:
+                vectors = np.asarray(data, dtype=np.float32).tolist()
+            elif field_type == DataType.BINARY_VECTOR:
+                vectors = [bytes(row) for row in np.asarray(data, dtype=np.uint8)]
+            entities.append({"name": field["name"], "type": field_type,
+                             "values": self._milvus.generate_values(field_type, vectors, ids)})
+        return entities
+
+    def get_batch_ids(self, batch):
+        '''
+        @return:
+            ids of the batch and the mask of its rows to insert, None if all the rows are inserted
+        '''
+        first_row, idx, start, end = batch
+        res = self._sources.get_ids(idx, start, end)
+        if res is None:
+            return list(range(self._id_offset + first_row, self._id_offset + first_row + end - start)), None
+        ids, mask = res
+        return (ids[mask] + self._id_offset).tolist(), mask
+
+    def _insert(self, batch):
+        first_row, idx, start, end = batch
+        data = self._sources.get(idx, start, end)
+        ids, mask = self.get_batch_ids(batch)
+        if mask is not None:
+            data = np.asarray(data)[mask]
+        if not ids:
+            if self._checkpoint:
+                self._checkpoint.mark("D", first_row)
+            return
+        entities = self.get_entities(data, ids)
+        if self._checkpoint:
+            self._checkpoint.mark("S", first_row)
+        for attempt in range(self._max_retries + 1):
+            # a failed insert may still have been applied by the server, its ids are deleted before the retry
+            if attempt and not self._delete(ids):
+                ok = False
+            else:
+                self._throttle.acquire()
+                start_time = time.time()
+                try:
+                    res_ids = self._milvus.insert(entities, ids=ids)
+                except Exception as e:
+                    logger.error(str(e))
+                    res_ids = None
+                latency = time.time() - start_time
+                ok = res_ids is not None and len(res_ids) == len(ids)
+                self._throttle.release(ok, latency)
+            if ok:
+                break
+            with self._lock:
+                self._retries += 1
+            backoff = min(0.5 * 2 ** attempt, MAX_BACKOFF)
+            logger.warning("Insert rows from %d failed, retry in %.1fs" % (first_row, backoff))
+            if self._stop_event.wait(backoff):
+                return
+        else:
+            raise Exception("Insert rows from %d failed after %d retries" % (first_row, self._max_retries))
+        if self._checkpoint:
+            self._checkpoint.mark("D", first_row)
+        with self._lock:
+            self._rows += len(ids)
+            self._latencies.append(latency)
+
+    def _delete(self, ids):
+        try:
+            self._milvus.delete(ids)
+            self._milvus.flush()
+            return True
+        except Exception as e:
+            logger.error("Delete ids: %d - %d failed: %s" % (ids[0], ids[-1], str(e)))
+            return False
+
+    def _worker(self, batches):
+        while not self._stop_event.is_set():
+            try:
+                batch = batches.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                self._insert(batch)
+            except Exception as e:
+                logger.error(str(e))
+                self._error = e
+                self._stop_event.set()
+
+    def recover(self, batches):
+        """
+        Delete the ids of the batches started but not done by the interrupted import
+        """
+        for batch in batches:
+            ids, _ = self.get_batch_ids(batch)
+            if not ids:
+                continue
+            logger.info("Delete ids of unfinished batch: %d - %d" % (ids[0], ids[-1]))
+            self._milvus.delete(ids)
+        if batches:
+            self._milvus.flush()
+
+    def run(self):
+        '''
+        @return:
+            rows inserted by this run, rows skipped as done before, elapsed time(s), rows/s overall and of
+            the report intervals, retries, throttle events and batch latency(ms)
+        '''
+        batches = self._sources.get_batches(self._batch_rows)
+        done, started = set(), set()
+        if self._checkpoint:
+            done, started = self._checkpoint.load()
+            self._checkpoint.open()
+        self.recover([b for b in batches if b[0] in started])
+        todo = [b for b in batches if b[0] not in done]
+        skipped = sum(b[3] - b[2] for b in batches if b[0] in done)
+        total = sum(b[3] - b[2] for b in todo)
+        logger.info("Import %d rows in %d batches, %d rows done before" % (total, len(todo), skipped))
+        work = queue.Queue()
+        for batch in todo:
+            work.put(batch)
+        start_time = time.time()
+        threads = [threading.Thread(target=self._worker, args=(work,), daemon=True) for i in range(self._writers)]
+        for t in threads:
+            t.start()
+        rates = []
+        last_time, last_rows = start_time, 0
+        running = True
+        while running:
+            time.sleep(min(1, self._report_interval))
+            running = any(t.is_alive() for t in threads)
+            now = time.time()
+            with self._lock:
+                rows = self._rows
+            if now - last_time >= self._report_interval or not running:
+                rate = (rows - last_rows) / (now - last_time) if now > last_time else 0.0
+                rates.append(rate)
+                eta = (total - rows) / (rows / (now - start_time)) if rows else None
+                logger.info("Imported: %d/%d rows, %.1f rows/s, in flight limit: %d, eta: %s" % (
+                    rows, total, rate, self._throttle.limit, "%ds" % eta if eta is not None else "-"))
+                last_time, last_rows = now, rows
+        if self._checkpoint:
+            self._checkpoint.close()
+        if self._error is not None:
+            raise self._error
+        elapsed = time.time() - start_time
+        return {
+            "rows": self._rows,
+            "skipped_rows": skipped,
+            "elapsed": round(elapsed, 2),
+            "rows_per_second": round(self._rows / elapsed, 2) if elapsed else 0.0,
+            # the slowest interval after the first one, which includes the start of the writers
+            "min_interval_rate": round(min(rates[1:] or rates or [0.0]), 2),
+            "median_interval_rate": round(float(np.median(rates)), 2) if rates else 0.0,
+            "retries": self._retries,
+            "throttled": self._throttle.throttled,
+            "batch_latency": utils.get_latency_stats(self._latencies)
+        }
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    arg_parser.add_argument("--host", default="127.0.0.1", help="server host")
+    arg_parser.add_argument("--port", default="19530", help="server port")
+    arg_parser.add_argument("--collection", required=True, help="collection name")
+    arg_parser.add_argument("--src", action="append", default=[], help="npy/fvecs/bvecs/parquet file, repeatable")
+    arg_parser.add_argument("--dir", help="dataset store directory, instead of --src")
+    arg_parser.add_argument("--create", action="store_true", help="create the collection if not existed")
+    arg_parser.add_argument("--binary", action="store_true", help="binary vectors, for --create")
+    arg_parser.add_argument("--id-offset", type=int, default=0, help="id of the first row")
+    arg_parser.add_argument("--batch-rows", type=int, default=DEFAULT_BATCH_ROWS, help="rows of an insert")
+    arg_parser.add_argument("--writers", type=int, default=DEFAULT_WRITERS, help="parallel writers")
+    arg_parser.add_argument("--max-latency", type=float, help="seconds, a slower insert slows down the import")
+    arg_parser.add_argument("--checkpoint", help="checkpoint file, the import resumes from it if existed")
+    arg_parser.add_argument("--no-flush", action="store_true", help="do not flush after the import")
+    arg_parser.add_argument("--output", help="save the result as json")
+    args = arg_parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    sources = open_sources(files=args.src, data_dir=args.dir)
+    logger.info("Sources: %s, rows: %d, dimension: %d" % (sources.names, len(sources), sources.dimension))
+    milvus = MilvusClient(collection_name=args.collection, host=args.host, port=args.port)
+    if not milvus.exists_collection():
+        if not args.create:
+            raise Exception("Collection: %s not existed" % args.collection)
+        data_type = DataType.BINARY_VECTOR if args.binary else DataType.FLOAT_VECTOR
+        dimension = sources.dimension * 8 if args.binary else sources.dimension
+        milvus.create_collection(dimension, data_type=data_type)
+    checkpoint = None
+    if args.checkpoint:
+        header = {"collection": args.collection, "sources": sources.names, "rows": len(sources),
+                  "batch_rows": args.batch_rows, "id_offset": args.id_offset}
+        checkpoint = Checkpoint(args.checkpoint, header)
+    importer = BulkImporter(milvus, sources, batch_rows=args.batch_rows, writers=args.writers,
+                            id_offset=args.id_offset, checkpoint=checkpoint, max_latency=args.max_latency)
+    res = importer.run()
+    if not args.no_flush:
+        milvus.flush()
+    logger.info("Import result: %s" % json.dumps(res))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(res, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -6,9 +6,17 @@ import json
 import time, datetime
 import traceback
 from multiprocessing import Process
+from concurrent.futures import ThreadPoolExecutor
 from milvus import Milvus, DataType
 import numpy as np
 import utils
+from profiler import ClientProfiler
+from coalescer import SearchCoalescer
+import result_cache
+from id_index import IdIndex
+import result_adapter
+import tracer
+import waiter
 
 logger = logging.getLogger("milvus_benchmark.client")
 
@@ -29,6 +37,8 @@ INDEX_MAP = {
     "rhnsw_sq": "RHNSW_SQ"
 }
 epsilon = 0.1
+# default of engine_config.build_index_threshold, used if the server config can not be read
+BUILD_INDEX_THRESHOLD = 4096
 
 
 def time_wrapper(func):
@@ -41,7 +51,8 @@ def time_wrapper(func):
         # logger.debug("Milvus {} start".format(func.__name__))
         log = kwargs.get("log", True)
         kwargs.pop("log", None)
-        result = func(*args, **kwargs)
+        with tracer.get_tracer().span(func.__name__):
+            result = func(*args, **kwargs)
         end = time.time()
         if log:
             logger.debug("Milvus {} run in {}s".format(func.__name__, round(end - start, 2)))
@@ -50,6 +61,25 @@ def time_wrapper(func):
     return wrapper
 
 
+def profile_wrapper(func):
+    """
+    This decorator records the client phases of the request if the profiler is enabled.
+    """
+
+    def wrapper(self, *args, **kwargs):
+        if self._profiler is None:
+            return func(self, *args, **kwargs)
+        # a dict lookup once the handler of this thread is wrapped
+        self._profiler.attach(self._milvus)
+        self._profiler.start(func.__name__)
+        try:
+            return func(self, *args, **kwargs)
+        finally:
+            self._profiler.end()
+
+    return wrapper
+
+
 class MilvusClient(object):
     def __init__(self, collection_name=None, host=None, port=None, timeout=180):
         self._collection_name = collection_name
@@ -78,11 +108,65 @@ class MilvusClient(object):
 
         if time.time() > start_time + timeout:
             raise Exception("Server connect timeout")
+        self._profiler = None
+        self._coalescer = None
+        self._result_cache = None
+        # collection name -> sampled ids
+        self._id_indexes = {}
+        # threads of bulk get, each thread has its own connection
+        self._get_executor = None
+        self._get_concurrency = 0
         # self._metric_type = None
 
     def __str__(self):
         return 'Milvus collection %s' % self._collection_name
 
+    def enable_profiler(self):
+        if self._profiler is None:
+            self._profiler = ClientProfiler()
+            # fails here if the pymilvus internals are not there, instead of in the first request
+            self._profiler.attach(self._milvus)
+        return self._profiler
+
+    def get_profiler(self):
+        return self._profiler
+
+    def enable_coalescer(self, window=None, max_batch=None):
+        '''
+        Batch the concurrent nq=1 queries with the same collection, topk, params and filter
+        @params:
+            window: seconds to wait for more queries, disable coalescing if None
+        '''
+        if window is None:
+            self._coalescer = None
+        else:
+            kwargs = {"max_batch": max_batch} if max_batch else {}
+            self._coalescer = SearchCoalescer(window=window, **kwargs)
+        return self._coalescer
+
+    def get_coalescer(self):
+        return self._coalescer
+
+    def enable_result_cache(self, max_bytes=result_cache.DEFAULT_MAX_BYTES, ttl=result_cache.DEFAULT_TTL):
+        '''
+        Cache the query results, the cached results of a collection are dropped on insert, delete and flush
+        @params:
+            max_bytes: size limit of the cached results, disable the cache if None
+            ttl: seconds a result is kept
+        '''
+        if max_bytes is None:
+            self._result_cache = None
+        else:
+            self._result_cache = result_cache.ResultCache(max_bytes=max_bytes, ttl=ttl)
+        return self._result_cache
+
+    def get_result_cache(self):
+        return self._result_cache
+
+    def invalidate_result_cache(self, collection_name):
+        if self._result_cache is not None:
+            self._result_cache.invalidate(collection_name)
+
     def check_status(self, status):
         if not status.OK():
             logger.error(status.message)
@@ -117,6 +201,8 @@ class MilvusClient(object):
         try:
             self._milvus.create_collection(collection_name, create_param)
             logger.info("Create collection: <%s> successfully" % collection_name)
+            # all ids of the new collection come from the inserts of this client
+            self._id_indexes[collection_name] = IdIndex()
         except Exception as e:
             logger.error(str(e))
             raise
@@ -148,13 +234,20 @@ class MilvusClient(object):
         return entities
 
     @time_wrapper
+    @profile_wrapper
     def insert(self, entities, ids=None, collection_name=None):
         tmp_collection_name = self._collection_name if collection_name is None else collection_name
+        tracer.get_tracer().set_attributes(collection=tmp_collection_name,
+                                           rows=len(entities[0]["values"]) if entities else 0)
         try:
             insert_ids = self._milvus.insert(tmp_collection_name, entities, ids=ids)
+            if insert_ids and tmp_collection_name in self._id_indexes:
+                self._id_indexes[tmp_collection_name].add(insert_ids)
             return insert_ids
         except Exception as e:
             logger.error(str(e))
+        finally:
+            self.invalidate_result_cache(tmp_collection_name)
 
     def get_dimension(self):
         info = self.get_info()
@@ -162,24 +255,38 @@ class MilvusClient(object):
             if field["type"] in [DataType.FLOAT_VECTOR, DataType.BINARY_VECTOR]:
                 return field["params"]["dim"]
 
+    def get_id_index(self, collection_name=None, refresh=False):
+        """
+        Return the sampled ids of the collection, built from a segment scan if not tracked since creation
+        """
+        tmp_collection_name = self._collection_name if collection_name is None else collection_name
+        index = self._id_indexes.get(tmp_collection_name)
+        if index is None or refresh:
+            index = IdIndex()
+            stats = self._milvus.get_collection_stats(tmp_collection_name)
+            segments = [segment for partition in stats["partitions"] for segment in (partition["segments"] or [])]
+            random.shuffle(segments)
+            # scan until the sample is full, one request per segment
+            for segment in segments:
+                try:
+                    index.add(self._milvus.list_id_in_segment(tmp_collection_name, segment["id"]))
+                except Exception as e:
+                    logger.error(str(e))
+                if len(index) >= index.capacity:
+                    break
+            logger.debug("Id index of %s built: %s" % (tmp_collection_name, index.get_stats()))
+            self._id_indexes[tmp_collection_name] = index
+        return index
+
     def get_rand_ids(self, length):
-        segment_ids = []
-        while True:
-            stats = self.get_stats()
-            segments = stats["partitions"][0]["segments"]
-            # random choice one segment
-            segment = random.choice(segments)
-            try:
-                segment_ids = self._milvus.list_id_in_segment(self._collection_name, segment["id"])
-            except Exception as e:
-                logger.error(str(e))
-            if not len(segment_ids):
-                continue
-            elif len(segment_ids) > length:
-                return random.sample(segment_ids, length)
-            else:
-                logger.debug("Reset length: %d" % len(segment_ids))
-                return segment_ids
+        index = self.get_id_index()
+        if not len(index):
+            index = self.get_id_index(refresh=True)
+        if not len(index):
+            raise Exception("No ids found in collection: %s" % self._collection_name)
+        if len(index) <= length:
+            logger.debug("Reset length: %d" % len(index))
+        return index.sample(length)
 
     # def get_rand_ids_each_segment(self, length):
     #     res = []
@@ -201,18 +308,58 @@ class MilvusClient(object):
     #     return ids, get_res
 
     def get(self):
-        get_ids = random.randint(1, 1000000)
+        index = self.get_id_index()
+        get_ids = index.choice() if len(index) else random.randint(1, 1000000)
         self._milvus.get_entity_by_id(self._collection_name, [get_ids])
 
     @time_wrapper
-    def get_entities(self, get_ids):
-        get_res = self._milvus.get_entity_by_id(self._collection_name, get_ids)
+    @profile_wrapper
+    def get_entities(self, get_ids, collection_name=None):
+        tmp_collection_name = self._collection_name if collection_name is None else collection_name
+        tracer.get_tracer().set_attributes(collection=tmp_collection_name, ids=len(get_ids))
+        get_res = self._milvus.get_entity_by_id(tmp_collection_name, get_ids)
         return get_res
 
+    @time_wrapper
+    def list_ids_in_segment(self, segment_id, collection_name=None):
+        tmp_collection_name = self._collection_name if collection_name is None else collection_name
+        tracer.get_tracer().set_attributes(collection=tmp_collection_name, segment=segment_id)
+        return self._milvus.list_id_in_segment(tmp_collection_name, segment_id)
+
+    def get_executor(self, concurrency):
+        if self._get_concurrency != concurrency:
+            if self._get_executor is not None:
+                self._get_executor.shutdown()
+            self._get_executor = ThreadPoolExecutor(max_workers=concurrency)
+            self._get_concurrency = concurrency
+        return self._get_executor
+
+    @time_wrapper
+    def get_entities_bulk(self, get_ids, chunk_size, concurrency, collection_name=None):
+        '''
+        Split the ids into chunks and get them in concurrency threads
+        @return:
+            entities in the order of get_ids, None if the id not found
+        '''
+        tmp_collection_name = self._collection_name if collection_name is None else collection_name
+        tracer.get_tracer().set_attributes(collection=tmp_collection_name, ids=len(get_ids),
+                                           chunk_size=chunk_size, concurrency=concurrency)
+        chunks = [get_ids[i:i + chunk_size] for i in range(0, len(get_ids), chunk_size)]
+        executor = self.get_executor(concurrency)
+        # map keeps the order of the chunks
+        results = executor.map(lambda ids: self._milvus.get_entity_by_id(tmp_collection_name, ids), chunks)
+        entities = []
+        for res in results:
+            entities.extend(res)
+        return entities
+
     @time_wrapper
     def delete(self, ids, collection_name=None):
         tmp_collection_name = self._collection_name if collection_name is None else collection_name
         self._milvus.delete_entity_by_id(tmp_collection_name, ids)
+        if tmp_collection_name in self._id_indexes:
+            self._id_indexes[tmp_collection_name].remove(ids)
+        self.invalidate_result_cache(tmp_collection_name)
 
     def delete_rand(self):
         delete_id_length = random.randint(1, 100)
@@ -232,7 +379,9 @@ class MilvusClient(object):
     @time_wrapper
     def flush(self,_async=False, collection_name=None):
         tmp_collection_name = self._collection_name if collection_name is None else collection_name
+        tracer.get_tracer().set_attributes(collection=tmp_collection_name)
         self._milvus.flush([tmp_collection_name], _async=_async)
+        self.invalidate_result_cache(tmp_collection_name)
 
     @time_wrapper
     def compact(self, collection_name=None):
@@ -248,12 +397,34 @@ class MilvusClient(object):
             self._collection_name, index_type, metric_type))
         if index_param:
             logger.info(index_param)
+        tracer.get_tracer().set_attributes(collection=self._collection_name, index_type=index_type,
+                                           metric_type=metric_type, params=index_param)
         index_params = {
             "index_type": index_type,
             "metric_type": metric_type,
             "params": index_param
         }
-        self._milvus.create_index(self._collection_name, field_name, index_params, _async=_async)
+        # the future of the build if _async
+        return self._milvus.create_index(self._collection_name, field_name, index_params, _async=_async)
+
+    def get_index_progress(self, field_name, collection_name=None, min_rows=0):
+        """
+        Rows and segments of the collection which have the index file of the field built,
+        segments with less than min_rows rows are not counted
+        """
+        tmp_collection_name = self._collection_name if collection_name is None else collection_name
+        stats = self._milvus.get_collection_stats(tmp_collection_name)
+        progress = {"indexed_rows": 0, "rows": 0, "indexed_segments": 0, "segments": 0}
+        for partition in stats["partitions"]:
+            for segment in partition["segments"] or []:
+                if segment["row_count"] < min_rows:
+                    continue
+                progress["rows"] += segment["row_count"]
+                progress["segments"] += 1
+                if utils.is_segment_indexed(segment, field_name):
+                    progress["indexed_rows"] += segment["row_count"]
+                    progress["indexed_segments"] += 1
+        return progress
 
     # TODO: need to check
     def describe_index(self, field_name):
@@ -277,6 +448,7 @@ class MilvusClient(object):
         return self._milvus.drop_index(self._collection_name, field_name)
 
     @time_wrapper
+    @profile_wrapper
     def query(self, vector_query, filter_query=None, collection_name=None):
         tmp_collection_name = self._collection_name if collection_name is None else collection_name
         must_params = [vector_query]
@@ -285,9 +457,35 @@ class MilvusClient(object):
         query = {
             "bool": {"must": must_params}
         }
-        result = self._milvus.search(tmp_collection_name, query)
+        self.set_query_attributes(tmp_collection_name, vector_query, filter_query)
+        cache_key = None
+        if self._result_cache is not None:
+            cache_key = result_cache.get_key(tmp_collection_name, vector_query, filter_query)
+            result = self._result_cache.get(cache_key)
+            if result is not None:
+                tracer.get_tracer().set_attributes(cache_hit=True)
+                return result
+            generation = self._result_cache.get_generation(tmp_collection_name)
+        result = self.search(tmp_collection_name, query, vector_query, filter_query)
+        if cache_key is not None:
+            self._result_cache.put(cache_key, tmp_collection_name, result, generation=generation)
         return result
 
+    def search(self, collection_name, query, vector_query, filter_query=None):
+        # send the search, nq=1 searches are batched if the coalescer is enabled
+        if self._coalescer is not None and len(vector_query["vector"]) == 1:
+            field_name, vector_param = list(vector_query["vector"].items())[0]
+            if len(vector_param["query"]) == 1:
+                key = SearchCoalescer.get_key(collection_name, field_name, vector_param, filter_query)
+
+                def batch_search(vectors):
+                    batch_param = dict(vector_param, query=vectors)
+                    query["bool"]["must"][0] = {"vector": {field_name: batch_param}}
+                    return self._milvus.search(collection_name, query)
+
+                return self._coalescer.search(key, vector_param["query"][0], batch_search)
+        return self._milvus.search(collection_name, query)
+
     @time_wrapper
     def load_and_query(self, vector_query, filter_query=None, collection_name=None):
         tmp_collection_name = self._collection_name if collection_name is None else collection_name
@@ -298,17 +496,29 @@ class MilvusClient(object):
             "bool": {"must": must_params}
         }
         self.load_collection(tmp_collection_name)
+        self.set_query_attributes(tmp_collection_name, vector_query, filter_query)
         result = self._milvus.search(tmp_collection_name, query)
         return result
 
-    def get_ids(self, result):
-        idss = result._entities.ids
-        ids = []
-        len_idss = len(idss)
-        len_r = len(result)
-        top_k = len_idss // len_r
-        for offset in range(0, len_idss, top_k):
-            ids.append(idss[offset: min(offset + top_k, len_idss)])
+    def set_query_attributes(self, collection_name, vector_query, filter_query=None):
+        for field_name, vector_param in vector_query["vector"].items():
+            tracer.get_tracer().set_attributes(collection=collection_name, nq=len(vector_param["query"]),
+                                               topk=vector_param["topk"], metric_type=vector_param["metric_type"],
+                                               params=vector_param["params"], filter=bool(filter_query))
+
+    def get_result_arrays(self, result, top_k=None):
+        '''
+        @return:
+            ids and distances of the result as (nq, top_k) arrays, padded with -1
+        '''
+        start_time = time.perf_counter()
+        ids, distances = result_adapter.get_result_arrays(result, top_k=top_k)
+        if self._profiler is not None:
+            self._profiler.add_decode(time.perf_counter() - start_time)
+        return ids, distances
+
+    def get_ids(self, result, top_k=None):
+        ids, _ = self.get_result_arrays(result, top_k=top_k)
         return ids
 
     def query_rand(self, nq_max=100):
@@ -318,7 +528,7 @@ class MilvusClient(object):
         nq = random.randint(1, nq_max)
         nprobe = random.randint(1, 100)
         search_param = {"nprobe": nprobe}
-        query_vectors = [[random.random() for _ in range(dimension)] for _ in range(nq)]
+        query_vectors = utils.generate_vectors(nq, dimension)
         metric_type = random.choice(["l2", "ip"])
         logger.info("%s, Search nq: %d, top_k: %d, nprobe: %d" % (self._collection_name, nq, top_k, nprobe))
         vec_field_name = utils.get_default_field_name()
@@ -337,7 +547,7 @@ class MilvusClient(object):
         nq = random.randint(1, nq_max)
         nprobe = random.randint(1, 100)
         search_param = {"nprobe": nprobe}
-        query_vectors = [[random.random() for _ in range(dimension)] for _ in range(nq)]
+        query_vectors = utils.generate_vectors(nq, dimension)
         metric_type = random.choice(["l2", "ip"])
         logger.info("%s, Search nq: %d, top_k: %d, nprobe: %d" % (self._collection_name, nq, top_k, nprobe))
         vec_field_name = utils.get_default_field_name()
@@ -357,30 +567,65 @@ class MilvusClient(object):
         logger.debug("Row count: %d in collection: <%s>" % (row_count, collection_name))
         return row_count
 
-    def drop(self, timeout=120, collection_name=None):
+    def drop(self, timeout=120, collection_name=None, wait=True):
         timeout = int(timeout)
         if collection_name is None:
             collection_name = self._collection_name
         logger.info("Start delete collection: %s" % collection_name)
         self._milvus.drop_collection(collection_name)
-        i = 0
-        while i < timeout:
-            try:
-                row_count = self.count(collection_name=collection_name)
-                if row_count:
-                    time.sleep(1)
-                    i = i + 1
-                    continue
-                else:
-                    break
-            except Exception as e:
-                logger.debug(str(e))
-                break
-        if i >= timeout:
-            logger.error("Delete collection timeout")
+        self._id_indexes.pop(collection_name, None)
+        if wait:
+            self.wait_dropped(timeout=timeout, collection_name=collection_name)
+
+    def wait_dropped(self, timeout=120, collection_name=None):
+        if collection_name is None:
+            collection_name = self._collection_name
+        try:
+            waiter.wait_for(lambda: not self._milvus.has_collection(collection_name), "collection_dropped",
+                            timeout=timeout)
+        except Exception as e:
+            logger.error("Delete collection timeout: %s" % str(e))
+
+    def wait_serving(self, timeout=waiter.DEFAULT_TIMEOUT):
+        """
+        Wait until the server answers requests
+        """
+        return waiter.wait_for(lambda: self._milvus.list_collections() is not None, "server_serving",
+                               timeout=timeout, max_interval=2)
 
-    def get_stats(self):
-        return self._milvus.get_collection_stats(self._collection_name)
+    def get_config(self, key):
+        return self._milvus.get_config(key)
+
+    def get_build_index_threshold(self):
+        try:
+            return int(self.get_config("engine_config.build_index_threshold"))
+        except Exception as e:
+            logger.warning("Get build index threshold failed: %s, use %d" % (str(e), BUILD_INDEX_THRESHOLD))
+            return BUILD_INDEX_THRESHOLD
+
+    def wait_index_built(self, field_name, timeout=waiter.DEFAULT_TIMEOUT, collection_name=None):
+        """
+        Wait until all segments of the collection have the index of the field built,
+        the server does not build the index of segments under the build index threshold.
+        On timeout a warning is logged with the last progress and None is returned, so the run goes on
+        """
+        min_rows = self.get_build_index_threshold()
+        last = {}
+
+        def is_built():
+            last["progress"] = self.get_index_progress(field_name, collection_name=collection_name,
+                                                       min_rows=min_rows)
+            return last["progress"]["indexed_segments"] == last["progress"]["segments"]
+        try:
+            return waiter.wait_for(is_built, "index_built", timeout=timeout)
+        except Exception as e:
+            logger.warning("%s, index progress: %s" % (str(e), last.get("progress")))
+            return None
+
+    def get_stats(self, collection_name=None):
+        if collection_name is None:
+            collection_name = self._collection_name
+        return self._milvus.get_collection_stats(collection_name)
 
     def get_info(self, collection_name=None):
         # pdb.set_trace()
@@ -406,6 +651,7 @@ class MilvusClient(object):
     def load_collection(self, collection_name=None):
         if collection_name is None:
             collection_name = self._collection_name
+        tracer.get_tracer().set_attributes(collection=collection_name)
         return self._milvus.load_collection(collection_name, timeout=3000)
 
     @time_wrapper
@@ -455,6 +701,3 @@ class MilvusClient(object):
     # @time_wrapper
     # def set_config(self, parent_key, child_key, value):
     #     self._milvus.set_config(parent_key, child_key, value)
-
-    # def get_config(self, key):
-    #     return self._milvus.get_config(key)
@@ -0,0 +1,119 @@
+import json
+import logging
+import threading
+import result_adapter
+
+logger = logging.getLogger("milvus_benchmark.coalescer")
+
+DEFAULT_WINDOW = 0.002
+DEFAULT_MAX_BATCH = 256
+
+
+class SubQueryResult(object):
+    """
+    Result of one query in a batched search, supports what the benchmark uses of QueryResult
+    """
+    def __init__(self, result, index):
+        self._result = result
+        self._index = index
+        # the width of the rows is the one of the returned ids, which is less than the topk
+        # if the collection has fewer entities, as in result_adapter
+        ids, _ = result_adapter.get_result_arrays(result)
+        self._entities = _SubEntities(ids[index].tolist())
+
+    def __len__(self):
+        return 1
+
+    def __getitem__(self, item):
+        if item != 0:
+            raise IndexError("Index out of range")
+        return self._result[self._index]
+
+    def __iter__(self):
+        yield self[0]
+
+
+class _SubEntities(object):
+    def __init__(self, ids):
+        self.ids = ids
+
+
+class _Batch(object):
+    def __init__(self):
+        self.vectors = []
+        self.full = threading.Event()
+        self.done = threading.Event()
+        self.result = None
+        self.error = None
+
+
+class SearchCoalescer(object):
+    """
+    Gather concurrent nq=1 searches with the same collection, topk, params and filter
+    within a wait window into one search, then split the results back to the callers.
+    The first caller of a batch waits for the window and sends the search for all.
+    """
+    def __init__(self, window=DEFAULT_WINDOW, max_batch=DEFAULT_MAX_BATCH):
+        self._window = window
+        self._max_batch = max_batch
+        self._lock = threading.Lock()
+        self._pending = {}
+        self.requests = 0
+        self.batches = 0
+
+    @staticmethod
+    def get_key(collection_name, field_name, vector_param, filter_query=None):
+        params = {k: v for k, v in vector_param.items() if k != "query"}
+        return json.dumps([collection_name, field_name, params, filter_query], sort_keys=True, default=str)
+
+    def search(self, key, vector, run):
+        '''
+        @params:
+            key: requests with the same key can be batched, the key includes the topk
+            vector: the query vector of this request
+            run: callable(vectors), search with the batched vectors and return the QueryResult
+        @return:
+            SubQueryResult of this request
+        '''
+        with self._lock:
+            batch = self._pending.get(key)
+            leader = batch is None
+            if leader:
+                batch = _Batch()
+                self._pending[key] = batch
+            index = len(batch.vectors)
+            batch.vectors.append(vector)
+            self.requests += 1
+            if len(batch.vectors) >= self._max_batch:
+                del self._pending[key]
+                batch.full.set()
+        if leader:
+            batch.full.wait(self._window)
+            with self._lock:
+                if self._pending.get(key) is batch:
+                    del self._pending[key]
+                self.batches += 1
+            try:
+                batch.result = run(batch.vectors)
+            except Exception as e:
+                batch.error = e
+            finally:
+                batch.done.set()
+        else:
+            batch.done.wait()
+        if batch.error is not None:
+            raise batch.error
+        return SubQueryResult(batch.result, index)
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "batches": self.batches,
+                "avg_batch_size": round(self.requests / self.batches, 2) if self.batches else 0.0
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self.requests = 0
+            self.batches = 0
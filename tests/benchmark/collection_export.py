@@ -0,0 +1,287 @@
+"""
+Export the vectors and scalar fields of a collection into memory mapped files, resumable after an interruption.
+
+The output directory has:
+
+    segments.json           the segments and fields of the collection when the export started
+    ids/seg_<id>.npy        int64 id map of each segment, row i of every file of the segment is the entity of id i
+    <field>/seg_<id>.npy    vectors or scalar values of each segment, vectors may be fvecs/bvecs files (--format vecs)
+    manifest.json           written at the end, readable by dataset_store.open_store for the vector field,
+                            bulk_import --dir inserts the rows with the ids of the id map
+
+The ids of each segment are listed with list_ids_in_segment, then the rows are fetched by get_entities
+of the client in chunks of --chunk-size ids by --workers threads, and written in place into files
+allocated for the whole segment. Only the chunks in flight are held in memory. The done chunks are appended to a checkpoint
+journal, a resumed export only fetches the others. An entity deleted during the export has id -1 in the
+id map and zeros in the other files.
+
+Usage:
+    python3 collection_export.py --host 127.0.0.1 --collection sift_1m_128_l2 --output /test/milvus/export/sift_1m/ \
+        --workers 8 --chunk-size 2000 --format vecs
+"""
+import os
+import json
+import time
+import logging
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+import numpy as np
+from milvus import DataType
+from client import MilvusClient
+from bulk_import import Checkpoint
+import dataset_store
+
+logger = logging.getLogger("milvus_benchmark.collection_export")
+
+DEFAULT_CHUNK_SIZE = 2000
+DEFAULT_WORKERS = 8
+MISSING_ID = -1
+FORMATS = ["npy", "vecs"]
+SCALAR_DTYPES = {
+    DataType.INT32: np.int32,
+    DataType.INT64: np.int64,
+    DataType.FLOAT: np.float32,
+    DataType.DOUBLE: np.float64
+}
+VECTOR_TYPES = [DataType.FLOAT_VECTOR, DataType.BINARY_VECTOR]
+
+
+def get_field_dtype(field):
+    if field["type"] == DataType.FLOAT_VECTOR:
+        return np.float32
+    if field["type"] == DataType.BINARY_VECTOR:
+        return np.uint8
+    return SCALAR_DTYPES[field["type"]]
+
+
+def get_field_width(field):
+    # columns of a row: binary vectors are stored as dim / 8 bytes
+    if field["type"] == DataType.FLOAT_VECTOR:
+        return field["params"]["dim"]
+    if field["type"] == DataType.BINARY_VECTOR:
+        return field["params"]["dim"] // 8
+    return None
+
+
+def create_vecs_memmap(file_path, rows, width, dtype):
+    """
+    Allocate a fvecs/bvecs file and write the dimension header of every row
+    """
+    header = 4 // np.dtype(dtype).itemsize
+    data = np.memmap(file_path, dtype=dtype, mode="w+", shape=(rows, width + header))
+    data[:, :header] = np.array([width], dtype=np.int32).view(dtype)
+    data.flush()
+    del data
+
+
+def open_vecs_memmap(file_path, rows, width, dtype):
+    """
+    Memory map the rows of a vecs file without the headers, for writing
+    """
+    header = 4 // np.dtype(dtype).itemsize
+    return np.memmap(file_path, dtype=dtype, mode="r+", shape=(rows, width + header))[:, header:]
+
+
+class CollectionExporter(object):
+    def __init__(self, milvus, collection_name, output, field_names=None, chunk_size=DEFAULT_CHUNK_SIZE,
+                 workers=DEFAULT_WORKERS, file_format="npy"):
+        if file_format not in FORMATS:
+            raise Exception("Format: %s not in %s" % (file_format, FORMATS))
+        self._milvus = milvus
+        self._collection_name = collection_name
+        self._output = output
+        self._chunk_size = chunk_size
+        self._workers = workers
+        self._format = file_format
+        fields = milvus.get_info(collection_name)["fields"]
+        if field_names:
+            unknown = set(field_names) - set(f["name"] for f in fields)
+            if unknown:
+                raise Exception("Fields: %s not in collection: %s" % (",".join(unknown), collection_name))
+            fields = [f for f in fields if f["name"] in field_names]
+        self._fields = [{"name": f["name"], "type": int(f["type"]), "params": f.get("params") or {}} for f in fields]
+        self._lock = threading.Lock()
+        self._rows = 0
+        self._missing = 0
+
+    def get_file_path(self, field_name, segment_id):
+        field = [f for f in self._fields if f["name"] == field_name][0] if field_name != "ids" else None
+        ext = ".npy"
+        if field is not None and field["type"] in VECTOR_TYPES and self._format == "vecs":
+            ext = ".fvecs" if field["type"] == DataType.FLOAT_VECTOR else ".bvecs"
+        return os.path.join(self._output, field_name, "seg_%s%s" % (segment_id, ext))
+
+    def plan(self):
+        '''
+        List the segments and the ids of each one, kept in the output so a resumed export sees the same rows
+        @return:
+            segments: [{"id", "rows", "offset"}], offset is the first row of the segment in the export
+        '''
+        plan_path = os.path.join(self._output, "segments.json")
+        if os.path.exists(plan_path):
+            with open(plan_path) as f:
+                plan = json.load(f)
+            if plan["collection"] != self._collection_name or plan["fields"] != self._fields:
+                raise Exception("Output: %s has an export of another collection or fields" % self._output)
+            return plan["segments"]
+        stats = self._milvus.get_stats(collection_name=self._collection_name)
+        segment_ids = [segment["id"] for partition in stats["partitions"] for segment in (partition["segments"] or [])]
+        for name in ["ids"] + [f["name"] for f in self._fields]:
+            os.makedirs(os.path.join(self._output, name), exist_ok=True)
+        segments = []
+        offset = 0
+        for segment_id in segment_ids:
+            ids = np.array(self._milvus.list_ids_in_segment(segment_id, collection_name=self._collection_name),
+                           dtype=np.int64)
+            if not len(ids):
+                continue
+            np.save(self.get_file_path("ids", segment_id), ids)
+            for field in self._fields:
+                file_path = self.get_file_path(field["name"], segment_id)
+                width = get_field_width(field)
+                if file_path.endswith(".npy"):
+                    shape = (len(ids), width) if width else (len(ids),)
+                    np.lib.format.open_memmap(file_path, mode="w+", dtype=get_field_dtype(field), shape=shape)
+                else:
+                    create_vecs_memmap(file_path, len(ids), width, get_field_dtype(field))
+            segments.append({"id": segment_id, "rows": len(ids), "offset": offset})
+            offset += len(ids)
+            logger.info("Segment: %s listed, %d ids" % (segment_id, len(ids)))
+        tmp_path = plan_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"collection": self._collection_name, "fields": self._fields, "segments": segments}, f)
+        os.rename(tmp_path, plan_path)
+        return segments
+
+    def _open(self, field, segment):
+        file_path = self.get_file_path(field["name"], segment["id"])
+        if file_path.endswith(".npy"):
+            return np.lib.format.open_memmap(file_path, mode="r+")
+        return open_vecs_memmap(file_path, segment["rows"], get_field_width(field), get_field_dtype(field))
+
+    def _export_chunk(self, segment, start, end, checkpoint):
+        id_map = np.load(self.get_file_path("ids", segment["id"]), mmap_mode="r+")
+        ids = id_map[start:end]
+        entities = self._milvus.get_entities(ids.tolist(), collection_name=self._collection_name, log=False)
+        columns = {}
+        for field in self._fields:
+            width = get_field_width(field)
+            shape = (len(ids), width) if width else (len(ids),)
+            columns[field["name"]] = np.zeros(shape, dtype=get_field_dtype(field))
+        missing = 0
+        for i, entity in enumerate(entities):
+            if entity is None:
+                missing += 1
+                ids[i] = MISSING_ID
+                continue
+            for field in self._fields:
+                value = entity.get(field["name"])
+                if field["type"] == DataType.BINARY_VECTOR:
+                    value = np.frombuffer(value, dtype=np.uint8)
+                columns[field["name"]][i] = value
+        for field in self._fields:
+            data = self._open(field, segment)
+            data[start:end] = columns[field["name"]]
+            data.flush()
+            del data
+        if missing:
+            id_map.flush()
+        del id_map
+        if checkpoint:
+            checkpoint.mark("D", segment["offset"] + start)
+        with self._lock:
+            self._rows += end - start - missing
+            self._missing += missing
+
+    def run(self, checkpoint=None):
+        '''
+        @return:
+            rows exported by this run, missing entities, elapsed time(s) and rows/s
+        '''
+        start_time = time.time()
+        segments = self.plan()
+        done = set()
+        if checkpoint:
+            done, _ = checkpoint.load()
+            checkpoint.open()
+        chunks = [(segment, start, min(start + self._chunk_size, segment["rows"]))
+                  for segment in segments for start in range(0, segment["rows"], self._chunk_size)
+                  if segment["offset"] + start not in done]
+        total = sum(segment["rows"] for segment in segments)
+        logger.info("Export %d of %d rows in %d chunks" % (sum(c[2] - c[1] for c in chunks), total, len(chunks)))
+        with ThreadPoolExecutor(max_workers=self._workers) as executor:
+            # at most 2 chunks queued for each worker, so the memory does not grow with the collection
+            futures = []
+            for chunk in chunks:
+                futures.append(executor.submit(self._export_chunk, chunk[0], chunk[1], chunk[2], checkpoint))
+                if len(futures) >= self._workers * 2:
+                    futures.pop(0).result()
+                    with self._lock:
+                        logger.debug("Exported rows: %d" % self._rows)
+            for future in futures:
+                future.result()
+        if checkpoint:
+            checkpoint.close()
+        self.write_manifest(segments)
+        elapsed = time.time() - start_time
+        res = {
+            "rows": self._rows,
+            "total_rows": total,
+            "missing": self._missing,
+            "elapsed": round(elapsed, 2),
+            "rows_per_second": round(self._rows / elapsed, 2) if elapsed else 0.0
+        }
+        logger.info("Export result: %s" % json.dumps(res))
+        return res
+
+    def write_manifest(self, segments):
+        """
+        Manifest of the export, the chunks are the files of the first vector field, as in a dataset store
+        """
+        vector_fields = [f for f in self._fields if f["type"] in VECTOR_TYPES]
+        files = {f["name"]: [{"file": os.path.relpath(self.get_file_path(f["name"], s["id"]), self._output),
+                              "rows": s["rows"]} for s in segments] for f in self._fields}
+        manifest = {
+            "collection": self._collection_name,
+            "rows": sum(s["rows"] for s in segments),
+            "ids": [{"file": os.path.relpath(self.get_file_path("ids", s["id"]), self._output), "rows": s["rows"]}
+                    for s in segments],
+            "fields": files,
+            "missing_id": MISSING_ID
+        }
+        if vector_fields:
+            manifest["dimension"] = get_field_width(vector_fields[0])
+            manifest["chunks"] = files[vector_fields[0]["name"]]
+        manifest_path = dataset_store.get_manifest_path(self._output)
+        with open(manifest_path, "w") as f:
+            json.dump(manifest, f, indent=2)
+        logger.info("Manifest saved in: %s" % manifest_path)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    arg_parser.add_argument("--host", default="127.0.0.1", help="server host")
+    arg_parser.add_argument("--port", default="19530", help="server port")
+    arg_parser.add_argument("--collection", required=True, help="collection name")
+    arg_parser.add_argument("--output", required=True, help="output directory")
+    arg_parser.add_argument("--fields", help="fields to export, comma separated, all fields if not given")
+    arg_parser.add_argument("--format", choices=FORMATS, default="npy", help="file format of the vector fields")
+    arg_parser.add_argument("--chunk-size", type=int, default=DEFAULT_CHUNK_SIZE, help="ids of a get request")
+    arg_parser.add_argument("--workers", type=int, default=DEFAULT_WORKERS, help="parallel get requests")
+    args = arg_parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    os.makedirs(args.output, exist_ok=True)
+    milvus = MilvusClient(collection_name=args.collection, host=args.host, port=args.port)
+    if not milvus.exists_collection():
+        raise Exception("Collection: %s not existed" % args.collection)
+    exporter = CollectionExporter(milvus, args.collection, args.output,
+                                  field_names=args.fields.split(",") if args.fields else None,
+                                  chunk_size=args.chunk_size, workers=args.workers, file_format=args.format)
+    header = {"collection": args.collection, "chunk_size": args.chunk_size}
+    exporter.run(checkpoint=Checkpoint(os.path.join(args.output, "checkpoint"), header))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,163 @@
+"""
+Generate synthetic vector datasets as chunked npy or fvecs shards.
+
+Each shard is generated by its own random stream seeded with (seed, shard index),
+so the output is the same whatever the number of processes, and an interrupted
+run can be resumed by running the same command again.
+
+Usage:
+    python3 data_generator.py --output /test/milvus/raw_data/random/ --rows 1000000000 --dim 512 \
+        --shard-rows 1000000 --distribution uniform --processes 32
+"""
+import os
+import time
+import logging
+import argparse
+from multiprocessing import Pool
+import numpy as np
+import dataset_store
+
+logger = logging.getLogger("milvus_benchmark.data_generator")
+
+DISTRIBUTIONS = ["uniform", "gaussian_mixture", "normalized"]
+FORMATS = ["npy", "fvecs"]
+FILE_PREFIX = dataset_store.FILE_PREFIX
+DATA_STREAM = 0
+QUERY_STREAM = 1
+CENTER_STREAM = 2
+BLOCK_ROWS = 65536
+
+
+def gen_shard_file_name(output, idx, dimension, file_format):
+    return os.path.join(output, "%s%dd_%05d.%s" % (FILE_PREFIX, dimension, idx, file_format))
+
+
+def gen_query_file_name(output, dimension, file_format):
+    return os.path.join(output, "query_%d.%s" % (dimension, file_format))
+
+
+def get_rng(seed, stream, idx=0):
+    return np.random.default_rng([seed, stream, idx])
+
+
+def get_centers(seed, clusters, dimension):
+    return get_rng(seed, CENTER_STREAM).random((clusters, dimension), dtype=np.float32)
+
+
+def generate_vectors(rng, rows, dimension, distribution, centers=None, cluster_std=0.05):
+    if distribution == "uniform":
+        return rng.random((rows, dimension), dtype=np.float32)
+    elif distribution == "normalized":
+        # uniform on the unit sphere
+        data = rng.standard_normal((rows, dimension), dtype=np.float32)
+        data /= np.linalg.norm(data, axis=1, keepdims=True)
+        return data
+    elif distribution == "gaussian_mixture":
+        data = rng.standard_normal((rows, dimension), dtype=np.float32)
+        data *= cluster_std
+        labels = rng.integers(len(centers), size=rows)
+        # add centers block by block to avoid another copy of the whole shard
+        for start in range(0, rows, BLOCK_ROWS):
+            end = min(start + BLOCK_ROWS, rows)
+            data[start:end] += centers[labels[start:end]]
+        return data
+    else:
+        raise Exception("Distribution: %s not supported" % distribution)
+
+
+def write_vectors(file_path, data, file_format):
+    tmp_path = file_path + ".tmp"
+    if file_format == "npy":
+        with open(tmp_path, "wb") as f:
+            np.save(f, data)
+    elif file_format == "fvecs":
+        rows, dimension = data.shape
+        with open(tmp_path, "wb") as f:
+            for start in range(0, rows, BLOCK_ROWS):
+                block = data[start:start + BLOCK_ROWS]
+                out = np.empty((len(block), dimension + 1), dtype=np.float32)
+                out.view(np.int32)[:, 0] = dimension
+                out[:, 1:] = block
+                out.tofile(f)
+    else:
+        raise Exception("Format: %s not supported" % file_format)
+    # rename at last, a shard file exists only if it is complete
+    os.rename(tmp_path, file_path)
+
+
+def _generate_shard(args):
+    (output, idx, rows, dimension, distribution, file_format, seed, clusters, cluster_std) = args
+    file_path = gen_shard_file_name(output, idx, dimension, file_format)
+    if os.path.exists(file_path):
+        return idx, 0.0
+    start_time = time.time()
+    centers = get_centers(seed, clusters, dimension) if distribution == "gaussian_mixture" else None
+    data = generate_vectors(get_rng(seed, DATA_STREAM, idx), rows, dimension, distribution,
+                            centers=centers, cluster_std=cluster_std)
+    write_vectors(file_path, data, file_format)
+    return idx, time.time() - start_time
+
+
+def generate_dataset(output, rows, dimension, shard_rows, distribution="uniform", file_format="npy",
+                     processes=1, seed=0, clusters=1000, cluster_std=0.05, query_num=10000):
+    '''
+    @params:
+        output: directory of the shards
+        rows: total row count, the last shard is smaller if rows is not a multiple of shard_rows
+        shard_rows: row count of each shard
+        query_num: row count of the query set, drawn from the same distribution
+    @return:
+        shard_num, query file path
+    '''
+    if distribution not in DISTRIBUTIONS:
+        raise Exception("Distribution: %s not supported" % distribution)
+    if file_format not in FORMATS:
+        raise Exception("Format: %s not supported" % file_format)
+    if not os.path.isdir(output):
+        os.makedirs(output, exist_ok=True)
+    shard_num = (rows + shard_rows - 1) // shard_rows
+    tasks = []
+    for idx in range(shard_num):
+        tasks.append((output, idx, min(shard_rows, rows - idx * shard_rows), dimension, distribution,
+                      file_format, seed, clusters, cluster_std))
+    start_time = time.time()
+    with Pool(processes) as pool:
+        for idx, cost in pool.imap_unordered(_generate_shard, tasks):
+            logger.info("Shard %d/%d generated in %.2fs" % (idx + 1, shard_num, cost))
+    logger.info("Generated %d rows in %.2fs" % (rows, time.time() - start_time))
+    query_file = gen_query_file_name(output, dimension, file_format)
+    if query_num and not os.path.exists(query_file):
+        centers = get_centers(seed, clusters, dimension) if distribution == "gaussian_mixture" else None
+        queries = generate_vectors(get_rng(seed, QUERY_STREAM), query_num, dimension, distribution,
+                                   centers=centers, cluster_std=cluster_std)
+        write_vectors(query_file, queries, file_format)
+    chunks = [{"file": os.path.basename(gen_shard_file_name(output, task[1], dimension, file_format)), "rows": task[2]}
+              for task in tasks]
+    dataset_store.write_manifest(output, chunks, dimension,
+                                 query=os.path.basename(query_file) if query_num else None, per_dimension=True)
+    return shard_num, query_file
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    arg_parser.add_argument("--output", required=True, help="output directory")
+    arg_parser.add_argument("--rows", type=int, required=True, help="total row count")
+    arg_parser.add_argument("--dim", type=int, required=True, help="vector dimension")
+    arg_parser.add_argument("--shard-rows", type=int, default=1000000, help="row count of each shard")
+    arg_parser.add_argument("--distribution", choices=DISTRIBUTIONS, default="uniform")
+    arg_parser.add_argument("--format", choices=FORMATS, default="npy")
+    arg_parser.add_argument("--processes", type=int, default=os.cpu_count())
+    arg_parser.add_argument("--seed", type=int, default=0)
+    arg_parser.add_argument("--clusters", type=int, default=1000, help="cluster count of gaussian_mixture")
+    arg_parser.add_argument("--cluster-std", type=float, default=0.05, help="cluster std of gaussian_mixture")
+    arg_parser.add_argument("--queries", type=int, default=10000, help="row count of the query set")
+    args = arg_parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    generate_dataset(args.output, args.rows, args.dim, args.shard_rows, distribution=args.distribution,
+                     file_format=args.format, processes=args.processes, seed=args.seed, clusters=args.clusters,
+                     cluster_std=args.cluster_std, query_num=args.queries)
+
+
+if __name__ == "__main__":
+    main()
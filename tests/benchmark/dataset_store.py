@@ -0,0 +1,362 @@
+"""
+Chunked vector dataset store shared by the benchmark runners and tools.
+
+A store is a directory of chunk files described by a manifest:
+
+    {
+        "dimension": 128,
+        "rows": 2000000,
+        "chunks": [{"file": "binary_128d_00000.npy", "rows": 1000000}, ...],
+        "query": "query.npy",
+        "groundtruth": {"1000000": "gnd/idx_1M.ivecs"}
+    }
+
+Chunks may be npy, fvecs, ivecs or bvecs files, all of them are memory mapped
+and only the slices asked for are read. Parquet files (needs pyarrow) are read
+by row group, the vector column is the first list column. Directories written before manifests
+existed (binary_<dim>d_<idx>.npy files) are discovered without one.
+
+Usage:
+    python3 dataset_store.py convert --src bigann_base.bvecs --output /test/milvus/raw_data/sift1b/ \
+        --query bigann_query.bvecs --chunk-rows 1000000
+    python3 dataset_store.py convert --src sift-128-euclidean.hdf5 --output /test/milvus/raw_data/sift-128/
+"""
+import os
+import re
+import json
+import logging
+import argparse
+import threading
+import numpy as np
+import h5py
+
+logger = logging.getLogger("milvus_benchmark.dataset_store")
+
+CHUNK_ROWS = 1000000
+FILE_PREFIX = "binary_"
+LEGACY_CHUNK_PATTERN = r"^%s(\d+)d_(\d+)\.npy$" % FILE_PREFIX
+LEGACY_QUERY_FILES = ["query_%d.npy", "query.npy"]
+VECS_DTYPES = {
+    ".fvecs": np.float32,
+    ".ivecs": np.int32,
+    ".bvecs": np.uint8
+}
+
+
+def get_manifest_path(data_dir, dimension=None):
+    # random datasets of different dimensions share one directory
+    if dimension is None:
+        return os.path.join(data_dir, "manifest.json")
+    return os.path.join(data_dir, "manifest_%dd.json" % dimension)
+
+
+def mmap_vecs(file_path):
+    """
+    Memory map a fvecs/ivecs/bvecs file, every row is an int32 dimension followed by the vector
+
+    Implementation based on:
+        https://github.com/facebookresearch/faiss/blob/master/benchs/datasets.py
+    """
+    ext = os.path.splitext(file_path)[1]
+    if ext not in VECS_DTYPES:
+        raise Exception("File: %s is not a vecs file" % file_path)
+    dtype = VECS_DTYPES[ext]
+    dimension = int(np.fromfile(file_path, dtype=np.int32, count=1)[0])
+    data = np.memmap(file_path, dtype=dtype, mode="r")
+    # the header takes 4 bytes, which is one item except for bvecs
+    header = 4 // data.itemsize
+    return data.reshape(-1, dimension + header)[:, header:]
+
+
+class ParquetVectors(object):
+    """
+    Vector column of a parquet file, sliced like an array, only the row groups of a slice are read
+    """
+    def __init__(self, file_path, column=None):
+        try:
+            import pyarrow.parquet as pq
+        except ImportError:
+            raise Exception("pyarrow is needed to read parquet file: %s" % file_path)
+        self._pq = pq
+        self._file_path = file_path
+        parquet_file = pq.ParquetFile(file_path)
+        if column is None:
+            for field in parquet_file.schema_arrow:
+                if str(field.type).startswith(("list", "fixed_size_list", "large_list")):
+                    column = field.name
+                    break
+            else:
+                raise Exception("No vector column in parquet file: %s" % file_path)
+        self._column = column
+        meta = parquet_file.metadata
+        self._offsets = np.cumsum([0] + [meta.row_group(i).num_rows for i in range(meta.num_row_groups)])
+        # each thread reads with its own file handle and keeps its last row group
+        self._local = threading.local()
+        first = self._read_group(0) if meta.num_row_groups else np.empty((0, 0), dtype=np.float32)
+        self.dimension = first.shape[1]
+        self.dtype = first.dtype
+
+    def __len__(self):
+        return int(self._offsets[-1])
+
+    @property
+    def shape(self):
+        return (len(self), self.dimension)
+
+    def _read_group(self, idx):
+        if getattr(self._local, "group", None) is not None and self._local.group[0] == idx:
+            return self._local.group[1]
+        if getattr(self._local, "file", None) is None:
+            self._local.file = self._pq.ParquetFile(self._file_path)
+        column = self._local.file.read_row_group(idx, columns=[self._column]).column(0).combine_chunks()
+        values = column.flatten().to_numpy(zero_copy_only=False)
+        data = values.reshape(len(column), -1) if len(column) else values.reshape(0, 0)
+        self._local.group = (idx, data)
+        return data
+
+    def __getitem__(self, key):
+        if not isinstance(key, slice) or key.step not in [None, 1]:
+            raise Exception("Only slices are supported")
+        start, end, _ = key.indices(len(self))
+        if start >= end:
+            return np.empty((0, self.dimension), dtype=self.dtype)
+        first = int(np.searchsorted(self._offsets, start, side="right")) - 1
+        last = int(np.searchsorted(self._offsets, end, side="left")) - 1
+        parts = []
+        for idx in range(first, last + 1):
+            offset = self._offsets[idx]
+            parts.append(self._read_group(idx)[max(start - offset, 0):min(end, self._offsets[idx + 1]) - offset])
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+
+def load_vectors(file_path):
+    """
+    Memory map vectors in any of the supported chunk formats
+    """
+    if not os.path.exists(file_path):
+        raise Exception("%s not existed" % file_path)
+    if file_path.endswith(".npy"):
+        return np.load(file_path, mmap_mode="r")
+    if file_path.endswith(".parquet"):
+        return ParquetVectors(file_path)
+    return mmap_vecs(file_path)
+
+
+class DatasetStore(object):
+    def __init__(self, data_dir, manifest):
+        self._data_dir = data_dir
+        self.manifest = manifest
+        self.dimension = manifest["dimension"]
+        self._chunks = manifest["chunks"]
+        # offsets[i] is the first row of chunk i, the last one is the row count
+        self._offsets = np.cumsum([0] + [chunk["rows"] for chunk in self._chunks])
+        self._loaded = {}
+
+    def __len__(self):
+        return int(self._offsets[-1])
+
+    @property
+    def shape(self):
+        return (len(self), self.dimension)
+
+    def _get_chunk(self, idx):
+        if idx not in self._loaded:
+            self._loaded[idx] = load_vectors(os.path.join(self._data_dir, self._chunks[idx]["file"]))
+        return self._loaded[idx]
+
+    def get(self, start, end):
+        """
+        Return rows in [start, end), a view of the mmap if the rows are in one chunk
+        """
+        start = max(start, 0)
+        end = min(end, len(self))
+        if start >= end:
+            return np.empty((0, self.dimension))
+        first = int(np.searchsorted(self._offsets, start, side="right")) - 1
+        last = int(np.searchsorted(self._offsets, end, side="left")) - 1
+        parts = []
+        for idx in range(first, last + 1):
+            offset = self._offsets[idx]
+            parts.append(self._get_chunk(idx)[max(start - offset, 0):min(end, self._offsets[idx + 1]) - offset])
+        return parts[0] if len(parts) == 1 else np.concatenate(parts)
+
+    def __getitem__(self, key):
+        if isinstance(key, slice):
+            if key.step not in [None, 1]:
+                raise Exception("Slice step not supported")
+            start, end, _ = key.indices(len(self))
+            return self.get(start, end)
+        if key < 0:
+            key += len(self)
+        return self.get(key, key + 1)[0]
+
+    def __array__(self, dtype=None, copy=None):
+        data = np.asarray(self.get(0, len(self)))
+        return data.astype(dtype) if dtype is not None else data
+
+    def iter_batches(self, batch_size, start=0, end=None):
+        end = len(self) if end is None else min(end, len(self))
+        for i in range(start, end, batch_size):
+            yield i, self.get(i, min(i + batch_size, end))
+
+    def get_queries(self, nq=None):
+        if "query" not in self.manifest:
+            raise Exception("No query set in dataset: %s" % self._data_dir)
+        data = load_vectors(os.path.join(self._data_dir, self.manifest["query"]))
+        return data if nq is None else data[:nq]
+
+    def get_groundtruth(self, size=None):
+        groundtruth = self.manifest.get("groundtruth")
+        if isinstance(groundtruth, dict):
+            # ground truth depends on how many rows are inserted
+            size = str(len(self) if size is None else size)
+            groundtruth = groundtruth.get(size)
+        if not groundtruth:
+            raise Exception("No groundtruth of size: %s in dataset: %s" % (size, self._data_dir))
+        return load_vectors(os.path.join(self._data_dir, groundtruth))
+
+
+def discover_manifest(data_dir, dimension):
+    """
+    Build the manifest of a directory of binary_<dim>d_<idx>.npy chunks
+    """
+    chunk_files = []
+    for file_name in os.listdir(data_dir):
+        m = re.match(LEGACY_CHUNK_PATTERN, file_name)
+        if m and (dimension is None or int(m.group(1)) == dimension):
+            chunk_files.append((int(m.group(2)), file_name))
+    if not chunk_files:
+        raise Exception("No dataset of dimension: %s in %s" % (dimension, data_dir))
+    chunk_files.sort()
+    chunks = []
+    for i, (idx, file_name) in enumerate(chunk_files):
+        if idx != i:
+            raise Exception("Chunk: %05d missing in %s" % (i, data_dir))
+        data = np.load(os.path.join(data_dir, file_name), mmap_mode="r")
+        dimension = data.shape[1]
+        chunks.append({"file": file_name, "rows": data.shape[0]})
+    manifest = {
+        "dimension": dimension,
+        "rows": sum(chunk["rows"] for chunk in chunks),
+        "chunks": chunks
+    }
+    for query_file in LEGACY_QUERY_FILES:
+        if "%d" in query_file:
+            query_file = query_file % dimension
+        if os.path.exists(os.path.join(data_dir, query_file)):
+            manifest["query"] = query_file
+            break
+    return manifest
+
+
+def open_store(data_dir, dimension=None):
+    manifest = None
+    for manifest_path in [get_manifest_path(data_dir, dimension), get_manifest_path(data_dir)]:
+        if os.path.exists(manifest_path):
+            with open(manifest_path) as f:
+                manifest = json.load(f)
+            if dimension is None or manifest["dimension"] == dimension:
+                break
+            manifest = None
+    if manifest is None:
+        logger.debug("No manifest found in %s, discover chunk files" % data_dir)
+        manifest = discover_manifest(data_dir, dimension)
+    return DatasetStore(data_dir, manifest)
+
+
+def write_manifest(data_dir, chunks, dimension, query=None, groundtruth=None, per_dimension=False):
+    manifest = {
+        "dimension": dimension,
+        "rows": sum(chunk["rows"] for chunk in chunks),
+        "chunks": chunks
+    }
+    if query:
+        manifest["query"] = query
+    if groundtruth:
+        manifest["groundtruth"] = groundtruth
+    manifest_path = get_manifest_path(data_dir, dimension if per_dimension else None)
+    with open(manifest_path, "w") as f:
+        json.dump(manifest, f, indent=2)
+    logger.info("Manifest saved in: %s" % manifest_path)
+    return manifest_path
+
+
+def _save_npy(file_path, data):
+    tmp_path = file_path + ".tmp"
+    with open(tmp_path, "wb") as f:
+        np.save(f, np.ascontiguousarray(data))
+    os.rename(tmp_path, file_path)
+
+
+def convert(src, output, chunk_rows=CHUNK_ROWS, query=None, groundtruth=None):
+    '''
+    @params:
+        src: fvecs/bvecs/ivecs/npy/parquet file, or ann-benchmarks hdf5 file with train/test/neighbors
+        output: directory of the store, chunks are written as npy
+        query: query file, ignored for hdf5
+        groundtruth: groundtruth file, ignored for hdf5
+    @return:
+        manifest path
+    '''
+    if not os.path.isdir(output):
+        os.makedirs(output, exist_ok=True)
+    h5_file = None
+    if src.endswith(".hdf5") or src.endswith(".h5"):
+        h5_file = h5py.File(src, "r")
+        data = h5_file["train"]
+    else:
+        data = load_vectors(src)
+    rows, dimension = data.shape
+    chunks = []
+    for idx, start in enumerate(range(0, rows, chunk_rows)):
+        file_name = "%s%dd_%05d.npy" % (FILE_PREFIX, dimension, idx)
+        # h5py datasets and mmaps are both read slice by slice
+        chunk = data[start:start + chunk_rows]
+        _save_npy(os.path.join(output, file_name), chunk)
+        chunks.append({"file": file_name, "rows": len(chunk)})
+        logger.info("Chunk: %s converted, %d/%d rows" % (file_name, start + len(chunk), rows))
+    query_file = None
+    groundtruth_file = None
+    if h5_file is not None:
+        query_file = "query.npy"
+        _save_npy(os.path.join(output, query_file), h5_file["test"][:])
+        if "neighbors" in h5_file:
+            groundtruth_file = "groundtruth.npy"
+            _save_npy(os.path.join(output, groundtruth_file), h5_file["neighbors"][:])
+        h5_file.close()
+    else:
+        if query:
+            query_file = "query.npy"
+            _save_npy(os.path.join(output, query_file), load_vectors(query))
+        if groundtruth:
+            groundtruth_file = "groundtruth.npy"
+            _save_npy(os.path.join(output, groundtruth_file), load_vectors(groundtruth))
+    return write_manifest(output, chunks, dimension, query=query_file, groundtruth=groundtruth_file)
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    sub_parsers = arg_parser.add_subparsers(dest="command")
+    convert_parser = sub_parsers.add_parser("convert", help="convert a dataset file into a chunked store")
+    convert_parser.add_argument("--src", required=True, help="fvecs/bvecs/ivecs/npy/parquet/hdf5 file")
+    convert_parser.add_argument("--output", required=True, help="output directory")
+    convert_parser.add_argument("--chunk-rows", type=int, default=CHUNK_ROWS)
+    convert_parser.add_argument("--query", help="query file")
+    convert_parser.add_argument("--groundtruth", help="groundtruth file")
+    show_parser = sub_parsers.add_parser("show", help="show the manifest of a store")
+    show_parser.add_argument("--dir", required=True, help="store directory")
+    show_parser.add_argument("--dim", type=int, help="dimension, for directories with several datasets")
+    args = arg_parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    if args.command == "convert":
+        convert(args.src, args.output, chunk_rows=args.chunk_rows, query=args.query, groundtruth=args.groundtruth)
+    elif args.command == "show":
+        store = open_store(args.dir, args.dim)
+        print(json.dumps(store.manifest, indent=2))
+    else:
+        arg_parser.print_help()
+
+
+if __name__ == "__main__":
+    main()
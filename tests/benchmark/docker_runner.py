@@ -268,13 +268,13 @@ class DockerRunner(Runner):
                                             with open(debug_file_ids, "w+") as fd:
                                                 total = 0
                                                 for index, item in enumerate(result_ids):
-                                                    true_item = true_ids_all[:nq, :top_k].tolist()[index]
+                                                    true_item = true_ids_all[index, :top_k].tolist()
                                                     tmp = set(item).intersection(set(true_item))
                                                     total = total + len(tmp)
                                                     fd.write("query: N-%d, intersection: %d, total: %d\n" % (index, len(tmp), total))
                                                     fd.write("%s\n" % str(item))
                                                     fd.write("%s\n" % str(true_item))
-                                            acc_value = self.get_recall_value(true_ids_all[:nq, :top_k].tolist(), result_ids)
+                                            acc_value = self.get_recall_value(true_ids_all[:nq, :top_k], result_ids)
                                             logger.info("Query: <%s> accuracy: %s" % (id_prefix, acc_value))
                     # # print accuracy collection
                     # headers = [collection_name]
@@ -324,7 +324,7 @@ class DockerRunner(Runner):
                         continue
 
                     start_time = time.time()
-                    insert_vectors = [[random.random() for _ in range(dimension)] for _ in range(10000)]
+                    insert_vectors = utils.generate_vectors(10000, dimension)
                     i = 0
                     while time.time() < start_time + during_time:
                         i = i + 1
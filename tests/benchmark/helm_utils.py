@@ -1,6 +1,7 @@
 import os
 import pdb
 import time
+import json
 import logging
 import hashlib
 from yaml import full_load, dump
@@ -101,6 +102,8 @@ def update_values(file_path, deploy_mode, hostname, milvus_config, server_config
     values_dict["extraConfiguration"].update({"engine": {"simd_type": "avx2"}})
     # stat_optimizer_enable
     values_dict["extraConfiguration"]["engine"].update({"stat_optimizer_enable": False})
+    if "omp_thread_num" in milvus_config:
+        values_dict["extraConfiguration"]["engine"].update({"omp_thread_num": int(milvus_config["omp_thread_num"])})
 
     # enable read-write mode
     if cluster:
@@ -221,6 +224,22 @@ def update_values(file_path, deploy_mode, hostname, milvus_config, server_config
             line = line.strip("\n")
 
 
+def get_values_fingerprint(deploy_mode, hostname, image_type, image_tag, milvus_config, server_config=None):
+    """
+    Fingerprint of the helm values a server is deployed with, the values are generated by update_values
+    from these params, so two servers with the same fingerprint are deployed the same
+    """
+    values = {
+        "deploy_mode": deploy_mode,
+        "hostname": hostname,
+        "image_type": image_type,
+        "image_tag": image_tag,
+        "milvus": milvus_config,
+        "server": server_config
+    }
+    return hashlib.sha1(json.dumps(values, sort_keys=True, default=str).encode("utf-8")).hexdigest()
+
+
 # deploy server
 def helm_install_server(helm_path, deploy_mode, image_tag, image_type, name, namespace):
     timeout = 300
@@ -253,7 +272,6 @@ def helm_install_server(helm_path, deploy_mode, image_tag, image_type, name, nam
     if os.system("cd %s && %s" % (helm_path, install_cmd)):
         logger.error("Helm install failed: %s" % name)
         return None
-    time.sleep(30)
     # config.load_kube_config()
     # v1 = client.CoreV1Api()
     # pod_name = None
@@ -282,6 +300,86 @@ def helm_del_server(name, namespace):
     return True
 
 
+def get_pod_memory(helm_release_name, namespace):
+    """
+    Sum the memory usage(MB) of the server pods in the release, read from metrics-server
+    """
+    from kubernetes import client, config
+    config.load_kube_config()
+    api = client.CustomObjectsApi()
+    pod_metrics = api.list_namespaced_custom_object("metrics.k8s.io", "v1beta1", namespace, "pods")
+    memory = 0.0
+    for item in pod_metrics["items"]:
+        pod_name = item["metadata"]["name"]
+        if pod_name.find(helm_release_name) == -1 or pod_name.find("mysql") != -1:
+            continue
+        for container in item["containers"]:
+            memory = memory + utils.parse_memory_quantity(container["usage"]["memory"])
+    return round(memory / (1024 * 1024), 2)
+
+
+def get_pod_cpu(helm_release_name, namespace, pod_filter=None):
+    """
+    Sum the cpu usage(cores) of the server pods in the release, read from metrics-server,
+    only the pods with pod_filter in the name are counted if given
+    """
+    from kubernetes import client, config
+    config.load_kube_config()
+    api = client.CustomObjectsApi()
+    pod_metrics = api.list_namespaced_custom_object("metrics.k8s.io", "v1beta1", namespace, "pods")
+    cpu = 0.0
+    for item in pod_metrics["items"]:
+        pod_name = item["metadata"]["name"]
+        if pod_name.find(helm_release_name) == -1 or pod_name.find("mysql") != -1:
+            continue
+        if pod_filter and pod_name.find(pod_filter) == -1:
+            continue
+        for container in item["containers"]:
+            cpu = cpu + utils.parse_cpu_quantity(container["usage"]["cpu"])
+    return round(cpu, 2)
+
+
+def get_pods(helm_release_name, namespace, pod_filter=None):
+    """
+    Return [(pod name, pod ip)] of the running server pods in the release,
+    only the pods with pod_filter in the name are listed if given
+    """
+    from kubernetes import client, config
+    config.load_kube_config()
+    v1 = client.CoreV1Api()
+    pods = []
+    for item in v1.list_namespaced_pod(namespace).items:
+        pod_name = item.metadata.name
+        if pod_name.find(helm_release_name) == -1 or pod_name.find("mysql") != -1:
+            continue
+        if pod_filter and pod_name.find(pod_filter) == -1:
+            continue
+        if item.status.phase == "Running":
+            pods.append((pod_name, item.status.pod_ip))
+    return pods
+
+
+def get_pods_usage(helm_release_name, namespace, pod_filter=None):
+    """
+    Return {pod name: {"memory": MB, "cpu": cores}} of each server pod in the release, read from metrics-server
+    """
+    from kubernetes import client, config
+    config.load_kube_config()
+    api = client.CustomObjectsApi()
+    pod_metrics = api.list_namespaced_custom_object("metrics.k8s.io", "v1beta1", namespace, "pods")
+    usage = {}
+    for item in pod_metrics["items"]:
+        pod_name = item["metadata"]["name"]
+        if pod_name.find(helm_release_name) == -1 or pod_name.find("mysql") != -1:
+            continue
+        if pod_filter and pod_name.find(pod_filter) == -1:
+            continue
+        memory = sum([utils.parse_memory_quantity(c["usage"]["memory"]) for c in item["containers"]])
+        cpu = sum([utils.parse_cpu_quantity(c["usage"]["cpu"]) for c in item["containers"]])
+        usage[pod_name] = {"memory": round(memory / (1024 * 1024), 2), "cpu": round(cpu, 2)}
+    return usage
+
+
 def restart_server(helm_release_name, namespace):
     res = True
     timeout = 120000
@@ -0,0 +1,302 @@
+"""
+Build one static html file from the stored results of a run, charts are inline svg so the file
+opens anywhere without a server or network, and two nightly runs can be compared side by side.
+
+The report has:
+    - time series of throughput, latency percentiles and resources, from the timelines in the
+      results (build_monitor, load_skew) and from the series files saved by the monitors (--series)
+    - recall vs latency curves of the accuracy and ann_accuracy sweeps
+    - the values of every result, grouped by type
+    - the run configuration: suite file (--suite) and the collection, index, server and env of the results
+
+Usage:
+    python3 html_report.py --results /test/milvus/benchmark/results/1602812345_100.jsonl \
+        --series logs/soak_sift_1m.json --suite suites/cpu_search_sift1m.yaml --output report.html
+"""
+import os
+import re
+import json
+import html
+import time
+import logging
+import argparse
+from collections import OrderedDict
+from results.store import load_results
+
+logger = logging.getLogger("milvus_benchmark.html_report")
+
+CHART_WIDTH = 720
+CHART_HEIGHT = 300
+CHART_MARGIN = (20, 20, 40, 70)
+TICK_NUM = 5
+MAX_LINES = 12
+COLORS = ["#1f77b4", "#ff7f0e", "#2ca02c", "#d62728", "#9467bd", "#8c564b", "#e377c2", "#7f7f7f",
+          "#bcbd22", "#17becf", "#393b79", "#ad494a"]
+ACCURACY_TYPES = ["accuracy", "ann_accuracy"]
+# series fields are put in one chart by the group of their name
+FIELD_GROUPS = [
+    ("imbalance", r"imbalance"),
+    ("latency(ms)", r"p\d+|latency|_ms$|^avg|^min|^max"),
+    ("throughput", r"qps|rps|throughput|count|search/s|^search$"),
+    ("memory(MB)", r"rss|memory|mem"),
+    ("cpu", r"cpu")
+]
+STYLE = """
+body {font-family: sans-serif; margin: 20px; color: #222}
+h2 {border-bottom: 1px solid #ccc; padding-bottom: 4px}
+table {border-collapse: collapse; margin: 8px 0 20px 0; font-size: 13px}
+th, td {border: 1px solid #ccc; padding: 3px 8px; text-align: right}
+th {background: #f0f0f0}
+td.text {text-align: left}
+pre {background: #f6f6f6; padding: 8px; font-size: 12px; overflow-x: auto}
+.chart {display: inline-block; margin: 0 20px 20px 0; vertical-align: top}
+"""
+
+
+def flatten(value, prefix=""):
+    """
+    Return {dotted path: number} of the numeric leaves of a nested dict
+    """
+    res = OrderedDict()
+    if isinstance(value, dict):
+        for k, v in value.items():
+            res.update(flatten(v, "%s.%s" % (prefix, k) if prefix else str(k)))
+    elif isinstance(value, (int, float)) and not isinstance(value, bool):
+        res[prefix] = value
+    return res
+
+
+def get_field_group(path):
+    name = path.split(".")[-1]
+    for group, pattern in FIELD_GROUPS:
+        if re.search(pattern, path if group == "imbalance" else name):
+            return group
+    return name
+
+
+def _nice(value):
+    if isinstance(value, float):
+        return "%.4g" % value
+    return str(value)
+
+
+def svg_line_chart(title, lines, x_label, y_label, width=CHART_WIDTH, height=CHART_HEIGHT):
+    '''
+    @params:
+        lines: {label: [(x, y)]}, points with a None y are skipped
+    @return:
+        svg element of the chart
+    '''
+    lines = OrderedDict((k, [p for p in v if p[1] is not None]) for k, v in list(lines.items())[:MAX_LINES])
+    points = [p for v in lines.values() for p in v]
+    if not points:
+        return ""
+    top, right, bottom, left = CHART_MARGIN
+    x_min, x_max = min(p[0] for p in points), max(p[0] for p in points)
+    y_min, y_max = min(0, min(p[1] for p in points)), max(p[1] for p in points)
+    x_max = x_max if x_max > x_min else x_min + 1
+    y_max = y_max if y_max > y_min else y_min + 1
+    plot_w, plot_h = width - left - right, height - top - bottom
+
+    def sx(x):
+        return left + (x - x_min) / (x_max - x_min) * plot_w
+
+    def sy(y):
+        return top + plot_h - (y - y_min) / (y_max - y_min) * plot_h
+
+    # the legend is under the plot, one row for each line
+    items = ['<svg xmlns="http://www.w3.org/2000/svg" width="%d" height="%d" font-size="11">' % (
+                width, height + 16 * len(lines)),
+             '<text x="%d" y="12" font-weight="bold">%s</text>' % (left, html.escape(title)),
+             '<rect x="%d" y="%d" width="%d" height="%d" fill="none" stroke="#999"/>' % (left, top, plot_w, plot_h)]
+    for i in range(TICK_NUM + 1):
+        x = x_min + (x_max - x_min) * i / TICK_NUM
+        y = y_min + (y_max - y_min) * i / TICK_NUM
+        items.append('<text x="%.1f" y="%d" text-anchor="middle">%s</text>' % (sx(x), top + plot_h + 14, _nice(x)))
+        items.append('<text x="%d" y="%.1f" text-anchor="end">%s</text>' % (left - 4, sy(y) + 4, _nice(y)))
+        items.append('<line x1="%d" x2="%d" y1="%.1f" y2="%.1f" stroke="#eee"/>' % (left, left + plot_w, sy(y), sy(y)))
+    items.append('<text x="%d" y="%d" text-anchor="middle">%s</text>' % (
+        left + plot_w / 2, top + plot_h + 30, html.escape(x_label)))
+    items.append('<text x="12" y="%d" transform="rotate(-90 12 %d)" text-anchor="middle">%s</text>' % (
+        top + plot_h / 2, top + plot_h / 2, html.escape(y_label)))
+    for i, (label, line) in enumerate(lines.items()):
+        color = COLORS[i % len(COLORS)]
+        line = sorted(line, key=lambda p: p[0])
+        items.append('<polyline fill="none" stroke="%s" stroke-width="1.5" points="%s"/>' % (
+            color, " ".join("%.1f,%.1f" % (sx(p[0]), sy(p[1])) for p in line)))
+        for p in line:
+            tip = "%s: (%s, %s)%s" % (label, _nice(p[0]), _nice(p[1]), " " + p[2] if len(p) > 2 else "")
+            items.append('<circle cx="%.1f" cy="%.1f" r="2.5" fill="%s"><title>%s</title></circle>' % (
+                sx(p[0]), sy(p[1]), color, html.escape(tip)))
+        legend_y = height + 16 * i
+        items.append('<rect x="%d" y="%d" width="10" height="10" fill="%s"/>' % (left, legend_y, color))
+        items.append('<text x="%d" y="%d">%s</text>' % (left + 14, legend_y + 9, html.escape(label)))
+    items.append("</svg>")
+    return '<div class="chart">%s</div>' % "\n".join(items)
+
+
+def html_table(headers, rows):
+    items = ["<table>", "<tr>%s</tr>" % "".join("<th>%s</th>" % html.escape(str(h)) for h in headers)]
+    for row in rows:
+        cells = []
+        for cell in row:
+            if isinstance(cell, (int, float)) and not isinstance(cell, bool):
+                cells.append("<td>%s</td>" % _nice(cell))
+            else:
+                text = cell if isinstance(cell, str) else json.dumps(cell, default=str)
+                cells.append('<td class="text">%s</td>' % html.escape("" if cell is None else text))
+        items.append("<tr>%s</tr>" % "".join(cells))
+    items.append("</table>")
+    return "\n".join(items)
+
+
+def get_time_series_charts(title, series):
+    """
+    Charts of a list of points with a time field, one chart for each group of fields
+    """
+    groups = OrderedDict()
+    for point in series:
+        for path, value in flatten(point).items():
+            if path == "time":
+                continue
+            groups.setdefault(get_field_group(path), OrderedDict()).setdefault(path, []).append((point["time"], value))
+    return [svg_line_chart("%s: %s" % (title, group), lines, "time(s)", group) for group, lines in groups.items()]
+
+
+def get_metric_label(metric):
+    collection = metric.get("collection") or {}
+    index = metric.get("index") or {}
+    search = metric.get("search") or {}
+    items = [collection.get("dataset_name"), index.get("index_type")]
+    items.extend("%s=%s" % (k, search[k]) for k in ["nq", "topk"] if k in search)
+    return " ".join(str(i) for i in items if i)
+
+
+def get_accuracy_charts(results):
+    """
+    Recall vs latency of the accuracy sweeps, one curve for each dataset, index, nq and topk,
+    each point is one search param
+    """
+    charts = []
+    for run_type in ACCURACY_TYPES:
+        lines = OrderedDict()
+        for metric in results:
+            value = metric.get("metrics", {}).get("value", {})
+            if metric.get("metrics", {}).get("type") != run_type or value.get("search_time") is None:
+                continue
+            search_param = (metric.get("search") or {}).get("search_param")
+            lines.setdefault(get_metric_label(metric), []).append(
+                (value["acc"], value["search_time"] * 1000, json.dumps(search_param)))
+        if lines:
+            charts.append(svg_line_chart("%s: recall vs latency" % run_type, lines, "recall", "latency(ms)"))
+    return charts
+
+
+def get_value_tables(results):
+    """
+    One table for each result type with the search params and the scalar values of each result,
+    timelines and lists of dicts are rendered as their own tables
+    """
+    by_type = OrderedDict()
+    for metric in results:
+        by_type.setdefault(metric.get("metrics", {}).get("type", "unknown"), []).append(metric)
+    sections = []
+    for run_type, metrics in by_type.items():
+        rows, headers, extra = [], ["collection", "index", "search"], []
+        for metric in metrics:
+            value = metric.get("metrics", {}).get("value", {})
+            row = {"collection": get_metric_label(metric), "index": (metric.get("index") or {}).get("index_param"),
+                   "search": (metric.get("search") or {}).get("search_param")}
+            for k, v in value.items():
+                if isinstance(v, list) and v and isinstance(v[0], dict):
+                    if "time" in v[0]:
+                        extra.extend(get_time_series_charts("%s %s %s" % (run_type, row["collection"], k), v))
+                    else:
+                        keys = list(OrderedDict((key, None) for item in v for key in item))
+                        extra.append("<h4>%s: %s</h4>" % (html.escape(run_type), html.escape(k)))
+                        extra.append(html_table(keys, [[item.get(key) for key in keys] for item in v]))
+                    continue
+                if k not in headers:
+                    headers.append(k)
+                row[k] = v
+            rows.append(row)
+        sections.append("<h3>%s</h3>" % html.escape(run_type))
+        sections.append(html_table(headers, [[row.get(h) for h in headers] for row in rows]))
+        sections.extend(extra)
+    return sections
+
+
+def get_config_section(results, suite_file=None):
+    sections = []
+    if suite_file:
+        with open(suite_file) as f:
+            sections.append("<h3>%s</h3><pre>%s</pre>" % (html.escape(suite_file), html.escape(f.read())))
+    seen = set()
+    for metric in results:
+        config = OrderedDict((k, metric.get(k)) for k in ["collection", "index", "run_params", "server", "env",
+                                                         "hardware"] if metric.get(k))
+        text = json.dumps(config, indent=2, sort_keys=True, default=str)
+        if text not in seen:
+            seen.add(text)
+            sections.append("<pre>%s</pre>" % html.escape(text))
+    return sections
+
+
+def build_report(results, series_files=None, suite_file=None, title=None):
+    """
+    Return the html of the report
+    """
+    title = title or "Benchmark report"
+    body = ["<h1>%s</h1>" % html.escape(title),
+            "<p>Generated at %s, %d results</p>" % (time.strftime("%Y-%m-%d %H:%M:%S"), len(results))]
+    charts = []
+    series_files = list(series_files or [])
+    # series saved by the monitors during the run
+    for metric in results:
+        file_path = metric.get("metrics", {}).get("value", {}).get("series_path")
+        if file_path and os.path.isfile(file_path) and file_path not in series_files:
+            series_files.append(file_path)
+    for file_path in series_files:
+        with open(file_path) as f:
+            series = json.load(f)
+        charts.extend(get_time_series_charts(os.path.basename(file_path), series["series"]))
+    if charts:
+        body.append("<h2>Time series</h2>")
+        body.extend(charts)
+    accuracy_charts = get_accuracy_charts(results)
+    if accuracy_charts:
+        body.append("<h2>Recall vs latency</h2>")
+        body.extend(accuracy_charts)
+    body.append("<h2>Results</h2>")
+    body.extend(get_value_tables(results))
+    body.append("<h2>Configuration</h2>")
+    body.extend(get_config_section(results, suite_file=suite_file))
+    return '<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>%s</title><style>%s</style></head>\n' \
+           '<body>\n%s\n</body></html>\n' % (html.escape(title), STYLE, "\n".join(body))
+
+
+def write_report(results_file, output, series_files=None, suite_file=None, title=None):
+    results = load_results(results_file)
+    with open(output, "w") as f:
+        f.write(build_report(results, series_files=series_files, suite_file=suite_file,
+                             title=title or os.path.basename(results_file)))
+    logger.info("Report saved in: %s" % output)
+    return output
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    arg_parser.add_argument("--results", required=True, help="results file of the run, json lines")
+    arg_parser.add_argument("--series", action="append", default=[], help="series file of a monitor, repeatable")
+    arg_parser.add_argument("--suite", help="suite file of the run")
+    arg_parser.add_argument("--title", help="title of the report")
+    arg_parser.add_argument("--output", help="html file, the results file with .html suffix if not given")
+    args = arg_parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    output = args.output or os.path.splitext(args.results)[0] + ".html"
+    write_report(args.results, output, series_files=args.series, suite_file=args.suite, title=args.title)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,84 @@
+import random
+import logging
+import threading
+
+logger = logging.getLogger("milvus_benchmark.id_index")
+
+DEFAULT_CAPACITY = 100000
+
+
+class IdIndex(object):
+    """
+    Uniform sample of the ids of a collection, kept with reservoir sampling over the inserted ids,
+    so a random id is drawn without any request to the server. Deleted ids are removed from
+    the sample, and the free slots are refilled by the next inserts.
+    """
+    def __init__(self, capacity=DEFAULT_CAPACITY, seed=None):
+        self._capacity = capacity
+        self._random = random.Random(seed)
+        self._lock = threading.Lock()
+        self._ids = []
+        # id -> slot in self._ids
+        self._slots = {}
+        self.seen = 0
+        self.deleted = 0
+
+    def __len__(self):
+        return len(self._ids)
+
+    @property
+    def capacity(self):
+        return self._capacity
+
+    def add(self, ids):
+        with self._lock:
+            for _id in ids:
+                self.seen += 1
+                if _id in self._slots:
+                    continue
+                if len(self._ids) < self._capacity:
+                    self._slots[_id] = len(self._ids)
+                    self._ids.append(_id)
+                    continue
+                # keep the new id with probability capacity / seen
+                slot = self._random.randrange(self.seen)
+                if slot < self._capacity:
+                    del self._slots[self._ids[slot]]
+                    self._ids[slot] = _id
+                    self._slots[_id] = slot
+
+    def remove(self, ids):
+        with self._lock:
+            for _id in ids:
+                self.deleted += 1
+                slot = self._slots.pop(_id, None)
+                if slot is None:
+                    continue
+                last = self._ids.pop()
+                if slot < len(self._ids):
+                    self._ids[slot] = last
+                    self._slots[last] = slot
+
+    def choice(self):
+        with self._lock:
+            if not self._ids:
+                raise Exception("Id index is empty")
+            return self._ids[self._random.randrange(len(self._ids))]
+
+    def sample(self, length):
+        """
+        Return min(length, size) distinct ids
+        """
+        with self._lock:
+            return self._random.sample(self._ids, min(length, len(self._ids)))
+
+    def get_stats(self):
+        with self._lock:
+            return {
+                "size": len(self._ids),
+                "capacity": self._capacity,
+                "seen": self.seen,
+                "deleted": self.deleted,
+                # estimated count of the live ids
+                "live": max(self.seen - self.deleted, len(self._ids))
+            }
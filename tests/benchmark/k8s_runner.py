@@ -7,7 +7,9 @@ import random
 import traceback
 import json
 import csv
+import copy
 import threading
+import urllib.request
 from multiprocessing import Process
 import numpy as np
 from milvus import DataType
@@ -17,22 +19,67 @@ import concurrent.futures
 import locust_user
 from client import MilvusClient
 import parser
-from runner import Runner
+from runner import Runner, get_vectors_from_binary
 from milvus_metrics.api import report
 from milvus_metrics.models import Env, Hardware, Server, Metric
 import helm_utils
+import monitor
+import skew_monitor
+import waiter
 import utils
+from results.reporter import SpoolReporter
+from results.store import FileStore
 
 logger = logging.getLogger("milvus_benchmark.k8s_runner")
 namespace = "milvus"
 default_port = 19530
-DELETE_INTERVAL_TIME = 5
 # INSERT_INTERVAL = 100000
 INSERT_INTERVAL = 50000
 BIG_FLUSH_INTERVAL = 3600
 DEFAULT_FLUSH_INTERVAL = 1
+MAX_QUERY_VECTORS = 10000
+SERVER_READY_TIMEOUT = 600
+INDEX_BUILD_TIMEOUT = 3600
 timestamp = int(time.time())
 default_path = "/var/lib/milvus"
+spool_dir = "/test/milvus/benchmark/spool/"
+results_dir = "/test/milvus/benchmark/results/"
+# shared by the runners in this process
+reporter = None
+store = None
+
+
+def get_reporter():
+    global reporter
+    if reporter is None:
+        reporter = SpoolReporter(report, spool_dir).start()
+    return reporter
+
+
+def close_reporter():
+    global reporter
+    if reporter is not None:
+        reporter.close()
+        reporter = None
+
+
+def get_store():
+    global store
+    if store is None:
+        store = FileStore(os.path.join(results_dir, "%d_%d.jsonl" % (timestamp, os.getpid())))
+    return store
+
+
+def close_store():
+    """
+    Return the results file of this process, None if nothing reported
+    """
+    global store
+    file_path = None
+    if store is not None and os.path.isfile(store.file_path):
+        file_path = store.file_path
+    store = None
+    return file_path
 
 
 class K8sRunner(Runner):
@@ -47,6 +94,8 @@ class K8sRunner(Runner):
         self.env_value = None
         self.hardware = None
         self.deploy_mode = None 
+        # collections in the data path when the server is deployed, kept when the server is reused
+        self.initial_collections = None
 
     def init_env(self, milvus_config, server_config, server_host, deploy_mode, image_type, image_tag):
         logger.debug("Tests run on server host:")
@@ -91,12 +140,126 @@ class K8sRunner(Runner):
             logger.error("Helm install server failed")
             self.clean_up()
             return False
+        try:
+            milvus_instance = MilvusClient(host=self.host)
+            waited = milvus_instance.wait_serving(timeout=SERVER_READY_TIMEOUT)
+            logger.info("Server: %s ready after %ss" % (self.service_name, waited))
+            self.initial_collections = milvus_instance.show_collections()
+        except Exception as e:
+            logger.error("Server: %s not ready: %s" % (self.service_name, str(e)))
+            self.clean_up()
+            return False
+        return True
+
+    def wait_reported(self, timeout=60):
+        """
+        Wait until the metrics of the run are uploaded, before the server is cleaned up
+        """
+        try:
+            waiter.wait_for(lambda: not get_reporter().pending(), "metrics_reported", timeout=timeout)
+        except Exception as e:
+            logger.warning(str(e))
+
+    def reset_env(self):
+        """
+        Make a deployed server ready for the next collection: drop the collections created since it
+        was deployed and release the others, the collections already in the data path are kept
+        @return:
+            False if the server can not be reused
+        """
+        if self.initial_collections is None:
+            return False
+        try:
+            milvus_instance = MilvusClient(host=self.host)
+            for name in milvus_instance.show_collections():
+                if name not in self.initial_collections:
+                    milvus_instance.drop(collection_name=name)
+                else:
+                    milvus_instance.release_collection(collection_name=name)
+        except Exception as e:
+            logger.error("Reset server: %s failed: %s" % (self.service_name, str(e)))
+            return False
+        logger.info("Reuse server: %s" % self.service_name)
         return True
 
     def clean_up(self):
         logger.debug("Start clean up: %s" % self.service_name)
         helm_utils.helm_del_server(self.service_name, namespace)
 
+    def get_server_rss(self):
+        return helm_utils.get_pod_memory(self.service_name, namespace)
+
+    def get_query_node_stats(self, skew_config):
+        """
+        Return {pod name: stats} of the query nodes: memory and cpu from metrics-server, search and segment
+        counts from the metrics endpoint of each pod if metrics_port is set
+        """
+        pod_filter = skew_config["pod_filter"] if "pod_filter" in skew_config else "readonly"
+        metrics_port = skew_config["metrics_port"] if "metrics_port" in skew_config else None
+        patterns = skew_config["metrics"] if "metrics" in skew_config else skew_monitor.DEFAULT_METRIC_PATTERNS
+        usage = helm_utils.get_pods_usage(self.service_name, namespace, pod_filter=pod_filter)
+        nodes = {}
+        for pod_name, pod_ip in helm_utils.get_pods(self.service_name, namespace, pod_filter=pod_filter):
+            stats = {"memory": None, "cpu": None, "search": None, "segments": None}
+            stats.update(usage.get(pod_name, {}))
+            if metrics_port and pod_ip:
+                try:
+                    url = "http://%s:%s/metrics" % (pod_ip, metrics_port)
+                    with urllib.request.urlopen(url, timeout=5) as response:
+                        text = response.read().decode("utf-8", errors="replace")
+                    stats.update(skew_monitor.parse_prometheus_text(text, patterns))
+                except Exception as e:
+                    logger.warning("Get metrics of pod: %s failed: %s" % (pod_name, str(e)))
+            nodes[pod_name] = stats
+        return nodes
+
+    def start_skew_monitor(self, collection):
+        """
+        Start sampling the load of each query node if the skew option is set in the collection
+        """
+        if "skew" not in collection:
+            return None
+        skew_config = collection["skew"] or {}
+        interval = utils.timestr_to_int(skew_config["interval"]) if "interval" in skew_config \
+            else skew_monitor.DEFAULT_SAMPLE_INTERVAL
+        skew = skew_monitor.SkewMonitor(lambda: self.get_query_node_stats(skew_config), interval=interval)
+        skew.start()
+        return skew
+
+    def finish_skew_monitor(self, skew, run_type, collection):
+        """
+        Stop the sampling, print the load of each node at the end and report the imbalance factors
+        """
+        skew.stop()
+        res = skew.analyze()
+        skew_config = collection["skew"] or {}
+        if "series_file" in skew_config:
+            skew.save(skew_config["series_file"])
+        if skew.series:
+            last = skew.series[-1]["nodes"]
+            headers = ["Node", "search/s", "searches", "segments", "memory(MB)", "cpu"]
+            data = [[last[node].get("search"), res["search_totals"].get(node), last[node].get("segments"),
+                     last[node].get("memory"), last[node].get("cpu")] for node in sorted(last)]
+            utils.print_table(headers, sorted(last), data)
+        logger.info("Query node imbalance: %s, hot node: %s" % (res["search_imbalance"], res["hot_node"]))
+        collection_name = collection["collection_name"] if "collection_name" in collection else None
+        milvus_instance = MilvusClient(collection_name=collection_name, host=self.host)
+        collection_info = {"dataset_name": collection_name}
+        try:
+            (data_type, collection_size, dimension, metric_type) = parser.collection_parser(collection_name)
+            collection_info.update({"dimension": dimension, "metric_type": metric_type})
+        except Exception as e:
+            logger.debug(str(e))
+        metric = self.report_wrapper(milvus_instance, self.env_value, self.hostname, collection_info, {}, {},
+                                     run_params={"run_type": run_type, "skew": skew_config})
+        res["timeline"] = skew.series
+        metric.metrics = {
+            "type": "load_skew",
+            "value": res
+        }
+        self.report_metric(milvus_instance, metric)
+        return res
+
     def report_wrapper(self, milvus_instance, env_value, hostname, collection_info, index_info, search_params,
                        run_params=None, server_config=None):
         metric = Metric()
@@ -117,11 +280,141 @@ class K8sRunner(Runner):
         metric.run_params = run_params
         return metric
 
+    def report_metric(self, milvus_instance, metric):
+        profiler = milvus_instance.get_profiler()
+        if profiler is not None:
+            # client side time of the requests since the last report
+            metric.metrics["value"]["client_overhead"] = profiler.get_overhead()
+            metric.metrics["value"]["client_profile"] = profiler.summary()
+            logger.info("Client overhead: %s%%" % metric.metrics["value"]["client_overhead"])
+            profiler.reset()
+        # kept locally for the html report
+        get_store().report(metric)
+        # uploaded in background, a reporter outage does not stop the run
+        get_reporter().report(metric)
+
+    def run_scaling(self, run_type, collection, milvus_config, server_config, server_host, deploy_mode, image_type,
+                    image_tag):
+        """
+        Deploy the server once for each cpu limit or omp thread num in the scaling option, run the same
+        search or build workload on each, and report throughput, latency, speedup and parallel efficiency
+        """
+        scaling = collection["scaling"]
+        if "cpus" in scaling:
+            scaling_key = "cpus"
+        elif "omp_thread_num" in scaling:
+            scaling_key = "omp_thread_num"
+        else:
+            raise Exception("Scaling option needs cpus or omp_thread_num")
+        if run_type not in ["search_performance", "build_performance"]:
+            raise Exception("Scaling not supported in run type: %s" % run_type)
+        if not milvus_config:
+            raise Exception("Scaling needs milvus config to update the server values")
+        values = sorted(scaling[scaling_key])
+        efficiency_threshold = scaling["efficiency_threshold"] if "efficiency_threshold" in scaling else 0.7
+        latency_log = collection["latency_log"] if "latency_log" in collection else None
+        collection_name = collection["collection_name"]
+        (data_type, collection_size, dimension, metric_type) = parser.collection_parser(collection_name)
+        collection_info = {
+            "dimension": dimension,
+            "metric_type": metric_type,
+            "dataset_name": collection_name
+        }
+        self.env_value = collection
+        steps = []
+        scaling_limit = None
+        error = None
+        for value in values:
+            step_milvus_config = copy.deepcopy(milvus_config)
+            step_server_config = copy.deepcopy(server_config) if server_config else {}
+            if scaling_key == "cpus":
+                step_server_config["cpus"] = value
+                # openmp sizes its pool by the host cores, not the cpu limit
+                step_milvus_config.setdefault("omp_thread_num", value)
+            else:
+                step_milvus_config["omp_thread_num"] = value
+            self.service_name = utils.get_unique_name()
+            if not self.init_env(step_milvus_config, step_server_config, server_host, deploy_mode, image_type,
+                                 image_tag):
+                error = Exception("Deploy server with %s: %s failed" % (scaling_key, value))
+                break
+            try:
+                milvus_instance = MilvusClient(collection_name=collection_name, host=self.host)
+                if not milvus_instance.exists_collection():
+                    raise Exception("Table name: %s not existed" % collection_name)
+                vector_type = self.get_vector_type(data_type)
+                vec_field_name = utils.get_default_field_name(vector_type)
+                if run_type == "search_performance":
+                    nq = scaling["nq"] if "nq" in scaling else 1
+                    top_k = scaling["top_k"] if "top_k" in scaling else 10
+                    search_param = scaling["search_param"] if "search_param" in scaling else None
+                    concurrency = scaling["concurrency"] if "concurrency" in scaling else 1
+                    during_time = utils.timestr_to_int(scaling["during_time"]) if "during_time" in scaling else 60
+                    index_info = self.get_index_info(milvus_instance, vec_field_name)
+                    milvus_instance.load_collection()
+                    query_vectors = get_vectors_from_binary(nq, dimension, data_type)
+                    # warm up
+                    self.do_search_throughput(milvus_instance, vec_field_name, query_vectors, top_k, metric_type,
+                                              search_param, concurrency, min(during_time, 10))
+                    step = self.do_search_throughput(milvus_instance, vec_field_name, query_vectors, top_k,
+                                                     metric_type, search_param, concurrency, during_time,
+                                                     latency_log=latency_log, tags={scaling_key: value})
+                    step["throughput"] = step["qps"]
+                    search_params = {"nq": nq, "topk": top_k, "search_param": search_param,
+                                     "concurrency": concurrency}
+                else:
+                    index_type = collection["index_type"]
+                    index_param = collection["index_param"]
+                    index_info = {"index_type": index_type, "index_param": index_param}
+                    milvus_instance.drop_index(vec_field_name)
+                    start_time = time.time()
+                    milvus_instance.create_index(vec_field_name, index_type, metric_type, index_param=index_param)
+                    build_time = time.time() - start_time
+                    # builds per hour, so that higher is better as for search
+                    step = {"build_time": round(build_time, 1), "throughput": round(3600 / build_time, 3)}
+                    search_params = {}
+                # values are sorted, the speedup is relative to the first step, so each step is reported
+                # when it finishes and a failed later step does not lose it
+                steps.append(step)
+                step.update(utils.get_scaling_stats(values[:len(steps)], [s["throughput"] for s in steps])[-1])
+                if scaling_limit is None and step["efficiency"] < efficiency_threshold:
+                    scaling_limit = value
+                logger.info("Scaling %s: %s, %s" % (scaling_key, value, step))
+                metric = self.report_wrapper(milvus_instance, self.env_value, self.hostname, collection_info,
+                                             index_info, search_params,
+                                             run_params={scaling_key: value, "run_type": run_type})
+                metric.metrics = {
+                    "type": "scaling",
+                    "value": step
+                }
+                self.report_metric(milvus_instance, metric)
+            except Exception as e:
+                error = e
+                break
+            finally:
+                self.clean_up()
+        if run_type == "search_performance":
+            headers = [scaling_key, "qps", "avg(ms)", "p99(ms)", "speedup", "efficiency"]
+            data = [[s["qps"], s["avg"], s["p99"], s["speedup"], s["efficiency"]] for s in steps]
+        else:
+            headers = [scaling_key, "build_time(s)", "speedup", "efficiency"]
+            data = [[s["build_time"], s["speedup"], s["efficiency"]] for s in steps]
+        utils.print_table(headers, values[:len(steps)], data)
+        if scaling_limit is not None:
+            logger.warning("Parallel efficiency below %s from %s: %s" % (efficiency_threshold, scaling_key,
+                                                                          scaling_limit))
+        if error is not None:
+            logger.error("Scaling stopped at %s: %s, %d steps reported" % (scaling_key, values[len(steps)], len(steps)))
+            raise error
+        return {"steps": steps, "scaling_limit": scaling_limit}
+
     def run(self, run_type, collection):
         logger.debug(run_type)
         logger.debug(collection)
         collection_name = collection["collection_name"] if "collection_name" in collection else None
         milvus_instance = MilvusClient(collection_name=collection_name, host=self.host)
+        if "client_profile" in collection and collection["client_profile"]:
+            milvus_instance.enable_profiler()
 
         # TODO: removed
         # self.env_value = milvus_instance.get_server_config()
@@ -138,7 +431,6 @@ class K8sRunner(Runner):
             build_index = collection["build_index"]
             if milvus_instance.exists_collection():
                 milvus_instance.drop()
-                time.sleep(10)
             index_info = {}
             search_params = {}
             vector_type = self.get_vector_type(data_type)
@@ -154,7 +446,7 @@ class K8sRunner(Runner):
                 }
                 index_field_name = utils.get_default_field_name(vector_type)
                 milvus_instance.create_index(index_field_name, index_type, metric_type, index_param=index_param)
-                logger.debug(milvus_instance.describe_index())
+                self.get_index_info(milvus_instance, index_field_name)
             res = self.do_insert(milvus_instance, collection_name, data_type, dimension, collection_size, ni_per)
             flush_time = 0.0
             if "flush" in collection and collection["flush"] == "no":
@@ -191,7 +483,7 @@ class K8sRunner(Runner):
                     "build_time": build_time
                 }
             }
-            report(metric)
+            self.report_metric(milvus_instance, metric)
 
         elif run_type == "build_performance":
             (data_type, collection_size, dimension, metric_type) = parser.collection_parser(
@@ -220,7 +512,7 @@ class K8sRunner(Runner):
             # start_mem_usage = milvus_instance.get_mem_info()["memory_used"]
             # TODO: need to check
             milvus_instance.create_index(index_field_name, index_type, metric_type, index_param=index_param)
-            logger.debug(milvus_instance.describe_index())
+            self.get_index_info(milvus_instance, index_field_name)
             logger.debug(milvus_instance.count())
             end_time = time.time()
             # end_mem_usage = milvus_instance.get_mem_info()["memory_used"]
@@ -232,7 +524,61 @@ class K8sRunner(Runner):
                     "build_time": round(end_time - start_time, 1),
                 }
             }
-            report(metric)
+            self.report_metric(milvus_instance, metric)
+
+        elif run_type == "build_monitor":
+            (data_type, collection_size, dimension, metric_type) = parser.collection_parser(collection_name)
+            index_type = collection["index_type"]
+            index_param = collection["index_param"]
+            monitor_config = collection["build_monitor"] if "build_monitor" in collection else {}
+            nq = monitor_config["nq"] if "nq" in monitor_config else 1
+            top_k = monitor_config["top_k"] if "top_k" in monitor_config else 10
+            search_param = monitor_config["search_param"] if "search_param" in monitor_config else {}
+            if not milvus_instance.exists_collection():
+                logger.error("Table name: %s not existed" % collection_name)
+                return
+            vector_type = self.get_vector_type(data_type)
+            index_field_name = utils.get_default_field_name(vector_type)
+            milvus_instance.load_collection()
+            query_vectors = get_vectors_from_binary(nq, dimension, data_type)
+            # only the pods with the name filter are sampled, such as the writable node of a cluster
+            pod_filter = monitor_config["pod_filter"] if "pod_filter" in monitor_config else None
+
+            def cpu_probe():
+                return helm_utils.get_pod_cpu(self.service_name, namespace, pod_filter=pod_filter)
+
+            res, series = self.do_build_monitor(milvus_instance, collection_name, index_field_name, index_type,
+                                                metric_type, index_param, query_vectors, top_k, search_param,
+                                                cpu_probe, monitor_config)
+            headers = ["Time(s)", "progress", "segments", "cpu", "searches", "p50(ms)", "p99(ms)"]
+            data = [[p["progress"], "%s/%s" % (p["indexed_segments"], p["segments"]), p["cpu"], p["count"],
+                     p["p50_ms"], p["p99_ms"]] for p in series]
+            utils.print_table(headers, [p["time"] for p in series], data)
+            collection_info = {
+                "dimension": dimension,
+                "metric_type": metric_type,
+                "dataset_name": collection_name
+            }
+            index_info = {
+                "index_type": index_type,
+                "index_param": index_param
+            }
+            search_params = {"nq": nq, "topk": top_k, "search_param": search_param}
+            metric = self.report_wrapper(milvus_instance, self.env_value, self.hostname, collection_info, index_info,
+                                         search_params)
+            metric.metrics = {
+                "type": run_type,
+                "value": {
+                    "build_time": res["build_time"],
+                    "max_cpu": res["max_cpu"],
+                    "baseline_p99": res["baseline_p99_ms"],
+                    "max_p99": res["max_p99_ms"],
+                    "p99_ratio": res.get("p99_ratio"),
+                    "search_errors": res["search_errors"],
+                    "timeline": series
+                }
+            }
+            self.report_metric(milvus_instance, metric)
 
         elif run_type == "delete_performance":
             (data_type, collection_size, dimension, metric_type) = parser.collection_parser(
@@ -251,8 +597,9 @@ class K8sRunner(Runner):
                 return
             length = milvus_instance.count()
             logger.info(length)
-            index_info = milvus_instance.describe_index()
-            logger.info(index_info)
+            vector_type = self.get_vector_type(data_type)
+            vec_field_name = utils.get_default_field_name(vector_type)
+            index_info = self.get_index_info(milvus_instance, vec_field_name)
             ids = [i for i in range(length)]
             loops = int(length / ni_per)
             milvus_instance.load_collection()
@@ -287,7 +634,7 @@ class K8sRunner(Runner):
             if auto_flush is False:
                 flush_time = round(end_flush_time - start_flush_time, 1)
                 metric.metrics["value"].update({"flush_time": flush_time})
-            report(metric)
+            self.report_metric(milvus_instance, metric)
 
         elif run_type == "get_ids_performance":
             (data_type, collection_size, dimension, metric_type) = parser.collection_parser(
@@ -303,8 +650,9 @@ class K8sRunner(Runner):
             }
             search_params = {}
             logger.info(milvus_instance.count())
-            index_info = milvus_instance.describe_index()
-            logger.info(index_info)
+            vector_type = self.get_vector_type(data_type)
+            vec_field_name = utils.get_default_field_name(vector_type)
+            index_info = self.get_index_info(milvus_instance, vec_field_name)
             for ids_num in ids_length_per_segment:
                 segment_num, get_ids = milvus_instance.get_rand_ids_each_segment(ids_num)
                 start_time = time.time()
@@ -323,7 +671,48 @@ class K8sRunner(Runner):
                         "avg_time": round(avg_time, 1)
                     }
                 }
-                report(metric)
+                self.report_metric(milvus_instance, metric)
+
+        elif run_type == "get_ids_bulk_performance":
+            (data_type, collection_size, dimension, metric_type) = parser.collection_parser(collection_name)
+            ids_num = collection["ids_num"]
+            chunk_sizes = collection["chunk_sizes"]
+            concurrencies = collection["concurrencies"]
+            run_count = collection["run_count"] if "run_count" in collection else 1
+            if not milvus_instance.exists_collection():
+                logger.error("Table name: %s not existed" % collection_name)
+                return
+            collection_info = {
+                "dimension": dimension,
+                "metric_type": metric_type,
+                "dataset_name": collection_name
+            }
+            vector_type = self.get_vector_type(data_type)
+            vec_field_name = utils.get_default_field_name(vector_type)
+            index_info = self.get_index_info(milvus_instance, vec_field_name)
+            milvus_instance.load_collection()
+            get_ids = milvus_instance.get_rand_ids(ids_num)
+            logger.info("Get %d ids" % len(get_ids))
+            res = self.do_get_bulk(milvus_instance, get_ids, chunk_sizes, concurrencies, run_count=run_count)
+            headers = ["Chunk size/Concurrency"]
+            headers.extend([str(concurrency) for concurrency in concurrencies])
+            data = [[res[(chunk_size, concurrency)]["throughput"] for concurrency in concurrencies]
+                    for chunk_size in chunk_sizes]
+            logger.info("Ids/s of %d ids" % len(get_ids))
+            utils.print_table(headers, chunk_sizes, data)
+            for (chunk_size, concurrency), r in res.items():
+                run_params = {"ids_num": len(get_ids), "chunk_size": chunk_size, "concurrency": concurrency}
+                metric = self.report_wrapper(milvus_instance, self.env_value, self.hostname, collection_info,
+                                             index_info, {}, run_params=run_params)
+                metric.metrics = {
+                    "type": run_type,
+                    "value": {
+                        "total_time": r["time"],
+                        "throughput": r["throughput"],
+                        "found": r["found"]
+                    }
+                }
+                self.report_metric(milvus_instance, metric)
 
         elif run_type == "search_performance":
             (data_type, collection_size, dimension, metric_type) = parser.collection_parser(
@@ -339,7 +728,7 @@ class K8sRunner(Runner):
             collection_info = {
                 "dimension": dimension,
                 "metric_type": metric_type,
-                "dataset_name": collection_name
+                "dataset_name": collection_name,
                 "fields": fields
             }
             if not milvus_instance.exists_collection():
@@ -349,8 +738,7 @@ class K8sRunner(Runner):
             vector_type = self.get_vector_type(data_type)
             vec_field_name = utils.get_default_field_name(vector_type)
             logger.info(milvus_instance.count())
-            index_info = milvus_instance.describe_index()
-            logger.info(index_info)
+            index_info = self.get_index_info(milvus_instance, vec_field_name)
             milvus_instance.load_collection()
             logger.info("Start warm up query")
             res = self.do_query(milvus_instance, collection_name, vec_field_name, [1], [1], 2,
@@ -392,7 +780,304 @@ class K8sRunner(Runner):
                                     "search_time": search_time
                                 }
                             }
-                            report(metric)
+                            self.report_metric(milvus_instance, metric)
+
+        elif run_type == "coalesce_performance":
+            (data_type, collection_size, dimension, metric_type) = parser.collection_parser(collection_name)
+            top_k = collection["top_k"]
+            search_param = collection["search_param"]
+            concurrency = collection["concurrency"]
+            during_time = utils.timestr_to_int(collection["during_time"])
+            windows = collection["windows"] if "windows" in collection else [0.002]
+            max_batch = collection["max_batch"] if "max_batch" in collection else None
+            fields = self.get_fields(milvus_instance, collection_name)
+            collection_info = {
+                "dimension": dimension,
+                "metric_type": metric_type,
+                "dataset_name": collection_name,
+                "fields": fields
+            }
+            if not milvus_instance.exists_collection():
+                logger.error("Table name: %s not existed" % collection_name)
+                return
+            vector_type = self.get_vector_type(data_type)
+            vec_field_name = utils.get_default_field_name(vector_type)
+            index_info = self.get_index_info(milvus_instance, vec_field_name)
+            milvus_instance.load_collection()
+            query_vectors = get_vectors_from_binary(MAX_QUERY_VECTORS, dimension, data_type)
+            logger.info("Start warm up query")
+            self.do_query(milvus_instance, collection_name, vec_field_name, [1], [1], 2, search_param=search_param)
+            logger.info("End warm up query")
+            res = self.do_coalesce_compare(milvus_instance, vec_field_name, query_vectors, top_k, metric_type,
+                                           search_param, concurrency, during_time, windows, max_batch=max_batch)
+            headers = ["Window(ms)", "qps", "avg", "p50", "p90", "p99", "batch size", "errors"]
+            columns = ["off" if r["window"] is None else str(r["window"] * 1000) for r in res]
+            data = [[r["qps"], r["avg"], r["p50"], r["p90"], r["p99"], r["avg_batch_size"], r["errors"]] for r in res]
+            utils.print_table(headers, columns, data)
+            for r in res:
+                search_param_group = {
+                    "nq": 1,
+                    "topk": top_k,
+                    "search_param": search_param,
+                    "concurrency": concurrency,
+                    "window": r["window"]
+                }
+                metric = self.report_wrapper(milvus_instance, self.env_value, self.hostname,
+                                             collection_info, index_info, search_param_group)
+                metric.metrics = {
+                    "type": run_type,
+                    "value": {
+                        "qps": r["qps"],
+                        "avg_latency": r["avg"],
+                        "p99_latency": r["p99"],
+                        "avg_batch_size": r["avg_batch_size"],
+                        "errors": r["errors"]
+                    }
+                }
+                self.report_metric(milvus_instance, metric)
+
+        elif run_type == "cache_performance":
+            (data_type, collection_size, dimension, metric_type) = parser.collection_parser(collection_name)
+            top_k = collection["top_k"]
+            search_param = collection["search_param"]
+            concurrency = collection["concurrency"] if "concurrency" in collection else 1
+            query_count = collection["query_count"]
+            distinct_num = collection["distinct_num"] if "distinct_num" in collection else MAX_QUERY_VECTORS
+            zipf_s = collection["zipf_s"] if "zipf_s" in collection else 1.0
+            ttl = utils.timestr_to_int(collection["ttl"]) if "ttl" in collection else None
+            # like 16Mi, 1Gi
+            cache_sizes = [int(utils.parse_memory_quantity(str(size))) for size in collection["cache_sizes"]]
+            fields = self.get_fields(milvus_instance, collection_name)
+            collection_info = {
+                "dimension": dimension,
+                "metric_type": metric_type,
+                "dataset_name": collection_name,
+                "fields": fields
+            }
+            if not milvus_instance.exists_collection():
+                logger.error("Table name: %s not existed" % collection_name)
+                return
+            vector_type = self.get_vector_type(data_type)
+            vec_field_name = utils.get_default_field_name(vector_type)
+            index_info = self.get_index_info(milvus_instance, vec_field_name)
+            milvus_instance.load_collection()
+            query_vectors = get_vectors_from_binary(distinct_num, dimension, data_type)
+            res = self.do_cache_replay(milvus_instance, vec_field_name, query_vectors, top_k, metric_type,
+                                       search_param, concurrency, query_count, cache_sizes, zipf_s=zipf_s, ttl=ttl)
+            headers = ["Cache size", "qps", "avg", "p99", "hit rate", "cached bytes", "evictions", "errors"]
+            columns = ["off" if r["cache_size"] is None else str(r["cache_size"]) for r in res]
+            data = [[r["qps"], r["avg"], r["p99"], r["hit_rate"], r["cached_bytes"], r["evictions"], r["errors"]]
+                    for r in res]
+            utils.print_table(headers, columns, data)
+            for r in res:
+                search_param_group = {
+                    "nq": 1,
+                    "topk": top_k,
+                    "search_param": search_param,
+                    "concurrency": concurrency,
+                    "zipf_s": zipf_s,
+                    "distinct_num": distinct_num,
+                    "cache_size": r["cache_size"]
+                }
+                metric = self.report_wrapper(milvus_instance, self.env_value, self.hostname,
+                                             collection_info, index_info, search_param_group)
+                metric.metrics = {
+                    "type": run_type,
+                    "value": {
+                        "qps": r["qps"],
+                        "avg_latency": r["avg"],
+                        "p99_latency": r["p99"],
+                        "hit_rate": r["hit_rate"],
+                        "evictions": r["evictions"]
+                    }
+                }
+                self.report_metric(milvus_instance, metric)
+
+        elif run_type == "slo_search":
+            (data_type, collection_size, dimension, metric_type) = parser.collection_parser(collection_name)
+            slo = collection["slo"]
+            nq = collection["nq"] if "nq" in collection else 1
+            top_k = collection["top_k"]
+            search_param = collection["search_param"]
+            min_clients = collection["min_clients"] if "min_clients" in collection else 1
+            max_clients = collection["max_clients"]
+            step_time = utils.timestr_to_int(collection["step_time"]) if "step_time" in collection else 60
+            warm_up = utils.timestr_to_int(collection["warm_up"]) if "warm_up" in collection else 10
+            latency_log = collection["latency_log"] if "latency_log" in collection else None
+            max_error_rate = slo["error_rate"] if "error_rate" in slo else 0.0
+            recall_nq = min(slo["recall_nq"] if "recall_nq" in slo else 1000, MAX_QUERY_VECTORS)
+            collection_info = {
+                "dimension": dimension,
+                "metric_type": metric_type,
+                "dataset_name": collection_name
+            }
+            if not milvus_instance.exists_collection():
+                logger.error("Table name: %s not existed" % collection_name)
+                return
+            vector_type = self.get_vector_type(data_type)
+            vec_field_name = utils.get_default_field_name(vector_type)
+            index_info = self.get_index_info(milvus_instance, vec_field_name)
+            milvus_instance.load_collection()
+            # the load requests take their nq vectors from the pool in turn
+            query_pool = get_vectors_from_binary(MAX_QUERY_VECTORS, dimension, data_type)
+            query_vectors = query_pool[:nq]
+            recall = None
+            if "recall" in slo:
+                # recall depends on the search params, not on the load, check it once before the search,
+                # on recall_nq queries whatever the nq of the load
+                vector_query = {"vector": {vec_field_name: {
+                    "topk": top_k,
+                    "query": query_pool[:recall_nq],
+                    "metric_type": utils.metric_type_trans(metric_type),
+                    "params": search_param}
+                }}
+                result_ids = milvus_instance.get_ids(milvus_instance.query(vector_query), top_k=top_k)
+                recall = self.get_recall_value(self.get_groundtruth_ids(collection_size)[:recall_nq, :top_k],
+                                               result_ids)
+                logger.info("Recall: %s, slo: %s" % (recall, slo["recall"]))
+            best, steps = None, []
+            if recall is None or recall >= slo["recall"]:
+                best, steps = self.do_find_max_qps(milvus_instance, vec_field_name, query_vectors, top_k, metric_type,
+                                                   search_param, slo["p99"], min_clients, max_clients, step_time,
+                                                   warm_up=warm_up, max_error_rate=max_error_rate,
+                                                   query_pool=query_pool, latency_log=latency_log)
+            else:
+                logger.warning("Recall: %s under slo: %s, skip the load search" % (recall, slo["recall"]))
+            headers = ["Clients", "qps", "avg", "p50", "p90", "p99", "error rate", "passed"]
+            data = [[r["qps"], r["avg"], r["p50"], r["p90"], r["p99"], r["error_rate"], r["passed"]] for r in steps]
+            utils.print_table(headers, [r["clients"] for r in steps], data)
+            if best:
+                logger.info("Max qps under slo: %s, clients: %d, latency(ms): avg %s, p50 %s, p90 %s, p99 %s, max %s" % (
+                    best["qps"], best["clients"], best["avg"], best["p50"], best["p90"], best["p99"], best["max"]))
+            else:
+                logger.warning("No load meets slo: %s" % json.dumps(slo))
+            search_param_group = {
+                "nq": nq,
+                "topk": top_k,
+                "search_param": search_param,
+                "slo": slo,
+                "recall_nq": recall_nq
+            }
+            metric = self.report_wrapper(milvus_instance, self.env_value, self.hostname,
+                                         collection_info, index_info, search_param_group)
+            metric.metrics = {
+                "type": run_type,
+                "value": {
+                    "max_qps": best["qps"] if best else 0.0,
+                    "clients": best["clients"] if best else 0,
+                    "recall": recall,
+                    "latency": {k: best[k] for k in ["avg", "p50", "p90", "p99", "max"]} if best else None,
+                    "steps": [{k: r[k] for k in ["clients", "qps", "p99", "error_rate", "passed"]} for r in steps]
+                }
+            }
+            self.report_metric(milvus_instance, metric)
+
+        elif run_type == "nq_optimize":
+            (data_type, collection_size, dimension, metric_type) = parser.collection_parser(collection_name)
+            nq_config = collection["nq_optimize"]
+            latency_cap = nq_config["latency"]
+            percentile = nq_config["percentile"] if "percentile" in nq_config else "p99"
+            min_nq = nq_config["min_nq"] if "min_nq" in nq_config else 1
+            max_nq = min(nq_config["max_nq"] if "max_nq" in nq_config else MAX_QUERY_VECTORS, MAX_QUERY_VECTORS)
+            run_count = nq_config["run_count"] if "run_count" in nq_config else 10
+            tolerance = nq_config["tolerance"] if "tolerance" in nq_config else 0.05
+            concurrency = nq_config["concurrency"] if "concurrency" in nq_config else 1
+            top_k = collection["top_k"]
+            search_param = collection["search_param"]
+            collection_info = {
+                "dimension": dimension,
+                "metric_type": metric_type,
+                "dataset_name": collection_name
+            }
+            if not milvus_instance.exists_collection():
+                logger.error("Table name: %s not existed" % collection_name)
+                return
+            vector_type = self.get_vector_type(data_type)
+            vec_field_name = utils.get_default_field_name(vector_type)
+            index_info = self.get_index_info(milvus_instance, vec_field_name)
+            milvus_instance.load_collection()
+            query_vectors = get_vectors_from_binary(max_nq, dimension, data_type)
+            logger.info("Start warm up query")
+            self.do_query(milvus_instance, collection_name, vec_field_name, [1], [1], 2, search_param=search_param)
+            logger.info("End warm up query")
+            res = self.do_find_best_nq(milvus_instance, vec_field_name, query_vectors, top_k, metric_type,
+                                       search_param, latency_cap, min_nq=min_nq, max_nq=max_nq, run_count=run_count,
+                                       percentile=percentile, tolerance=tolerance, concurrency=concurrency)
+            steps = res["steps"]
+            headers = ["Nq", "vectors/s", "avg", "p50", "p99", "marginal cost", "passed"]
+            data = [[r["vectors_per_second"], r["avg"], r["p50"], r["p99"], r.get("marginal_cost"), r["passed"]]
+                    for r in steps]
+            utils.print_table(headers, [r["nq"] for r in steps], data)
+            best = res["best"]
+            if best:
+                logger.info("Best nq under %s latency %sms: %d, vectors/s: %s, max nq: %d" % (
+                    percentile, latency_cap, best["nq"], best["vectors_per_second"], res["max_nq"]))
+            else:
+                logger.warning("Nq: %d over %s latency %sms" % (min_nq, percentile, latency_cap))
+            logger.info("Latency(ms) ~ %s + %s * nq" % (res["fixed_cost"], res["marginal_cost"]))
+            search_param_group = {
+                "topk": top_k,
+                "search_param": search_param,
+                "nq_optimize": nq_config
+            }
+            metric = self.report_wrapper(milvus_instance, self.env_value, self.hostname,
+                                         collection_info, index_info, search_param_group)
+            metric.metrics = {
+                "type": run_type,
+                "value": {
+                    "nq": best["nq"] if best else 0,
+                    "vectors_per_second": best["vectors_per_second"] if best else 0.0,
+                    "latency": {k: best[k] for k in ["avg", "p50", "p90", "p99", "max"]} if best else None,
+                    "max_nq": res["max_nq"] or 0,
+                    "fixed_cost": res["fixed_cost"],
+                    "marginal_cost": res["marginal_cost"],
+                    "steps": [{k: r.get(k) for k in ["nq", "vectors_per_second", "avg", "p99", "marginal_cost", "passed"]}
+                              for r in steps]
+                }
+            }
+            self.report_metric(milvus_instance, metric)
+
+        elif run_type == "workload":
+            (data_type, collection_size, dimension, metric_type) = parser.collection_parser(collection_name)
+            workload_config = collection["workload"]
+            operations = collection["operations"] if "operations" in collection else {}
+            latency_log = collection["latency_log"] if "latency_log" in collection else None
+            if not milvus_instance.exists_collection():
+                logger.error("Table name: %s not existed" % collection_name)
+                return
+            vector_type = self.get_vector_type(data_type)
+            vec_field_name = utils.get_default_field_name(vector_type)
+            # before the phased run, which may change the collection and takes minutes
+            index_info = self.get_index_info(milvus_instance, vec_field_name)
+            milvus_instance.load_collection()
+            res = self.do_workload(milvus_instance, vec_field_name, dimension, metric_type, operations,
+                                   workload_config, latency_log=latency_log)
+            headers = ["Phase", "type", "time(s)", "qps", "avg", "p50", "p99", "errors", "recovery(s)"]
+            data = [[r["type"], r["during_time"], r["qps"], r["avg"], r["p50"], r["p99"], r["errors"],
+                     r.get("recovery_time")] for r in res]
+            utils.print_table(headers, [r["phase"] for r in res], data)
+            collection_info = {
+                "dimension": dimension,
+                "metric_type": metric_type,
+                "dataset_name": collection_name
+            }
+            for r in res:
+                run_params = {"phase": r["phase"], "phase_type": r["type"], "during_time": r["during_time"],
+                              "operations": operations}
+                metric = self.report_wrapper(milvus_instance, self.env_value, self.hostname, collection_info,
+                                             index_info, {}, run_params=run_params)
+                metric.metrics = {
+                    "type": run_type,
+                    "value": {
+                        "qps": r["qps"],
+                        "avg_latency": r["avg"],
+                        "p99_latency": r["p99"],
+                        "errors": r["errors"],
+                        "recovery_time": r.get("recovery_time"),
+                        "ops": r["ops"]
+                    }
+                }
+                self.report_metric(milvus_instance, metric)
 
         elif run_type == "locust_insert_stress":
             pass
@@ -404,7 +1089,6 @@ class K8sRunner(Runner):
             build_index = collection["build_index"]
             if milvus_instance.exists_collection():
                 milvus_instance.drop()
-                time.sleep(10)
             index_info = {}
             search_params = {}
             vector_type = self.get_vector_type(data_type)
@@ -420,7 +1104,7 @@ class K8sRunner(Runner):
                     "index_param": index_param
                 }
                 milvus_instance.create_index(index_field_name, index_type, metric_type, index_param=index_param)
-                logger.debug(milvus_instance.describe_index())
+                self.get_index_info(milvus_instance, vec_field_name)
             if run_type in ["locust_search_performance", "locust_mix_performance"]:
                 res = self.do_insert(milvus_instance, collection_name, data_type, dimension, collection_size, ni_per)
                 if "flush" in collection and collection["flush"] == "no":
@@ -431,7 +1115,7 @@ class K8sRunner(Runner):
                     logger.debug("Start build index for last file")
                     milvus_instance.create_index(index_field_name, index_type, metric_type, _async=True,
                                                  index_param=index_param)
-                    logger.debug(milvus_instance.describe_index())
+                    self.get_index_info(milvus_instance, vec_field_name)
                 logger.debug("Table row counts: %d" % milvus_instance.count())
                 milvus_instance.load_collection()
                 logger.info("Start warm up query")
@@ -468,7 +1152,7 @@ class K8sRunner(Runner):
             metric.metrics = {
                 "type": run_type,
                 "value": locust_stats}
-            report(metric)
+            self.report_metric(milvus_instance, metric)
 
         elif run_type == "search_ids_stability":
             (data_type, collection_size, dimension, metric_type) = parser.collection_parser(
@@ -486,8 +1170,9 @@ class K8sRunner(Runner):
                 logger.error("Table name: %s not existed" % collection_name)
                 return
             logger.info(milvus_instance.count())
-            index_info = milvus_instance.describe_index()
-            logger.info(index_info)
+            vector_type = self.get_vector_type(data_type)
+            vec_field_name = utils.get_default_field_name(vector_type)
+            index_info = self.get_index_info(milvus_instance, vec_field_name)
             g_top_k = int(collection["top_ks"].split("-")[1])
             l_top_k = int(collection["top_ks"].split("-")[0])
             g_id = int(ids.split("-")[1])
@@ -496,8 +1181,9 @@ class K8sRunner(Runner):
             l_id_length = int(ids_length.split("-")[0])
 
             milvus_instance.load_collection()
-            # start_mem_usage = milvus_instance.get_mem_info()["memory_used"]
-            # logger.debug(start_mem_usage)
+            soak_config = collection["soak"] if "soak" in collection else {}
+            soak_monitor = monitor.get_soak_monitor(soak_config, self.get_server_rss)
+            soak_monitor.start()
             start_time = time.time()
             while time.time() < start_time + during_time * 60:
                 search_param = {}
@@ -507,17 +1193,24 @@ class K8sRunner(Runner):
                 for k, v in search_params.items():
                     search_param[k] = random.randint(int(v.split("-")[0]), int(v.split("-")[1]))
                 logger.debug("Query top-k: %d, ids_num: %d, param: %s" % (top_k, ids_num, json.dumps(search_param)))
+                query_start_time = time.time()
                 result = milvus_instance.query_ids(top_k, ids_param, search_param=search_param)
-            # end_mem_usage = milvus_instance.get_mem_info()["memory_used"]
+                soak_monitor.record_latency(time.time() - query_start_time)
+            soak_res = monitor.finish_soak_monitor(soak_monitor, soak_config, collection_name)
             metric = self.report_wrapper(milvus_instance, self.env_value, self.hostname, collection_info, index_info,
                                          {})
             metric.metrics = {
                 "type": "search_ids_stability",
                 "value": {
                     "during_time": during_time,
+                    "rss_slope": soak_res["rss_slope"],
+                    "latency_slope": soak_res["latency_slope"],
+                    "series_path": soak_res["series_path"]
                 }
             }
-            report(metric)
+            self.report_metric(milvus_instance, metric)
+            if soak_res["failures"]:
+                raise Exception("Soak budget exceeded: %s" % "; ".join(soak_res["failures"]))
 
         # for sift/deep datasets
         # TODO: enable
@@ -539,12 +1232,11 @@ class K8sRunner(Runner):
                 logger.error("Table name: %s not existed" % collection_name)
                 return
             logger.info(milvus_instance.count())
-            index_info = milvus_instance.describe_index()
-            logger.info(index_info)
-            milvus_instance.load_collection()
-            true_ids_all = self.get_groundtruth_ids(collection_size)
             vector_type = self.get_vector_type(data_type)
             vec_field_name = utils.get_default_field_name(vector_type)
+            index_info = self.get_index_info(milvus_instance, vec_field_name)
+            milvus_instance.load_collection()
+            true_ids_all = self.get_groundtruth_ids(collection_size)
             for search_param in search_params:
                 headers = ["Nq/Top-k"]
                 res = []
@@ -558,10 +1250,12 @@ class K8sRunner(Runner):
                             "metric_type": metric_type
                         }
                         logger.info("Query params: %s" % json.dumps(search_param_group))
+                        start_time = time.time()
                         result_ids = self.do_query_ids(milvus_instance, collection_name, vec_field_name, top_k, nq,
                                                        search_param=search_param)
+                        search_time = round(time.time() - start_time, 4)
                         # mem_used = milvus_instance.get_mem_info()["memory_used"]
-                        acc_value = self.get_recall_value(true_ids_all[:nq, :top_k].tolist(), result_ids)
+                        acc_value = self.get_recall_value(true_ids_all[:nq, :top_k], result_ids)
                         logger.info("Query accuracy: %s" % acc_value)
                         tmp_res.append(acc_value)
                         # logger.info("Memory usage: %s" % mem_used)
@@ -570,10 +1264,11 @@ class K8sRunner(Runner):
                         metric.metrics = {
                             "type": "accuracy",
                             "value": {
-                                "acc": acc_value
+                                "acc": acc_value,
+                                "search_time": search_time
                             }
                         }
-                        report(metric)
+                        self.report_metric(milvus_instance, metric)
                         # logger.info("Memory usage: %s" % mem_used)
                     res.append(tmp_res)
                 headers.extend([str(top_k) for top_k in top_ks])
@@ -603,7 +1298,6 @@ class K8sRunner(Runner):
             if milvus_instance.exists_collection(collection_name):
                 logger.info("Re-create collection: %s" % collection_name)
                 milvus_instance.drop()
-                time.sleep(DELETE_INTERVAL_TIME)
             true_ids = np.array(dataset["neighbors"])
             vector_type = self.get_vector_type_from_metric(metric_type)
             vec_field_name = utils.get_default_field_name(vector_type)
@@ -612,7 +1306,6 @@ class K8sRunner(Runner):
             # re-create collection
             if milvus_instance.exists_collection(collection_name):
                 milvus_instance.drop()
-                time.sleep(DELETE_INTERVAL_TIME)
             milvus_instance.create_collection(dimension, data_type=vector_type)
             insert_vectors = self.normalize(metric_type, np.array(dataset["train"]))
             if len(insert_vectors) != dataset["train"].shape[0]:
@@ -646,10 +1339,11 @@ class K8sRunner(Runner):
                     if milvus_instance.get_config("cluster.enable") == "true":
                         milvus_instance.create_index(vec_field_name, index_type, metric_type, _async=True,
                                                      index_param=index_param)
+                        milvus_instance.wait_index_built(vec_field_name, timeout=INDEX_BUILD_TIMEOUT)
                     else:
                         milvus_instance.create_index(vec_field_name, index_type, metric_type,
                                                      index_param=index_param)
-                    logger.info(milvus_instance.describe_index())
+                    self.get_index_info(milvus_instance, vec_field_name)
                     logger.info("Start load collection: %s" % collection_name)
                     milvus_instance.load_collection()
                     logger.info("End load collection: %s" % collection_name)
@@ -682,19 +1376,22 @@ class K8sRunner(Runner):
                                     result = milvus_instance.query(vector_query)
                                 warm_up = False
                                 logger.info("End warm up")
+                                start_time = time.time()
                                 result = milvus_instance.query(vector_query)
+                                search_time = round(time.time() - start_time, 4)
                                 result_ids = milvus_instance.get_ids(result)
-                                acc_value = self.get_recall_value(true_ids[:nq, :top_k].tolist(), result_ids)
+                                acc_value = self.get_recall_value(true_ids[:nq, :top_k], result_ids)
                                 logger.info("Query ann_accuracy: %s" % acc_value)
                                 metric = self.report_wrapper(milvus_instance, self.env_value, self.hostname,
                                                              collection_info, index_info, search_param_group)
                                 metric.metrics = {
                                     "type": "ann_accuracy",
                                     "value": {
-                                        "acc": acc_value
+                                        "acc": acc_value,
+                                        "search_time": search_time
                                     }
                                 }
-                                report(metric)
+                                self.report_metric(milvus_instance, metric)
 
         elif run_type == "search_stability":
             (data_type, collection_size, dimension, metric_type) = parser.collection_parser(
@@ -710,21 +1407,21 @@ class K8sRunner(Runner):
                 logger.error("Table name: %s not existed" % collection_name)
                 return
             logger.info(milvus_instance.count())
-            index_info = milvus_instance.describe_index()
-            logger.info(index_info)
+            vector_type = self.get_vector_type(data_type)
+            vec_field_name = utils.get_default_field_name(vector_type)
+            index_info = self.get_index_info(milvus_instance, vec_field_name)
             g_top_k = int(collection["top_ks"].split("-")[1])
             g_nq = int(collection["nqs"].split("-")[1])
             l_top_k = int(collection["top_ks"].split("-")[0])
             l_nq = int(collection["nqs"].split("-")[0])
             milvus_instance.load_collection()
-            # start_mem_usage = milvus_instance.get_mem_info()["memory_used"]
-            # logger.debug(start_mem_usage)
             start_row_count = milvus_instance.count()
-            logger.debug(milvus_instance.describe_index())
+            self.get_index_info(milvus_instance, vec_field_name)
             logger.info(start_row_count)
-            vector_type = self.get_vector_type(data_type)
-            vec_field_name = utils.get_default_field_name(vector_type)
             real_metric_type = utils.metric_type_trans(metric_type)
+            soak_config = collection["soak"] if "soak" in collection else {}
+            soak_monitor = monitor.get_soak_monitor(soak_config, self.get_server_rss)
+            soak_monitor.start()
             start_time = time.time()
             while time.time() < start_time + during_time * 60:
                 search_param = {}
@@ -732,7 +1429,7 @@ class K8sRunner(Runner):
                 nq = random.randint(l_nq, g_nq)
                 for k, v in search_params.items():
                     search_param[k] = random.randint(int(v.split("-")[0]), int(v.split("-")[1]))
-                query_vectors = [[random.random() for _ in range(dimension)] for _ in range(nq)]
+                query_vectors = utils.generate_vectors(nq, dimension)
                 logger.debug("Query nq: %d, top-k: %d, param: %s" % (nq, top_k, json.dumps(search_param)))
                 vector_query = {"vector": {vec_field_name: {
                     "topk": top_k,
@@ -740,17 +1437,24 @@ class K8sRunner(Runner):
                     "metric_type": real_metric_type,
                     "params": search_param}
                 }}
+                query_start_time = time.time()
                 milvus_instance.query(vector_query)
-            # end_mem_usage = milvus_instance.get_mem_info()["memory_used"]
+                soak_monitor.record_latency(time.time() - query_start_time)
+            soak_res = monitor.finish_soak_monitor(soak_monitor, soak_config, collection_name)
             metric = self.report_wrapper(milvus_instance, self.env_value, self.hostname, collection_info, index_info,
                                          {})
             metric.metrics = {
                 "type": "search_stability",
                 "value": {
                     "during_time": during_time,
+                    "rss_slope": soak_res["rss_slope"],
+                    "latency_slope": soak_res["latency_slope"],
+                    "series_path": soak_res["series_path"]
                 }
             }
-            report(metric)
+            self.report_metric(milvus_instance, metric)
+            if soak_res["failures"]:
+                raise Exception("Soak budget exceeded: %s" % "; ".join(soak_res["failures"]))
 
         elif run_type == "loop_stability":
             # init data
@@ -765,7 +1469,7 @@ class K8sRunner(Runner):
             index_param = {"nlist": 256}
             collection_names = []
             milvus_instances_map = {}
-            insert_vectors = [[random.random() for _ in range(dimension)] for _ in range(insert_xb)]
+            insert_vectors = utils.generate_vectors(insert_xb, dimension)
             ids = [i for i in range(insert_xb)]
             # initialize and prepare
             for i in range(collection_num):
@@ -778,13 +1482,13 @@ class K8sRunner(Runner):
                 index_type = random.choice(index_types)
                 field_name = utils.get_default_field_name()
                 milvus_instance.create_index(field_name, index_type, metric_type, index_param=index_param)
-                logger.info(milvus_instance.describe_index())
+                self.get_index_info(milvus_instance, field_name)
                 insert_vectors = utils.normalize(metric_type, insert_vectors)
                 entities = milvus_instance.generate_entities(insert_vectors, ids)
                 res_ids = milvus_instance.insert(entities, ids=ids)
                 milvus_instance.flush()
                 milvus_instances_map.update({name: milvus_instance})
-                logger.info(milvus_instance.describe_index())
+                self.get_index_info(milvus_instance, field_name)
 
                 # loop time unit: min -> s
             pull_interval_seconds = pull_interval * 60
@@ -822,7 +1526,7 @@ class K8sRunner(Runner):
                 # for name in collection_names:
                 #     milvus_instance = MilvusClient(collection_name=name, host=self.host)
                 #     milvus_instances_map.update({name: milvus_instance})
-                time.sleep(30)
+                milvus_instance.wait_serving()
                 i = i + 1
 
         elif run_type == "stability":
@@ -839,15 +1543,13 @@ class K8sRunner(Runner):
                 logger.error(milvus_instance.show_collections())
                 raise Exception("Table name: %s not existed" % collection_name)
             logger.info(milvus_instance.count())
-            index_info = milvus_instance.describe_index()
-            logger.info(index_info)
-            # start_mem_usage = milvus_instance.get_mem_info()["memory_used"]
-            start_row_count = milvus_instance.count()
-            logger.info(start_row_count)
             vector_type = self.get_vector_type(data_type)
             vec_field_name = utils.get_default_field_name(vector_type)
+            index_info = self.get_index_info(milvus_instance, vec_field_name)
+            start_row_count = milvus_instance.count()
+            logger.info(start_row_count)
             real_metric_type = utils.metric_type_trans(metric_type)
-            query_vectors = [[random.random() for _ in range(dimension)] for _ in range(10000)]
+            query_vectors = utils.generate_vectors(10000, dimension)
             if "insert" in operations:
                 insert_xb = operations["insert"]["xb"]
             if "delete" in operations:
@@ -858,6 +1560,9 @@ class K8sRunner(Runner):
                 g_nq = int(operations["query"]["nqs"].split("-")[1])
                 l_nq = int(operations["query"]["nqs"].split("-")[0])
                 search_params = operations["query"]["search_params"]
+            soak_config = collection["soak"] if "soak" in collection else {}
+            soak_monitor = monitor.get_soak_monitor(soak_config, self.get_server_rss)
+            soak_monitor.start()
             i = 0
             start_time = time.time()
             while time.time() < start_time + during_time * 60:
@@ -867,7 +1572,7 @@ class K8sRunner(Runner):
                     try:
                         if name == "insert":
                             insert_ids = random.sample(list(range(collection_size)), insert_xb)
-                            insert_vectors = [[random.random() for _ in range(dimension)] for _ in range(insert_xb)]
+                            insert_vectors = utils.generate_vectors(insert_xb, dimension)
                             entities = milvus_instance.generate_entities(insert_vectors, insert_ids)
                             milvus_instance.insert(entities, ids=insert_ids)
                         elif name == "delete":
@@ -886,7 +1591,9 @@ class K8sRunner(Runner):
                                 "metric_type": real_metric_type,
                                 "params": search_param}
                             }}
+                            query_start_time = time.time()
                             result = milvus_instance.query(vector_query)
+                            soak_monitor.record_latency(time.time() - query_start_time)
                         elif name in ["flush", "compact"]:
                             func = getattr(milvus_instance, name)
                             func()
@@ -896,7 +1603,7 @@ class K8sRunner(Runner):
                         logger.error(str(e))
                         raise
                 logger.debug("Loop time: %d" % i)
-            # end_mem_usage = milvus_instance.get_mem_info()["memory_used"]
+            soak_res = monitor.finish_soak_monitor(soak_monitor, soak_config, collection_name)
             end_row_count = milvus_instance.count()
             metric = self.report_wrapper(milvus_instance, self.env_value, self.hostname, collection_info, index_info,
                                          {})
@@ -904,14 +1611,50 @@ class K8sRunner(Runner):
                 "type": "stability",
                 "value": {
                     "during_time": during_time,
-                    "row_count_increments": end_row_count - start_row_count
+                    "row_count_increments": end_row_count - start_row_count,
+                    "rss_slope": soak_res["rss_slope"],
+                    "latency_slope": soak_res["latency_slope"],
+                    "series_path": soak_res["series_path"]
+                }
+            }
+            self.report_metric(milvus_instance, metric)
+            if soak_res["failures"]:
+                raise Exception("Soak budget exceeded: %s" % "; ".join(soak_res["failures"]))
+
+        elif run_type == "meta_scalability":
+            dimension = collection["dimension"] if "dimension" in collection else 128
+            collection_nums = collection["collection_nums"]
+            partition_num = collection["partition_num"] if "partition_num" in collection else 0
+            sample_count = collection["sample_count"] if "sample_count" in collection else 10
+            growth_threshold = collection["growth_threshold"] if "growth_threshold" in collection else 1.0
+            collection_info = {
+                "dimension": dimension,
+                "dataset_name": "meta_scalability"
+            }
+            res = self.do_meta_scalability(milvus_instance, collection_nums, dimension, partition_num=partition_num,
+                                           sample_count=sample_count, growth_threshold=growth_threshold)
+            for level in res["levels"]:
+                run_params = {"collection_num": level["collection_num"], "partition_num": level["partition_num"]}
+                metric = self.report_wrapper(milvus_instance, self.env_value, self.hostname, collection_info, {},
+                                             {}, run_params=run_params)
+                metric.metrics = {
+                    "type": run_type,
+                    "value": level
+                }
+                self.report_metric(milvus_instance, metric)
+            metric = self.report_wrapper(milvus_instance, self.env_value, self.hostname, collection_info, {}, {})
+            metric.metrics = {
+                "type": run_type,
+                "value": {
+                    "growth": res["growth"],
+                    "superlinear": res["superlinear"]
                 }
             }
-            report(metric)
+            self.report_metric(milvus_instance, metric)
 
         elif run_type == "debug":
             time.sleep(7200)
-            default_insert_vectors = [[random.random() for _ in range(128)] for _ in range(500000)]
+            default_insert_vectors = utils.generate_vectors(500000, 128)
             interval = 50000
             for loop in range(1, 7):
                 insert_xb = loop * interval
@@ -0,0 +1,256 @@
+"""
+Attribute slow requests to server events happening at the same time, offline from files.
+
+Inputs:
+    - latency log written by the benchmark (--latency-log), one json line per request:
+      {"ts": 1602812345.12, "worker": 0, "latency_ms": 12.3, "ok": true}
+    - server logs (--server-log), zap json lines like
+      {"level": "INFO", "time": "2020/10/16 10:00:00.123 +08:00", "message": "flush segment", ...},
+      lines starting with a "[2020-10-16 10:00:00.123]" timestamp are read as plain text
+    - metrics scrapes (--metrics), one json line per sample: {"ts": 1602812345.0, "name": "...", "value": 3},
+      each increase of a counter between two scrapes is an event over the scrape interval
+
+Each log line or counter name is matched against EVENT_PATTERNS to get its event type. A request
+is slow if its latency is over the given percentile. For each event type the share of slow requests
+with an event in their window [start - before, end + after] is compared with the share of the other
+requests, with the latency percentiles of the requests with and without such an event.
+
+Usage:
+    python3 latency_analyzer.py --latency-log logs/latency.jsonl --server-log milvus.log \
+        --metrics metrics.jsonl --percentile 99.9 --before 1
+"""
+import re
+import json
+import time
+import logging
+import argparse
+import datetime
+from collections import defaultdict
+import numpy as np
+import tableprint as tp
+
+logger = logging.getLogger("milvus_benchmark.latency_analyzer")
+
+EVENT_PATTERNS = [
+    ("flush", r"flush"),
+    ("compaction", r"compact|merge segment"),
+    ("index_build", r"build.?index|index.?build|create.?index|index ?node|index task"),
+    ("segment_load", r"load.?segment|segment.?load|load.?collection|load.?partition"),
+    ("segment_release", r"release"),
+    ("gc", r"\bgc\b|garbage"),
+    ("insert", r"insert"),
+    ("delete", r"delete")
+]
+TIME_FORMATS = ["%Y/%m/%d %H:%M:%S.%f %z", "%Y/%m/%d %H:%M:%S %z", "%Y-%m-%d %H:%M:%S.%f", "%Y-%m-%d %H:%M:%S"]
+PLAIN_LINE_PATTERN = r"^\[?(\d{4}[-/]\d{2}[-/]\d{2}[ T]\d{2}:\d{2}:\d{2}(?:\.\d+)?)\]?\s*(.*)$"
+DEFAULT_PERCENTILE = 99.9
+
+
+def compile_patterns(patterns):
+    return [(event_type, re.compile(pattern, re.IGNORECASE)) for event_type, pattern in patterns]
+
+
+def classify(text, patterns):
+    for event_type, pattern in patterns:
+        if pattern.search(text):
+            return event_type
+    return None
+
+
+def parse_time(value):
+    """
+    Epoch seconds of a log time, a number or a string in TIME_FORMATS or iso format, naive times are local
+    """
+    if isinstance(value, (int, float)):
+        # zap epoch time may be in seconds or milliseconds
+        return value / 1000.0 if value > 1e11 else float(value)
+    value = value.strip()
+    for fmt in TIME_FORMATS:
+        try:
+            dt = datetime.datetime.strptime(value, fmt)
+            break
+        except ValueError:
+            continue
+    else:
+        dt = datetime.datetime.fromisoformat(value.replace("Z", "+00:00"))
+    if dt.tzinfo is None:
+        return time.mktime(dt.timetuple()) + dt.microsecond / 1e6
+    return dt.timestamp()
+
+
+def load_latency_log(file_path):
+    '''
+    @return:
+        start time(s), latency(ms) and ok of the requests, as arrays sorted by start time
+    '''
+    starts, latencies, oks = [], [], []
+    with open(file_path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            starts.append(record["ts"])
+            latencies.append(record["latency_ms"])
+            oks.append(record.get("ok", True))
+    order = np.argsort(starts, kind="stable")
+    return np.array(starts)[order], np.array(latencies, dtype=np.float64)[order], np.array(oks, dtype=bool)[order]
+
+
+def load_server_events(file_path, patterns, offset=0.0):
+    """
+    Return [(start, end, type)] of the server log lines matching a pattern, offset(s) is added to the log time
+    """
+    events = []
+    skipped = 0
+    with open(file_path, errors="replace") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                if line.startswith("{"):
+                    record = json.loads(line)
+                    ts = record.get("ts", record.get("time"))
+                    text = " ".join(str(record.get(k, "")) for k in ["msg", "message", "caller"])
+                else:
+                    match = re.match(PLAIN_LINE_PATTERN, line)
+                    if not match:
+                        continue
+                    ts, text = match.group(1).replace("T", " ").replace("/", "-"), match.group(2)
+                if ts is None:
+                    continue
+                event_type = classify(text, patterns)
+                if event_type:
+                    ts = parse_time(ts) + offset
+                    events.append((ts, ts, event_type))
+            except ValueError:
+                skipped += 1
+    if skipped:
+        logger.warning("Skip %d lines not parsed in: %s" % (skipped, file_path))
+    return events
+
+
+def load_metric_events(file_path, patterns, offset=0.0):
+    """
+    Return [(start, end, type)] for each increase of a matching counter between two scrapes
+    """
+    samples = defaultdict(list)
+    with open(file_path) as f:
+        for line in f:
+            if not line.strip():
+                continue
+            record = json.loads(line)
+            key = (record["name"], json.dumps(record.get("labels", {}), sort_keys=True))
+            samples[key].append((parse_time(record["ts"]) + offset, float(record["value"])))
+    events = []
+    for (name, _), points in samples.items():
+        event_type = classify(name, patterns)
+        if not event_type:
+            continue
+        points.sort()
+        for (prev_ts, prev_value), (ts, value) in zip(points, points[1:]):
+            if value > prev_value:
+                events.append((prev_ts, ts, event_type))
+    return events
+
+
+def _percentile(values, q):
+    return round(float(np.percentile(values, q)), 3) if len(values) else None
+
+
+def analyze(starts, latencies, events, percentile=DEFAULT_PERCENTILE, before=1.0, after=0.0):
+    '''
+    @params:
+        starts, latencies: start time(s) and latency(ms) of the requests
+        events: [(start, end, type)]
+        before, after: seconds the window of a request is extended by
+    @return:
+        {"threshold_ms", "requests", "slow", "types": [stats of each event type, most over-represented first]}
+    '''
+    threshold = float(np.percentile(latencies, percentile))
+    slow = latencies > threshold
+    # a request at the threshold is not slow, keep at least one slow request
+    if not slow.any():
+        slow = latencies >= threshold
+    window_start = starts - before
+    window_end = starts + latencies / 1000.0 + after
+    by_type = defaultdict(list)
+    for start, end, event_type in events:
+        by_type[event_type].append((start, end))
+    res = {"threshold_ms": round(threshold, 3), "requests": len(latencies), "slow": int(slow.sum()), "types": []}
+    for event_type, intervals in by_type.items():
+        event_starts = np.sort([i[0] for i in intervals])
+        event_ends = np.sort([i[1] for i in intervals])
+        # events overlapping [window_start, window_end]: started before the end, minus ended before the start
+        counts = np.searchsorted(event_starts, window_end, side="right") - \
+            np.searchsorted(event_ends, window_start, side="left")
+        hit = counts > 0
+        slow_hit = hit[slow].mean() if slow.any() else 0.0
+        base_hit = hit[~slow].mean() if (~slow).any() else 0.0
+        res["types"].append({
+            "type": event_type,
+            "events": len(intervals),
+            "slow_with_event": int((hit & slow).sum()),
+            "slow_share": round(float(slow_hit), 4),
+            "other_share": round(float(base_hit), 4),
+            # how many times more often the event is around a slow request than around the others
+            "lift": round(float(slow_hit / base_hit), 3) if base_hit else (float("inf") if slow_hit else 0.0),
+            "p50_with": _percentile(latencies[hit], 50),
+            "p99_with": _percentile(latencies[hit], 99),
+            "p50_without": _percentile(latencies[~hit], 50),
+            "p99_without": _percentile(latencies[~hit], 99)
+        })
+    res["types"].sort(key=lambda item: (item["lift"], item["slow_share"]), reverse=True)
+    return res
+
+
+def print_result(res):
+    logger.info("Requests: %d, slow: %d, threshold: %sms" % (res["requests"], res["slow"], res["threshold_ms"]))
+    headers = ["Event", "events", "slow with event", "slow share", "other share", "lift",
+               "p50 with", "p99 with", "p50 without", "p99 without"]
+    rows = [[item[k] for k in ["type", "events", "slow_with_event", "slow_share", "other_share", "lift",
+                               "p50_with", "p99_with", "p50_without", "p99_without"]] for item in res["types"]]
+    if rows:
+        tp.table(rows, headers)
+    else:
+        logger.info("No server events found")
+
+
+def main():
+    arg_parser = argparse.ArgumentParser(
+        formatter_class=argparse.ArgumentDefaultsHelpFormatter)
+    arg_parser.add_argument("--latency-log", required=True, help="latency log of the benchmark, json lines")
+    arg_parser.add_argument("--server-log", action="append", default=[], help="server log file, repeatable")
+    arg_parser.add_argument("--metrics", action="append", default=[], help="metrics scrape file, repeatable")
+    arg_parser.add_argument("--percentile", type=float, default=DEFAULT_PERCENTILE, help="slow request percentile")
+    arg_parser.add_argument("--before", type=float, default=1.0, help="seconds before a request in its window")
+    arg_parser.add_argument("--after", type=float, default=0.0, help="seconds after a request in its window")
+    arg_parser.add_argument("--offset", type=float, default=0.0, help="seconds added to the server times")
+    arg_parser.add_argument("--pattern", action="append", default=[],
+                            help="extra event pattern as type=regex, checked before the default ones")
+    arg_parser.add_argument("--output", help="save the result as json")
+    args = arg_parser.parse_args()
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+    patterns = compile_patterns([tuple(p.split("=", 1)) for p in args.pattern] + EVENT_PATTERNS)
+    starts, latencies, oks = load_latency_log(args.latency_log)
+    if not oks.all():
+        logger.info("Skip %d failed requests" % (~oks).sum())
+    starts, latencies = starts[oks], latencies[oks]
+    if not len(latencies):
+        raise Exception("No successful requests in: %s" % args.latency_log)
+    events = []
+    for file_path in args.server_log:
+        events.extend(load_server_events(file_path, patterns, offset=args.offset))
+    for file_path in args.metrics:
+        events.extend(load_metric_events(file_path, patterns, offset=args.offset))
+    logger.info("Requests: %.3f - %.3f, events: %d" % (starts[0], starts[-1], len(events)))
+    res = analyze(starts, latencies, events, percentile=args.percentile, before=args.before, after=args.after)
+    print_result(res)
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(res, f, indent=2)
+        logger.info("Result saved in: %s" % args.output)
+
+
+if __name__ == "__main__":
+    main()
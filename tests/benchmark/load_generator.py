@@ -0,0 +1,86 @@
+import os
+import time
+import json
+import logging
+import threading
+
+logger = logging.getLogger("milvus_benchmark.load_generator")
+
+
+def write_latency_log(file_path, records):
+    """
+    Write one json line per request: start time, worker, latency(ms) and status
+    """
+    dir_name = os.path.dirname(file_path)
+    if dir_name and not os.path.exists(dir_name):
+        os.makedirs(dir_name)
+    with open(file_path, "a") as f:
+        for record in records:
+            f.write(json.dumps(record) + "\n")
+    logger.info("Latency log saved in: %s" % file_path)
+
+
+def run_closed_loop(request, concurrency, during_time=None, total=None, latency_log=None, tags=None):
+    '''
+    Run request in concurrency threads, each thread sends the next request once the previous one returns
+    @params:
+        request: callable(worker_idx), one request
+        during_time: seconds to run
+        total: requests count to run, one of during_time and total is required
+        latency_log: if given, the latency of each request is appended to this file
+        tags: dict added to each record of the latency log
+    @return:
+        {"latencies": seconds of the successful requests, "errors", "time", "qps"}
+    '''
+    if during_time is None and total is None:
+        raise Exception("During time or total count is required")
+    lock = threading.Lock()
+    latencies = []
+    records = []
+    counter = {"sent": 0, "errors": 0}
+    start_time = time.time()
+    deadline = start_time + during_time if during_time is not None else None
+
+    def next_request():
+        with lock:
+            if total is not None and counter["sent"] >= total:
+                return False
+            counter["sent"] += 1
+        return deadline is None or time.time() < deadline
+
+    def worker(worker_idx):
+        while next_request():
+            ts = time.time()
+            req_start = time.perf_counter()
+            ok = True
+            try:
+                request(worker_idx)
+            except Exception as e:
+                ok = False
+                logger.debug(str(e))
+            latency = time.perf_counter() - req_start
+            with lock:
+                if ok:
+                    latencies.append(latency)
+                else:
+                    counter["errors"] += 1
+                if latency_log:
+                    record = {"ts": ts, "worker": worker_idx, "latency_ms": round(latency * 1000, 3), "ok": ok}
+                    if tags:
+                        record.update(tags)
+                    records.append(record)
+
+    threads = [threading.Thread(target=worker, args=(i,), daemon=True) for i in range(concurrency)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    total_time = time.time() - start_time
+    if latency_log:
+        write_latency_log(latency_log, records)
+    return {
+        "latencies": latencies,
+        "errors": counter["errors"],
+        "time": round(total_time, 2),
+        "qps": round(len(latencies) / total_time, 2) if total_time else 0.0
+    }
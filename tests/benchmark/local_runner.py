@@ -14,13 +14,15 @@ from queue import Queue
 import locust_user
 from milvus import DataType
 from client import MilvusClient
-from runner import Runner
+from runner import Runner, get_vectors_from_binary
+import monitor
+import build_monitor
 import utils
 import parser
 
 
-DELETE_INTERVAL_TIME = 5
 INSERT_INTERVAL = 50000
+MAX_QUERY_VECTORS = 10000
 logger = logging.getLogger("milvus_benchmark.local_runner")
 
 
@@ -31,11 +33,33 @@ class LocalRunner(Runner):
         self.host = host
         self.port = port
 
+    def get_rss_probe(self):
+        """
+        Rss of the server process, read from the local /proc, None if the server is on another host
+        """
+        if not utils.is_local_host(self.host):
+            logger.warning("Server host: %s is not local, server rss is not sampled" % self.host)
+            return None
+        return utils.get_process_rss
+
+    def print_client_profile(self, milvus_instance):
+        profiler = milvus_instance.get_profiler()
+        if profiler is None:
+            return
+        summary = profiler.summary()
+        if summary:
+            headers = ["Op", "count", "encode(ms)", "rpc(ms)", "decode(ms)", "client overhead(%)"]
+            data = [[v["count"], v["encode_ms"], v["rpc_ms"], v["decode_ms"], v["overhead"]] for v in summary.values()]
+            utils.print_table(headers, list(summary.keys()), data)
+        profiler.reset()
+
     def run(self, run_type, collection):
         logger.debug(run_type)
         logger.debug(collection)
         collection_name = collection["collection_name"] if "collection_name" in collection else None
         milvus_instance = MilvusClient(collection_name=collection_name, host=self.host, port=self.port)
+        if "client_profile" in collection and collection["client_profile"]:
+            milvus_instance.enable_profiler()
         logger.info(milvus_instance.show_collections())
         # TODO:
         # self.env_value = milvus_instance.get_server_config()
@@ -51,7 +75,6 @@ class LocalRunner(Runner):
             build_index = collection["build_index"]
             if milvus_instance.exists_collection():
                 milvus_instance.drop()
-                time.sleep(10)
             vector_type = self.get_vector_type(data_type)
             other_fields = collection["other_fields"] if "other_fields" in collection else None
             milvus_instance.create_collection(dimension, data_type=vector_type, other_fields=other_fields)
@@ -67,6 +90,30 @@ class LocalRunner(Runner):
                 logger.debug("Start build index for last file")
                 milvus_instance.create_index(index_field_name, index_type, metric_type, index_param=index_param)
 
+        elif run_type == "build_monitor":
+            (data_type, collection_size, dimension, metric_type) = parser.collection_parser(collection_name)
+            index_type = collection["index_type"]
+            index_param = collection["index_param"]
+            monitor_config = collection["build_monitor"] if "build_monitor" in collection else {}
+            nq = monitor_config["nq"] if "nq" in monitor_config else 1
+            top_k = monitor_config["top_k"] if "top_k" in monitor_config else 10
+            search_param = monitor_config["search_param"] if "search_param" in monitor_config else {}
+            if not milvus_instance.exists_collection():
+                logger.error("Table name: %s not existed" % collection_name)
+                return
+            vector_type = self.get_vector_type(data_type)
+            index_field_name = utils.get_default_field_name(vector_type)
+            milvus_instance.load_collection()
+            query_vectors = get_vectors_from_binary(nq, dimension, data_type)
+            cpu_probe = build_monitor.get_cpu_rate_probe(utils.get_process_cpu_time)
+            res, series = self.do_build_monitor(milvus_instance, collection_name, index_field_name, index_type,
+                                                metric_type, index_param, query_vectors, top_k, search_param,
+                                                cpu_probe, monitor_config)
+            headers = ["Time(s)", "progress", "segments", "cpu", "searches", "p50(ms)", "p99(ms)"]
+            data = [[p["progress"], "%s/%s" % (p["indexed_segments"], p["segments"]), p["cpu"], p["count"],
+                     p["p50_ms"], p["p99_ms"]] for p in series]
+            utils.print_table(headers, [p["time"] for p in series], data)
+
         elif run_type == "delete_performance":
             (data_type, collection_size, dimension, metric_type) = parser.collection_parser(collection_name)
             ni_per = collection["ni_per"]
@@ -109,6 +156,26 @@ class LocalRunner(Runner):
             end_mem_usage = milvus_instance.get_mem_info()["memory_used"]
             logger.debug("Diff memory: %s, current memory usage: %s, build time: %s" % ((end_mem_usage - start_mem_usage), end_mem_usage, round(end_time - start_time, 1)))
 
+        elif run_type == "get_ids_bulk_performance":
+            (data_type, collection_size, dimension, metric_type) = parser.collection_parser(collection_name)
+            ids_num = collection["ids_num"]
+            chunk_sizes = collection["chunk_sizes"]
+            concurrencies = collection["concurrencies"]
+            run_count = collection["run_count"] if "run_count" in collection else 1
+            if not milvus_instance.exists_collection():
+                logger.error("Table name: %s not existed" % collection_name)
+                return
+            milvus_instance.load_collection()
+            get_ids = milvus_instance.get_rand_ids(ids_num)
+            logger.info("Get %d ids" % len(get_ids))
+            res = self.do_get_bulk(milvus_instance, get_ids, chunk_sizes, concurrencies, run_count=run_count)
+            headers = ["Chunk size/Concurrency"]
+            headers.extend([str(concurrency) for concurrency in concurrencies])
+            data = [[res[(chunk_size, concurrency)]["throughput"] for concurrency in concurrencies]
+                    for chunk_size in chunk_sizes]
+            logger.info("Ids/s of %d ids" % len(get_ids))
+            utils.print_table(headers, chunk_sizes, data)
+
         elif run_type == "search_performance":
             (data_type, collection_size,  dimension, metric_type) = parser.collection_parser(collection_name)
             run_count = collection["run_count"]
@@ -134,8 +201,7 @@ class LocalRunner(Runner):
             vector_type = self.get_vector_type(data_type)
             vec_field_name = utils.get_default_field_name(vector_type)
             logger.info(milvus_instance.count())
-            result = milvus_instance.describe_index()
-            logger.info(result)
+            self.get_index_info(milvus_instance, vec_field_name)
             milvus_instance.preload_collection()
             mem_usage = milvus_instance.get_mem_info()["memory_used"]
             logger.info(mem_usage)
@@ -157,9 +223,167 @@ class LocalRunner(Runner):
                     headers.extend([str(top_k) for top_k in top_ks])
                     logger.info("Search param: %s" % json.dumps(search_param))
                     utils.print_table(headers, nqs, res)
+                    self.print_client_profile(milvus_instance)
                     mem_usage = milvus_instance.get_mem_info()["memory_used"]
                     logger.info(mem_usage)
 
+        elif run_type == "coalesce_performance":
+            (data_type, collection_size, dimension, metric_type) = parser.collection_parser(collection_name)
+            top_k = collection["top_k"]
+            search_param = collection["search_param"]
+            concurrency = collection["concurrency"]
+            during_time = utils.timestr_to_int(collection["during_time"])
+            windows = collection["windows"] if "windows" in collection else [0.002]
+            max_batch = collection["max_batch"] if "max_batch" in collection else None
+            if not milvus_instance.exists_collection():
+                logger.error("Table name: %s not existed" % collection_name)
+                return
+            vector_type = self.get_vector_type(data_type)
+            vec_field_name = utils.get_default_field_name(vector_type)
+            milvus_instance.load_collection()
+            query_vectors = get_vectors_from_binary(MAX_QUERY_VECTORS, dimension, data_type)
+            res = self.do_coalesce_compare(milvus_instance, vec_field_name, query_vectors, top_k, metric_type,
+                                           search_param, concurrency, during_time, windows, max_batch=max_batch)
+            headers = ["Window(ms)", "qps", "avg", "p50", "p90", "p99", "batch size", "errors"]
+            columns = ["off" if r["window"] is None else str(r["window"] * 1000) for r in res]
+            data = [[r["qps"], r["avg"], r["p50"], r["p90"], r["p99"], r["avg_batch_size"], r["errors"]] for r in res]
+            utils.print_table(headers, columns, data)
+
+        elif run_type == "cache_performance":
+            (data_type, collection_size, dimension, metric_type) = parser.collection_parser(collection_name)
+            top_k = collection["top_k"]
+            search_param = collection["search_param"]
+            concurrency = collection["concurrency"] if "concurrency" in collection else 1
+            query_count = collection["query_count"]
+            distinct_num = collection["distinct_num"] if "distinct_num" in collection else MAX_QUERY_VECTORS
+            zipf_s = collection["zipf_s"] if "zipf_s" in collection else 1.0
+            ttl = utils.timestr_to_int(collection["ttl"]) if "ttl" in collection else None
+            # like 16Mi, 1Gi
+            cache_sizes = [int(utils.parse_memory_quantity(str(size))) for size in collection["cache_sizes"]]
+            if not milvus_instance.exists_collection():
+                logger.error("Table name: %s not existed" % collection_name)
+                return
+            vector_type = self.get_vector_type(data_type)
+            vec_field_name = utils.get_default_field_name(vector_type)
+            milvus_instance.load_collection()
+            query_vectors = get_vectors_from_binary(distinct_num, dimension, data_type)
+            res = self.do_cache_replay(milvus_instance, vec_field_name, query_vectors, top_k, metric_type,
+                                       search_param, concurrency, query_count, cache_sizes, zipf_s=zipf_s, ttl=ttl)
+            headers = ["Cache size", "qps", "avg", "p99", "hit rate", "cached bytes", "evictions", "errors"]
+            columns = ["off" if r["cache_size"] is None else str(r["cache_size"]) for r in res]
+            data = [[r["qps"], r["avg"], r["p99"], r["hit_rate"], r["cached_bytes"], r["evictions"], r["errors"]]
+                    for r in res]
+            utils.print_table(headers, columns, data)
+
+        elif run_type == "slo_search":
+            (data_type, collection_size, dimension, metric_type) = parser.collection_parser(collection_name)
+            slo = collection["slo"]
+            nq = collection["nq"] if "nq" in collection else 1
+            top_k = collection["top_k"]
+            search_param = collection["search_param"]
+            min_clients = collection["min_clients"] if "min_clients" in collection else 1
+            max_clients = collection["max_clients"]
+            step_time = utils.timestr_to_int(collection["step_time"]) if "step_time" in collection else 60
+            warm_up = utils.timestr_to_int(collection["warm_up"]) if "warm_up" in collection else 10
+            latency_log = collection["latency_log"] if "latency_log" in collection else None
+            max_error_rate = slo["error_rate"] if "error_rate" in slo else 0.0
+            recall_nq = min(slo["recall_nq"] if "recall_nq" in slo else 1000, MAX_QUERY_VECTORS)
+            if not milvus_instance.exists_collection():
+                logger.error("Table name: %s not existed" % collection_name)
+                return
+            vector_type = self.get_vector_type(data_type)
+            vec_field_name = utils.get_default_field_name(vector_type)
+            milvus_instance.load_collection()
+            # the load requests take their nq vectors from the pool in turn
+            query_pool = get_vectors_from_binary(MAX_QUERY_VECTORS, dimension, data_type)
+            query_vectors = query_pool[:nq]
+            recall = None
+            if "recall" in slo:
+                # recall depends on the search params, not on the load, check it once before the search,
+                # on recall_nq queries whatever the nq of the load
+                vector_query = {"vector": {vec_field_name: {
+                    "topk": top_k,
+                    "query": query_pool[:recall_nq],
+                    "metric_type": utils.metric_type_trans(metric_type),
+                    "params": search_param}
+                }}
+                result_ids = milvus_instance.get_ids(milvus_instance.query(vector_query), top_k=top_k)
+                recall = self.get_recall_value(self.get_groundtruth_ids(collection_size)[:recall_nq, :top_k],
+                                               result_ids)
+                logger.info("Recall: %s, slo: %s" % (recall, slo["recall"]))
+            best, steps = None, []
+            if recall is None or recall >= slo["recall"]:
+                best, steps = self.do_find_max_qps(milvus_instance, vec_field_name, query_vectors, top_k, metric_type,
+                                                   search_param, slo["p99"], min_clients, max_clients, step_time,
+                                                   warm_up=warm_up, max_error_rate=max_error_rate,
+                                                   query_pool=query_pool, latency_log=latency_log)
+            else:
+                logger.warning("Recall: %s under slo: %s, skip the load search" % (recall, slo["recall"]))
+            headers = ["Clients", "qps", "avg", "p50", "p90", "p99", "error rate", "passed"]
+            data = [[r["qps"], r["avg"], r["p50"], r["p90"], r["p99"], r["error_rate"], r["passed"]] for r in steps]
+            utils.print_table(headers, [r["clients"] for r in steps], data)
+            if best:
+                logger.info("Max qps under slo: %s, clients: %d, latency(ms): avg %s, p50 %s, p90 %s, p99 %s, max %s" % (
+                    best["qps"], best["clients"], best["avg"], best["p50"], best["p90"], best["p99"], best["max"]))
+            else:
+                logger.warning("No load meets slo: %s" % json.dumps(slo))
+
+        elif run_type == "nq_optimize":
+            (data_type, collection_size, dimension, metric_type) = parser.collection_parser(collection_name)
+            nq_config = collection["nq_optimize"]
+            latency_cap = nq_config["latency"]
+            percentile = nq_config["percentile"] if "percentile" in nq_config else "p99"
+            min_nq = nq_config["min_nq"] if "min_nq" in nq_config else 1
+            max_nq = min(nq_config["max_nq"] if "max_nq" in nq_config else MAX_QUERY_VECTORS, MAX_QUERY_VECTORS)
+            run_count = nq_config["run_count"] if "run_count" in nq_config else 10
+            tolerance = nq_config["tolerance"] if "tolerance" in nq_config else 0.05
+            concurrency = nq_config["concurrency"] if "concurrency" in nq_config else 1
+            top_k = collection["top_k"]
+            search_param = collection["search_param"]
+            if not milvus_instance.exists_collection():
+                logger.error("Table name: %s not existed" % collection_name)
+                return
+            vector_type = self.get_vector_type(data_type)
+            vec_field_name = utils.get_default_field_name(vector_type)
+            milvus_instance.load_collection()
+            query_vectors = get_vectors_from_binary(max_nq, dimension, data_type)
+            logger.info("Start warm up query")
+            self.do_query(milvus_instance, collection_name, vec_field_name, [1], [1], 2, search_param=search_param)
+            logger.info("End warm up query")
+            res = self.do_find_best_nq(milvus_instance, vec_field_name, query_vectors, top_k, metric_type,
+                                       search_param, latency_cap, min_nq=min_nq, max_nq=max_nq, run_count=run_count,
+                                       percentile=percentile, tolerance=tolerance, concurrency=concurrency)
+            steps = res["steps"]
+            headers = ["Nq", "vectors/s", "avg", "p50", "p99", "marginal cost", "passed"]
+            data = [[r["vectors_per_second"], r["avg"], r["p50"], r["p99"], r.get("marginal_cost"), r["passed"]]
+                    for r in steps]
+            utils.print_table(headers, [r["nq"] for r in steps], data)
+            best = res["best"]
+            if best:
+                logger.info("Best nq under %s latency %sms: %d, vectors/s: %s, max nq: %d" % (
+                    percentile, latency_cap, best["nq"], best["vectors_per_second"], res["max_nq"]))
+            else:
+                logger.warning("Nq: %d over %s latency %sms" % (min_nq, percentile, latency_cap))
+            logger.info("Latency(ms) ~ %s + %s * nq" % (res["fixed_cost"], res["marginal_cost"]))
+
+        elif run_type == "workload":
+            (data_type, collection_size, dimension, metric_type) = parser.collection_parser(collection_name)
+            workload_config = collection["workload"]
+            operations = collection["operations"] if "operations" in collection else {}
+            latency_log = collection["latency_log"] if "latency_log" in collection else None
+            if not milvus_instance.exists_collection():
+                logger.error("Table name: %s not existed" % collection_name)
+                return
+            vector_type = self.get_vector_type(data_type)
+            vec_field_name = utils.get_default_field_name(vector_type)
+            milvus_instance.load_collection()
+            res = self.do_workload(milvus_instance, vec_field_name, dimension, metric_type, operations,
+                                   workload_config, latency_log=latency_log)
+            headers = ["Phase", "type", "time(s)", "qps", "avg", "p50", "p99", "errors", "recovery(s)"]
+            data = [[r["type"], r["during_time"], r["qps"], r["avg"], r["p50"], r["p99"], r["errors"],
+                     r.get("recovery_time")] for r in res]
+            utils.print_table(headers, [r["phase"] for r in res], data)
+
         elif run_type == "locust_search_performance":
             (data_type, collection_size, dimension, metric_type) = parser.collection_parser(collection_name)
             ni_per = collection["ni_per"]
@@ -230,8 +454,9 @@ class LocalRunner(Runner):
             ids_length = collection["ids_length"]
             ids = collection["ids"]
             logger.info(milvus_instance.count())
-            index_info = milvus_instance.describe_index()
-            logger.info(index_info)
+            vector_type = self.get_vector_type(data_type)
+            vec_field_name = utils.get_default_field_name(vector_type)
+            index_info = self.get_index_info(milvus_instance, vec_field_name)
             g_top_k = int(collection["top_ks"].split("-")[1])
             l_top_k = int(collection["top_ks"].split("-")[0])
             g_id = int(ids.split("-")[1])
@@ -240,8 +465,9 @@ class LocalRunner(Runner):
             l_id_length = int(ids_length.split("-")[0])
 
             milvus_instance.preload_collection()
-            start_mem_usage = milvus_instance.get_mem_info()["memory_used"]
-            logger.debug(start_mem_usage)
+            soak_config = collection["soak"] if "soak" in collection else {}
+            soak_monitor = monitor.get_soak_monitor(soak_config, self.get_rss_probe())
+            soak_monitor.start()
             start_time = time.time()
             while time.time() < start_time + during_time * 60:
                 search_param = {}
@@ -253,15 +479,18 @@ class LocalRunner(Runner):
                 for k, v in search_params.items():
                     search_param[k] = random.randint(int(v.split("-")[0]), int(v.split("-")[1]))
                 logger.debug("Query top-k: %d, ids_num: %d, param: %s" % (top_k, ids_num, json.dumps(search_param)))
+                query_start_time = time.time()
                 result = milvus_instance.query_ids(top_k, ids_param, search_param=search_param)
-            end_mem_usage = milvus_instance.get_mem_info()["memory_used"]
+                soak_monitor.record_latency(time.time() - query_start_time)
+            soak_res = monitor.finish_soak_monitor(soak_monitor, soak_config, collection_name)
             metrics = {
                 "during_time": during_time,
-                "start_mem_usage": start_mem_usage,
-                "end_mem_usage": end_mem_usage,
-                "diff_mem": end_mem_usage - start_mem_usage,
+                "rss_slope": soak_res["rss_slope"],
+                "latency_slope": soak_res["latency_slope"]
             }
             logger.info(metrics)
+            if soak_res["failures"]:
+                raise Exception("Soak budget exceeded: %s" % "; ".join(soak_res["failures"]))
 
         elif run_type == "search_performance_concurrents":
             data_type, dimension, metric_type = parser.parse_ann_collection_name(collection_name)
@@ -275,8 +504,9 @@ class LocalRunner(Runner):
                 logger.error("Table name: %s not existed" % collection_name)
                 return
             logger.info(milvus_instance.count())
-            result = milvus_instance.describe_index()
-            logger.info(result)
+            vector_type = self.get_vector_type_from_metric(metric_type)
+            vec_field_name = utils.get_default_field_name(vector_type)
+            self.get_index_info(milvus_instance, vec_field_name)
             milvus_instance.preload_collection()
             dataset = utils.get_dataset(hdf5_source_file)
             for concurrent_num in concurrents:
@@ -328,7 +558,6 @@ class LocalRunner(Runner):
             # re-create collection
             if milvus_instance.exists_collection(collection_name):
                 milvus_instance.drop()
-                time.sleep(DELETE_INTERVAL_TIME)
             milvus_instance.create_collection(dimension, data_type=vector_type)
             insert_vectors = self.normalize(metric_type, np.array(dataset["train"]))
             if len(insert_vectors) != dataset["train"].shape[0]:
@@ -377,7 +606,7 @@ class LocalRunner(Runner):
                                 result = milvus_instance.query(vector_query)
                                 result_ids = milvus_instance.get_ids(result)
                                 # pdb.set_trace()
-                                acc_value = self.get_recall_value(true_ids[:nq, :top_k].tolist(), result_ids)
+                                acc_value = self.get_recall_value(true_ids[:nq, :top_k], result_ids)
                                 logger.info("Query ann_accuracy: %s" % acc_value)
 
         elif run_type == "accuracy":
@@ -397,12 +626,11 @@ class LocalRunner(Runner):
                 logger.error("Table name: %s not existed" % collection_name)
                 return
             logger.info(milvus_instance.count())
-            index_info = milvus_instance.describe_index()
-            logger.info(index_info)
-            milvus_instance.preload_collection()
-            true_ids_all = self.get_groundtruth_ids(collection_size)
             vector_type = self.get_vector_type(data_type)
             vec_field_name = utils.get_default_field_name(vector_type)
+            index_info = self.get_index_info(milvus_instance, vec_field_name)
+            milvus_instance.preload_collection()
+            true_ids_all = self.get_groundtruth_ids(collection_size)
             for search_param in search_params:
                 headers = ["Nq/Top-k"]
                 res = []
@@ -418,7 +646,7 @@ class LocalRunner(Runner):
                         logger.info("Query params: %s" % json.dumps(search_param_group))
                         result_ids = self.do_query_ids(milvus_instance, collection_name, vec_field_name, top_k, nq, search_param=search_param)
                         mem_used = milvus_instance.get_mem_info()["memory_used"]
-                        acc_value = self.get_recall_value(true_ids_all[:nq, :top_k].tolist(), result_ids)
+                        acc_value = self.get_recall_value(true_ids_all[:nq, :top_k], result_ids)
                         logger.info("Query accuracy: %s" % acc_value)
                         tmp_res.append(acc_value)
                         logger.info("Memory usage: %s" % mem_used)
@@ -435,13 +663,12 @@ class LocalRunner(Runner):
                 logger.error(milvus_instance.show_collections())
                 raise Exception("Table name: %s not existed" % collection_name)
             milvus_instance.preload_collection()
-            start_mem_usage = milvus_instance.get_mem_info()["memory_used"]
             start_row_count = milvus_instance.count()
             logger.info(start_row_count)
             vector_type = self.get_vector_type(data_type)
             vec_field_name = utils.get_default_field_name(vector_type)
             real_metric_type = utils.metric_type_trans(metric_type)
-            query_vectors = [[random.random() for _ in range(dimension)] for _ in range(10000)]
+            query_vectors = utils.generate_vectors(10000, dimension)
             if "insert" in operations:
                 insert_xb = operations["insert"]["xb"]
             if "delete" in operations:
@@ -452,6 +679,9 @@ class LocalRunner(Runner):
                 g_nq = int(operations["query"]["nqs"].split("-")[1])
                 l_nq = int(operations["query"]["nqs"].split("-")[0])
                 search_params = operations["query"]["search_params"]
+            soak_config = collection["soak"] if "soak" in collection else {}
+            soak_monitor = monitor.get_soak_monitor(soak_config, self.get_rss_probe())
+            soak_monitor.start()
             i = 0
             start_time = time.time()
             while time.time() < start_time + during_time * 60:
@@ -461,7 +691,7 @@ class LocalRunner(Runner):
                     try:
                         if name == "insert":
                             insert_ids = random.sample(list(range(collection_size)), insert_xb)
-                            insert_vectors = [[random.random() for _ in range(dimension)] for _ in range(insert_xb)]
+                            insert_vectors = utils.generate_vectors(insert_xb, dimension)
                             entities = milvus_instance.generate_entities(insert_vectors, insert_ids)
                             milvus_instance.insert(entities, ids=insert_ids)
                         elif name == "delete":
@@ -480,7 +710,9 @@ class LocalRunner(Runner):
                                 "metric_type": real_metric_type,
                                 "params": search_param}
                             }}
+                            query_start_time = time.time()
                             result = milvus_instance.query(vector_query)
+                            soak_monitor.record_latency(time.time() - query_start_time)
                         elif name in ["flush", "compact"]:
                             func = getattr(milvus_instance, name)
                             func()
@@ -490,16 +722,17 @@ class LocalRunner(Runner):
                         logger.error(str(e))
                         raise
                 logger.debug("Loop time: %d" % i)
-            end_mem_usage = milvus_instance.get_mem_info()["memory_used"]
+            soak_res = monitor.finish_soak_monitor(soak_monitor, soak_config, collection_name)
             end_row_count = milvus_instance.count()
             metrics = {
                 "during_time": during_time,
-                "start_mem_usage": start_mem_usage,
-                "end_mem_usage": end_mem_usage,
-                "diff_mem": end_mem_usage - start_mem_usage,
+                "rss_slope": soak_res["rss_slope"],
+                "latency_slope": soak_res["latency_slope"],
                 "row_count_increments": end_row_count - start_row_count
             }
             logger.info(metrics)
+            if soak_res["failures"]:
+                raise Exception("Soak budget exceeded: %s" % "; ".join(soak_res["failures"]))
 
         elif run_type == "loop_stability":
             # init data
@@ -514,7 +747,7 @@ class LocalRunner(Runner):
             index_param = {"nlist": 256}
             collection_names = []
             milvus_instances_map = {}
-            insert_vectors = [[random.random() for _ in range(dimension)] for _ in range(insert_xb)]
+            insert_vectors = utils.generate_vectors(insert_xb, dimension)
             ids = [i for i in range(insert_xb)]
             # initialize and prepare
             for i in range(collection_num):
@@ -527,13 +760,13 @@ class LocalRunner(Runner):
                 index_type = random.choice(index_types)
                 field_name = utils.get_default_field_name()
                 milvus_instance.create_index(field_name, index_type, metric_type, index_param=index_param)
-                logger.info(milvus_instance.describe_index())
+                self.get_index_info(milvus_instance, field_name)
                 insert_vectors = utils.normalize(metric_type, insert_vectors)
                 entities = milvus_instance.generate_entities(insert_vectors, ids)
                 res_ids = milvus_instance.insert(entities, ids=ids)
                 milvus_instance.flush()
                 milvus_instances_map.update({name: milvus_instance})
-                logger.info(milvus_instance.describe_index())
+                self.get_index_info(milvus_instance, field_name)
 
             # loop time unit: min -> s
             pull_interval_seconds = pull_interval * 60
@@ -570,6 +803,25 @@ class LocalRunner(Runner):
                 #     milvus_instances_map.update({name: milvus_instance})
                 i = i + 1
 
+        elif run_type == "meta_scalability":
+            dimension = collection["dimension"] if "dimension" in collection else 128
+            collection_nums = collection["collection_nums"]
+            partition_num = collection["partition_num"] if "partition_num" in collection else 0
+            sample_count = collection["sample_count"] if "sample_count" in collection else 10
+            growth_threshold = collection["growth_threshold"] if "growth_threshold" in collection else 1.0
+            res = self.do_meta_scalability(milvus_instance, collection_nums, dimension, partition_num=partition_num,
+                                           sample_count=sample_count, growth_threshold=growth_threshold)
+            ops = list(res["growth"].keys())
+            headers = ["Collections/Op(avg/p99 ms)"]
+            headers.extend(ops)
+            data = []
+            for level in res["levels"]:
+                data.append(["%s/%s" % (level[op]["avg"], level[op]["p99"]) for op in ops])
+            utils.print_table(headers, [level["collection_num"] for level in res["levels"]], data)
+            logger.info("Growth exponent: %s" % json.dumps(res["growth"]))
+            if res["superlinear"]:
+                logger.error("Superlinear metadata operations: %s" % ", ".join(res["superlinear"]))
+
         elif run_type == "locust_mix_performance":
             (data_type, collection_size, dimension, metric_type) = parser.collection_parser(
                 collection_name)
@@ -580,13 +832,12 @@ class LocalRunner(Runner):
             # drop exists collection
             if milvus_instance.exists_collection():
                 milvus_instance.drop()
-                time.sleep(10)
             # create collection
             other_fields = collection["other_fields"] if "other_fields" in collection else None
             milvus_instance.create_collection(dimension, data_type=DataType.FLOAT_VECTOR, collection_name=collection_name, other_fields=other_fields)
             logger.info(milvus_instance.get_info())
             # insert entities
-            insert_vectors = [[random.random() for _ in range(dimension)] for _ in range(ni_per)]
+            insert_vectors = utils.generate_vectors(ni_per, dimension)
             insert_ids = random.sample(list(range(collection_size)), ni_per)
             insert_vectors = utils.normalize(metric_type, insert_vectors)
             entities = milvus_instance.generate_entities(insert_vectors, insert_ids, collection_name)
@@ -601,7 +852,7 @@ class LocalRunner(Runner):
                 index_param = collection["index_param"]
                 logger.debug("Start build index for last file")
                 milvus_instance.create_index(index_field_name, index_type, metric_type, index_param)
-                logger.debug(milvus_instance.describe_index())
+                self.get_index_info(milvus_instance, index_field_name)
             # locust
             task = collection["tasks"]
             task_file = utils.get_unique_name()
@@ -729,4 +980,5 @@ class MixTask(User):
 
         else:
             raise Exception("Run type not defined")
+        self.print_client_profile(milvus_instance)
         logger.debug("All test finished")
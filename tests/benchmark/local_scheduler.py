@@ -0,0 +1,411 @@
+"""
+Run several suites at the same time on one host, each against its own milvus
+container. Every slot gets a disjoint cpuset inside one NUMA node, its own port
+and data path, and the client process of the slot is pinned to cpus reserved
+for it, so no core is shared by two servers or by a server and a client. The
+cpus are allocated by physical core, the hyperthreads of a core stay together.
+
+A server is started for each collection of a suite. The db under the
+`db_config.primary_path` of the collection's milvus config is copied into the
+slot data path first, so the slots never write to the same data, a collection
+without primary path, or with a path not created yet, starts with an empty db.
+A collection which neither exists before nor after its run fails the suite.
+
+Schedule config (json):
+    {
+        "image": "milvusdb/milvus:0.11.0-cpu-d101620-4c44c0",
+        "instances": 4,
+        "client_cpus": 2,
+        "data_path_prefix": "/test/milvus/local_instances",
+        "suites": ["suites/011_insert_performance.yaml", "suites/insert_binary.yaml"]
+    }
+"""
+import os
+import time
+import json
+import logging
+import shutil
+import subprocess
+import traceback
+from multiprocessing import Process, Queue
+from queue import Empty
+from yaml import full_load
+import parser
+import utils
+
+logger = logging.getLogger("milvus_benchmark.local_scheduler")
+
+SERVER_PORT = 19530
+BASE_PORT = 19600
+CONTAINER_DATA_PATH = "/var/lib/milvus/db"
+READY_TIMEOUT = 300
+SAMPLE_INTERVAL = 10
+# share of busy time on a slot's cpus which is not used by its own container
+CROSS_TALK_THRESHOLD = 0.2
+
+
+def parse_cpu_list(cpu_list):
+    # "0-3,8,10-11" -> [0, 1, 2, 3, 8, 10, 11]
+    cpus = []
+    for item in cpu_list.strip().split(","):
+        if not item:
+            continue
+        if "-" in item:
+            start, end = item.split("-")
+            cpus.extend(range(int(start), int(end) + 1))
+        else:
+            cpus.append(int(item))
+    return cpus
+
+
+def format_cpu_list(cpus):
+    return ",".join(str(cpu) for cpu in cpus)
+
+
+def get_numa_nodes():
+    """
+    Return [(node id, cpus)], one node with all cpus if the host has no NUMA info
+    """
+    nodes = []
+    node_dir = "/sys/devices/system/node"
+    if os.path.isdir(node_dir):
+        for name in os.listdir(node_dir):
+            if name.startswith("node") and name[4:].isdigit():
+                with open(os.path.join(node_dir, name, "cpulist")) as f:
+                    cpus = parse_cpu_list(f.read())
+                if cpus:
+                    nodes.append((int(name[4:]), cpus))
+    if not nodes:
+        nodes.append((0, list(range(os.cpu_count()))))
+    return sorted(nodes)
+
+
+def get_thread_siblings(cpus):
+    """
+    Return {cpu: hyperthread siblings of the cpu}, a cpu is its own sibling if the topology is not found
+    """
+    siblings = {}
+    for cpu in cpus:
+        path = "/sys/devices/system/cpu/cpu%d/topology/thread_siblings_list" % cpu
+        try:
+            with open(path) as f:
+                siblings[cpu] = parse_cpu_list(f.read())
+        except (IOError, OSError):
+            siblings[cpu] = [cpu]
+    return siblings
+
+
+def get_cores(cpus, siblings):
+    # group the cpus of a node by physical core, in the order of their first cpu
+    cores = []
+    seen = set()
+    for cpu in cpus:
+        if cpu in seen:
+            continue
+        core = [c for c in sorted(set(siblings.get(cpu, [cpu])) | {cpu}) if c in cpus]
+        seen.update(core)
+        cores.append(core)
+    return cores
+
+
+def allocate_slots(instance_num, client_cpus, nodes=None, siblings=None):
+    '''
+    @params:
+        instance_num: count of servers running at the same time
+        client_cpus: cpus reserved in each slot for the benchmark client, rounded up to whole cores
+        siblings: {cpu: hyperthread siblings}, read from the cpu topology if not given
+    @return:
+        list of {"node", "server_cpus", "client_cpus"}, cpus of the slots are disjoint, and the
+        hyperthreads of a core are never split between two slots or between a client and a server
+    '''
+    if nodes is None:
+        nodes = get_numa_nodes()
+    if siblings is None:
+        siblings = get_thread_siblings([cpu for _, cpus in nodes for cpu in cpus])
+    # spread the slots over the nodes, never across two nodes
+    slots_per_node = [instance_num // len(nodes) + (1 if i < instance_num % len(nodes) else 0)
+                      for i in range(len(nodes))]
+    slots = []
+    for (node, cpus), slot_num in zip(nodes, slots_per_node):
+        if not slot_num:
+            continue
+        cores = get_cores(cpus, siblings)
+        size = len(cores) // slot_num
+        for i in range(slot_num):
+            slot_cores = cores[i * size:(i + 1) * size]
+            client_cores = 0
+            while client_cores < len(slot_cores) and sum(len(c) for c in slot_cores[:client_cores]) < client_cpus:
+                client_cores += 1
+            if client_cores >= len(slot_cores):
+                raise Exception("Node %d has %d cores, not enough for %d slots" % (node, len(cores), slot_num))
+            slots.append({
+                "node": node,
+                "client_cpus": [cpu for core in slot_cores[:client_cores] for cpu in core],
+                "server_cpus": [cpu for core in slot_cores[client_cores:] for cpu in core]
+            })
+    return slots
+
+
+def check_slots(slots):
+    """
+    Raise if any cpu, port or data path is shared by two slots
+    """
+    for key in ["server_cpus", "client_cpus", "port", "data_path"]:
+        seen = set()
+        for slot in slots:
+            values = slot[key] if isinstance(slot[key], list) else [slot[key]]
+            for value in values:
+                if value in seen:
+                    raise Exception("%s: %s shared by slots" % (key, value))
+                seen.add(value)
+    all_server_cpus = set(cpu for slot in slots for cpu in slot["server_cpus"])
+    for slot in slots:
+        if all_server_cpus.intersection(slot["client_cpus"]):
+            raise Exception("Client cpus: %s overlap with server cpus" % slot["client_cpus"])
+
+
+def get_primary_path(collection):
+    milvus_config = collection["milvus"] if "milvus" in collection and collection["milvus"] else {}
+    for k, v in milvus_config.items():
+        if k.find("primary_path") != -1:
+            return v
+    return None
+
+
+def prepare_data_path(slot, collection):
+    """
+    Copy the db of the collection into the slot data path, an empty data path if it has none
+    """
+    data_path = slot["data_path"]
+    if os.path.isdir(data_path):
+        shutil.rmtree(data_path)
+    primary_path = get_primary_path(collection)
+    if primary_path:
+        # the server data is in the db directory under the primary path
+        src = os.path.join(primary_path, "db")
+        if not os.path.isdir(src):
+            src = primary_path
+        if os.path.isdir(src):
+            logger.info("Copy db: %s to slot data path: %s" % (src, data_path))
+            shutil.copytree(src, data_path, symlinks=True)
+            return
+        logger.info("Primary path: %s not found, start with an empty db" % primary_path)
+    os.makedirs(data_path, exist_ok=True)
+
+
+def start_server(image, name, slot):
+    cmd = ["docker", "run", "-d", "--name", name,
+           "--cpuset-cpus", format_cpu_list(slot["server_cpus"]),
+           "--cpuset-mems", str(slot["node"]),
+           "-e", "OMP_NUM_THREADS=%d" % len(slot["server_cpus"]),
+           "-p", "%d:%d" % (slot["port"], SERVER_PORT),
+           "-v", "%s:%s" % (slot["data_path"], CONTAINER_DATA_PATH),
+           image]
+    logger.info(" ".join(cmd))
+    container_id = subprocess.check_output(cmd).decode().strip()
+    start_time = time.time()
+    while time.time() < start_time + READY_TIMEOUT:
+        try:
+            from client import MilvusClient
+            MilvusClient(host="127.0.0.1", port=slot["port"], timeout=5).show_collections()
+            return container_id
+        except Exception as e:
+            logger.debug(str(e))
+            time.sleep(2)
+    remove_server(name)
+    raise Exception("Server: %s not ready in %ds" % (name, READY_TIMEOUT))
+
+
+def remove_server(name):
+    subprocess.call(["docker", "rm", "-f", name])
+
+
+def get_container_pid(name):
+    return int(subprocess.check_output(["docker", "inspect", "-f", "{{.State.Pid}}", name]).decode().strip())
+
+
+def check_affinity(name, slot):
+    """
+    Check the cpus and memory nodes the server process is actually allowed to use
+    """
+    allowed = {}
+    with open("/proc/%d/status" % get_container_pid(name)) as f:
+        for line in f:
+            key, _, value = line.partition(":")
+            allowed[key] = value.strip()
+    cpus = parse_cpu_list(allowed["Cpus_allowed_list"])
+    mems = parse_cpu_list(allowed["Mems_allowed_list"])
+    if sorted(cpus) != sorted(slot["server_cpus"]) or mems != [slot["node"]]:
+        raise Exception("Server: %s runs on cpus: %s, mems: %s, not the slot cpus: %s, node: %d" % (
+            name, cpus, mems, slot["server_cpus"], slot["node"]))
+
+
+def get_container_cpu_usage(container_id):
+    """
+    Cpu time(s) used by the container, from cgroup v2 or v1
+    """
+    v2_paths = ["/sys/fs/cgroup/system.slice/docker-%s.scope/cpu.stat" % container_id,
+                "/sys/fs/cgroup/docker/%s/cpu.stat" % container_id]
+    for path in v2_paths:
+        if os.path.exists(path):
+            with open(path) as f:
+                for line in f:
+                    if line.startswith("usage_usec"):
+                        return int(line.split()[1]) / 1e6
+    v1_path = "/sys/fs/cgroup/cpuacct/docker/%s/cpuacct.usage" % container_id
+    if os.path.exists(v1_path):
+        with open(v1_path) as f:
+            return int(f.read()) / 1e9
+    return None
+
+
+def get_cpu_busy_time(cpus):
+    """
+    Busy time(s) of the given cpus since boot, from /proc/stat
+    """
+    ticks = os.sysconf("SC_CLK_TCK")
+    busy = 0
+    with open("/proc/stat") as f:
+        for line in f:
+            if not line.startswith("cpu") or line.startswith("cpu "):
+                continue
+            items = line.split()
+            if int(items[0][3:]) in cpus:
+                # user nice system idle iowait irq softirq steal
+                values = [int(v) for v in items[1:9]]
+                busy += sum(values) - values[3] - values[4]
+    return busy / ticks
+
+
+class CrossTalkMonitor(object):
+    """
+    Compare the busy time of each slot's server cpus with the cpu time of its own container,
+    busy time not used by the container means something else runs on the slot
+    """
+    def __init__(self):
+        self._slots = {}
+
+    def add(self, name, container_id, slot):
+        self._slots[name] = {"container_id": container_id, "cpus": slot["server_cpus"],
+                             "busy": get_cpu_busy_time(slot["server_cpus"]),
+                             "usage": get_container_cpu_usage(container_id)}
+
+    def check(self, name):
+        item = self._slots.pop(name)
+        usage = get_container_cpu_usage(item["container_id"])
+        if usage is None or item["usage"] is None:
+            logger.warning("Cpu usage of %s not found in cgroup, skip cross talk check" % name)
+            return None
+        busy = get_cpu_busy_time(item["cpus"]) - item["busy"]
+        used = usage - item["usage"]
+        foreign = round(max(busy - used, 0) / busy, 3) if busy > 0 else 0.0
+        logger.info("Slot: %s, busy: %.1fs, used by server: %.1fs, foreign: %s" % (name, busy, used, foreign))
+        return foreign
+
+
+def exists_collection(port, collection_name):
+    from client import MilvusClient
+    return MilvusClient(collection_name=collection_name, host="127.0.0.1", port=port).exists_collection()
+
+
+def run_collection(image, name, slot, run_type, collection, monitor):
+    from local_runner import LocalRunner
+    prepare_data_path(slot, collection)
+    try:
+        container_id = start_server(image, name, slot)
+        check_affinity(name, slot)
+        monitor.add(name, container_id, slot)
+        collection_name = collection["collection_name"] if "collection_name" in collection else None
+        existed = collection_name is None or exists_collection(slot["port"], collection_name)
+        logger.info("Start run %s on port: %d" % (run_type, slot["port"]))
+        LocalRunner("127.0.0.1", slot["port"]).run(run_type, collection)
+        # the runners only log a missing collection, the run did nothing
+        if not existed and not exists_collection(slot["port"], collection_name):
+            raise Exception("Collection: %s not existed" % collection_name)
+        return monitor.check(name)
+    finally:
+        remove_server(name)
+
+
+def run_suite(image, slot_idx, slot, suite_file):
+    """
+    Run each collection of the suite on its own server, return the highest foreign cpu share
+    """
+    with open(suite_file) as f:
+        suite_dict = full_load(f)
+    run_type, run_params = parser.operations_parser(suite_dict)
+    foreign = None
+    for collection in run_params["collections"]:
+        name = "milvus-benchmark-slot%d-%s" % (slot_idx, utils.get_unique_name(prefix=""))
+        value = run_collection(image, name, slot, run_type, collection, CrossTalkMonitor())
+        if value is not None:
+            foreign = max(foreign or 0.0, value)
+    return foreign
+
+
+def slot_worker(image, slot_idx, slot, suite_queue, result_queue):
+    # keep the client off the server cpus
+    os.sched_setaffinity(0, slot["client_cpus"])
+    while True:
+        try:
+            suite_file = suite_queue.get_nowait()
+        except Empty:
+            break
+        result = {"suite": suite_file, "slot": slot_idx, "cpus": slot["server_cpus"], "node": slot["node"]}
+        start_time = time.time()
+        try:
+            result["foreign"] = run_suite(image, slot_idx, slot, suite_file)
+            result["status"] = "ok"
+        except Exception as e:
+            logger.error(str(e))
+            logger.error(traceback.format_exc())
+            result["status"] = "failed: %s" % str(e)
+        result["time"] = round(time.time() - start_time, 2)
+        result_queue.put(result)
+
+
+def run_schedule(schedule_config):
+    '''
+    @params:
+        schedule_config: dict of image, instances, client_cpus, data_path_prefix and suites
+    @return:
+        results of the suites, a suite with cross talk over CROSS_TALK_THRESHOLD is marked
+    '''
+    image = schedule_config["image"]
+    instance_num = schedule_config["instances"] if "instances" in schedule_config else len(get_numa_nodes())
+    client_cpus = schedule_config["client_cpus"] if "client_cpus" in schedule_config else 2
+    data_path_prefix = schedule_config["data_path_prefix"]
+    suites = schedule_config["suites"]
+    slots = allocate_slots(min(instance_num, len(suites)), client_cpus)
+    for i, slot in enumerate(slots):
+        slot["port"] = BASE_PORT + i
+        slot["data_path"] = os.path.join(data_path_prefix, "slot%d" % i)
+    check_slots(slots)
+    logger.info("Slots: %s" % json.dumps(slots))
+    suite_queue = Queue()
+    result_queue = Queue()
+    for suite in suites:
+        suite_queue.put(suite)
+    processes = []
+    for i, slot in enumerate(slots):
+        p = Process(target=slot_worker, args=(image, i, slot, suite_queue, result_queue))
+        processes.append(p)
+        p.start()
+    results = []
+    while len(results) < len(suites):
+        try:
+            results.append(result_queue.get(timeout=SAMPLE_INTERVAL))
+        except Empty:
+            if not any(p.is_alive() for p in processes):
+                logger.error("Workers exited with %d suites not finished" % (len(suites) - len(results)))
+                break
+    for p in processes:
+        p.join()
+    for result in results:
+        if result.get("foreign") is not None and result["foreign"] > CROSS_TALK_THRESHOLD:
+            result["status"] = "cross talk"
+    headers = ["Suite", "slot", "node", "cpus", "time(s)", "foreign cpu", "status"]
+    data = [[r["slot"], r["node"], format_cpu_list(r["cpus"]), r.get("time"), r.get("foreign"), r["status"]]
+            for r in results]
+    utils.print_table(headers, [r["suite"] for r in results], data)
+    return results
@@ -1,6 +1,7 @@
 import os
 import sys
 import time
+import json
 from datetime import datetime
 import pdb
 import argparse
@@ -13,6 +14,9 @@ from yaml import full_load, dump
 from local_runner import LocalRunner
 from docker_runner import DockerRunner
 import parser
+import tracer
+import html_report
+import waiter
 
 DEFAULT_IMAGE = "milvusdb/milvus:latest"
 LOG_FOLDER = "logs"
@@ -53,44 +57,116 @@ def get_image_tag(image_version, image_type):
     # return "%s-%s-centos7-release" % ("PR-2780", image_type)
 
 
-def queue_worker(queue):
-    from k8s_runner import K8sRunner
+def get_queue_tasks(queue):
+    """
+    Drain the queue into a list of (queue item, run type, collection), with the fingerprint of the
+    server each collection needs, None if the collection deploys its own servers or asks for a new one
+    """
+    import helm_utils
+    tasks = []
+    milvus_config = None
     while not queue.empty():
         q = queue.get()
-        suite = q["suite"]
-        server_host = q["server_host"]
-        deploy_mode = q["deploy_mode"]
-        image_type = q["image_type"]
-        image_tag = q["image_tag"]
-
-        with open(suite) as f:
+        with open(q["suite"]) as f:
             suite_dict = full_load(f)
             f.close()
         logger.debug(suite_dict)
-
         run_type, run_params = parser.operations_parser(suite_dict)
-        collections = run_params["collections"]
-        for collection in collections:
-            # run tests
-            milvus_config = collection["milvus"] if "milvus" in collection else None
+        for collection in run_params["collections"]:
+            # values.yaml is only updated with a milvus config, otherwise the last values are deployed
+            if "milvus" in collection and collection["milvus"]:
+                milvus_config = collection["milvus"]
             server_config = collection["server"] if "server" in collection else None
-            logger.debug(milvus_config)
-            logger.debug(server_config)
+            fingerprint = None
+            if "scaling" not in collection and not collection.get("redeploy"):
+                fingerprint = helm_utils.get_values_fingerprint(q["deploy_mode"], q["server_host"], q["image_type"],
+                                                                q["image_tag"], milvus_config, server_config)
+            tasks.append((q, run_type, collection, fingerprint))
+    return tasks
+
+
+def queue_worker(queue):
+    from k8s_runner import K8sRunner, close_reporter, close_store
+    tasks = get_queue_tasks(queue)
+    # the deployed server, kept for the next collection if it needs the same helm values
+    deployed = None
+    deployed_fingerprint = None
+    for i, (q, run_type, collection, fingerprint) in enumerate(tasks):
+        server_host = q["server_host"]
+        deploy_mode = q["deploy_mode"]
+        image_type = q["image_type"]
+        image_tag = q["image_tag"]
+        if q["trace_file"] and isinstance(tracer.get_tracer(), tracer.NoopTracer):
+            # one trace file for each worker process
+            base, ext = os.path.splitext(q["trace_file"])
+            tracer.init_tracer("%s_%s%s" % (base, server_host, ext), file_format=q["trace_format"])
+        # run tests
+        milvus_config = collection["milvus"] if "milvus" in collection else None
+        server_config = collection["server"] if "server" in collection else None
+        logger.debug(milvus_config)
+        logger.debug(server_config)
+        runner = None
+        if deployed is not None:
+            if fingerprint is not None and fingerprint == deployed_fingerprint and deployed.reset_env():
+                runner = deployed
+            else:
+                deployed.wait_reported()
+                deployed.clean_up()
+            deployed, deployed_fingerprint = None, None
+        if runner is None:
             runner = K8sRunner()
-            if runner.init_env(milvus_config, server_config, server_host, deploy_mode, image_type, image_tag):
-                logger.debug("Start run tests")
+            if "scaling" in collection:
+                # the runner deploys the server for each scaling step
                 try:
-                    runner.run(run_type, collection)
+                    runner.run_scaling(run_type, collection, milvus_config, server_config, server_host, deploy_mode,
+                                       image_type, image_tag)
                 except Exception as e:
                     logger.error(str(e))
                     logger.error(traceback.format_exc())
-                finally:
-                    time.sleep(60)
-                    runner.clean_up()
-            else:
+                continue
+            if not runner.init_env(milvus_config, server_config, server_host, deploy_mode, image_type, image_tag):
                 logger.error("Runner init failed")
-    if server_host:
-        logger.debug("All task finished in queue: %s" % server_host)
+                continue
+        logger.debug("Start run tests")
+        skew = None
+        try:
+            # sample the load of each query node during the run
+            skew = runner.start_skew_monitor(collection)
+            runner.run(run_type, collection)
+        except Exception as e:
+            logger.error(str(e))
+            logger.error(traceback.format_exc())
+        finally:
+            if skew is not None:
+                try:
+                    runner.finish_skew_monitor(skew, run_type, collection)
+                except Exception as e:
+                    logger.error("Report load skew failed: %s" % str(e))
+            next_fingerprint = tasks[i + 1][3] if i + 1 < len(tasks) else None
+            if fingerprint is not None and fingerprint == next_fingerprint:
+                # the next collection runs on the same server, it is reset instead of redeployed
+                deployed, deployed_fingerprint = runner, fingerprint
+            else:
+                runner.wait_reported()
+                runner.clean_up()
+            logger.info("Time waited for readiness: %s" % json.dumps(waiter.get_stats()))
+            waiter.reset_stats()
+    if deployed is not None:
+        deployed.wait_reported()
+        deployed.clean_up()
+    tracer.close_tracer()
+    close_reporter()
+    results_file = close_store()
+    if results_file:
+        # one html report for the suites run by this worker
+        try:
+            q = tasks[-1][0]
+            html_report.write_report(results_file, os.path.splitext(results_file)[0] + ".html",
+                                     title="%s %s" % (q["server_host"] or q["deploy_mode"], q["image_tag"]))
+        except Exception as e:
+            logger.error("Write html report failed: %s" % str(e))
+    if tasks and tasks[-1][0]["server_host"]:
+        logger.debug("All task finished in queue: %s" % tasks[-1][0]["server_host"])
 
 
 def main():
@@ -130,6 +206,25 @@ def main():
         help='load test suite from FILE',
         default='')
 
+    # local mode with several servers on one host
+    arg_parser.add_argument(
+        '--local-schedule-conf',
+        metavar='FILE',
+        help='run suites concurrently on local servers pinned to disjoint cpus, load schedule from FILE',
+        default='')
+
+    # tracing
+    arg_parser.add_argument(
+        '--trace-file',
+        metavar='FILE',
+        help='write spans of client operations to FILE',
+        default='')
+    arg_parser.add_argument(
+        '--trace-format',
+        choices=tracer.FORMATS,
+        help='chrome trace or opentelemetry json lines',
+        default='chrome')
+
     args = arg_parser.parse_args()
 
     if args.schedule_conf:
@@ -159,7 +254,9 @@ def main():
                     "server_host": server_host,
                     "deploy_mode": deploy_mode,
                     "image_tag": image_tag,
-                    "image_type": image_type
+                    "image_type": image_type,
+                    "trace_file": args.trace_file,
+                    "trace_format": args.trace_format
                 })
             queues.append(q)
         logger.error(queues)
@@ -176,6 +273,12 @@ def main():
 
         # queue_worker(queues[0])
 
+    elif args.local_schedule_conf:
+        import local_scheduler
+        with open(args.local_schedule_conf) as f:
+            schedule_config = json.load(f)
+        local_scheduler.run_schedule(schedule_config)
+
     elif args.local:
         # for local mode
         host = args.host
@@ -191,8 +294,14 @@ def main():
             raise Exception("Multi collections not supported in Local Mode")
         collection = collections[0]
         runner = LocalRunner(host, port)
+        if args.trace_file:
+            tracer.init_tracer(args.trace_file, file_format=args.trace_format)
         logger.info("Start run local mode test, test type: %s" % run_type)
-        runner.run(run_type, collection)
+        try:
+            runner.run(run_type, collection)
+        finally:
+            logger.info("Time waited for readiness: %s" % json.dumps(waiter.get_stats()))
+            tracer.close_tracer()
 
 
 if __name__ == "__main__":
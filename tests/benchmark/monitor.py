@@ -0,0 +1,128 @@
+import os
+import time
+import json
+import logging
+import threading
+import numpy as np
+import utils
+
+logger = logging.getLogger("milvus_benchmark.monitor")
+
+DEFAULT_SAMPLE_INTERVAL = 30
+DEFAULT_WARM_UP = 600
+
+
+class SoakMonitor(object):
+    """
+    Sample server rss and request latency continuously during a soak run,
+    then fit the trend of both after warm up
+    """
+    def __init__(self, rss_probe, interval=DEFAULT_SAMPLE_INTERVAL, warm_up=DEFAULT_WARM_UP):
+        # rss_probe: callable returning the server memory usage in MB, None if it can not be sampled
+        self._rss_probe = rss_probe
+        self._interval = interval
+        self._warm_up = warm_up
+        self._latencies = []
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._start_time = None
+        self.series = []
+
+    def start(self):
+        self._start_time = time.time()
+        self._stop_event.clear()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+        self._sample()
+
+    def record_latency(self, latency):
+        with self._lock:
+            self._latencies.append(latency)
+
+    def _loop(self):
+        while not self._stop_event.wait(self._interval):
+            self._sample()
+
+    def _sample(self):
+        with self._lock:
+            latencies = self._latencies
+            self._latencies = []
+        rss = None
+        if self._rss_probe is not None:
+            try:
+                rss = self._rss_probe()
+            except Exception as e:
+                logger.error("Get server rss failed: %s" % str(e))
+        stats = utils.get_latency_stats(latencies)
+        point = {
+            "time": round(time.time() - self._start_time, 1),
+            "rss_mb": rss,
+            "count": stats["count"],
+            "p99_ms": stats["p99"] if stats["count"] else None
+        }
+        logger.debug(point)
+        self.series.append(point)
+
+    def get_slope(self, key):
+        """
+        Return the slope of the given series after warm up, in unit per hour
+        """
+        points = [(p["time"], p[key]) for p in self.series if p["time"] >= self._warm_up and p[key] is not None]
+        if len(points) < 2:
+            logger.warning("Not enough samples after warm up to fit %s" % key)
+            return None
+        hours = np.array([p[0] for p in points]) / 3600
+        values = np.array([p[1] for p in points], dtype=np.float64)
+        slope, _ = np.polyfit(hours, values, 1)
+        return round(float(slope), 3)
+
+    def analyze(self, rss_slope_budget=None, latency_slope_budget=None):
+        rss_slope = self.get_slope("rss_mb")
+        latency_slope = self.get_slope("p99_ms")
+        failures = []
+        if rss_slope_budget is not None and rss_slope is not None and rss_slope > rss_slope_budget:
+            failures.append("rss slope %s MB/h over budget %s MB/h" % (rss_slope, rss_slope_budget))
+        if latency_slope_budget is not None and latency_slope is not None and latency_slope > latency_slope_budget:
+            failures.append("p99 latency slope %s ms/h over budget %s ms/h" % (latency_slope, latency_slope_budget))
+        return {
+            "rss_slope": rss_slope,
+            "latency_slope": latency_slope,
+            "samples": len(self.series),
+            "failures": failures
+        }
+
+    def save(self, file_path):
+        dir_name = os.path.dirname(file_path)
+        if dir_name and not os.path.isdir(dir_name):
+            os.makedirs(dir_name, exist_ok=True)
+        with open(file_path, "w") as f:
+            json.dump({"warm_up": self._warm_up, "interval": self._interval, "series": self.series}, f)
+        logger.info("Soak time series saved in: %s" % file_path)
+
+
+def get_soak_monitor(soak_config, rss_probe):
+    interval = soak_config["interval"] if "interval" in soak_config else DEFAULT_SAMPLE_INTERVAL
+    warm_up = utils.timestr_to_int(soak_config["warm_up"]) if "warm_up" in soak_config else DEFAULT_WARM_UP
+    return SoakMonitor(rss_probe, interval=interval, warm_up=warm_up)
+
+
+def finish_soak_monitor(monitor, soak_config, name):
+    """
+    Stop the monitor, save the series and return the analysis,
+    failures is not empty if any slope is over the budget configured in soak_config
+    """
+    monitor.stop()
+    series_path = soak_config["series_path"] if "series_path" in soak_config \
+        else os.path.join("logs", "soak_%s_%d.json" % (name, int(time.time())))
+    monitor.save(series_path)
+    res = monitor.analyze(rss_slope_budget=soak_config.get("rss_slope_budget"),
+                          latency_slope_budget=soak_config.get("latency_slope_budget"))
+    res["series_path"] = series_path
+    logger.info(res)
+    return res
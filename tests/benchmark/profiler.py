@@ -0,0 +1,164 @@
+import time
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger("milvus_benchmark.profiler")
+
+
+class ClientProfiler(object):
+    """
+    Split the time of each client request into three phases:
+        encode: from the client call to the grpc request being sent, DSL and protobuf building
+        rpc: waiting for the grpc response
+        decode: from the response to the result being returned, plus the time spent in get_ids
+    The grpc stub of the pymilvus handler is wrapped to get the send and receive timestamps,
+    so the timing is exact for each request rather than sampled
+    """
+    def __init__(self):
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._records = []
+
+    def attach(self, milvus):
+        """
+        Wrap the grpc stub of the pymilvus handler of this thread, once per handler: with the SingletonThread
+        pool every thread has its own handler, which is cached here so a request only checks the cache
+        """
+        handlers = getattr(self._local, "handlers", None)
+        if handlers is None:
+            handlers = self._local.handlers = {}
+        handler = handlers.get(id(milvus))
+        if handler is not None and isinstance(handler._stub, _TimedStub):
+            return
+        try:
+            with milvus._connection() as conn:
+                handler = conn.client()
+                stub = handler._stub
+        except AttributeError as e:
+            raise Exception("Client profiling needs the grpc stub of the pymilvus handler: %s" % str(e))
+        if isinstance(stub, _TimedStub):
+            stub = stub._stub
+        handler._stub = _TimedStub(stub, self)
+        handlers[id(milvus)] = handler
+
+    def start(self, op):
+        self._local.current = {"op": op, "start": time.perf_counter(), "send": None, "recv": None}
+
+    def on_send(self):
+        current = getattr(self._local, "current", None)
+        # only the first rpc of a request counts
+        if current is not None and current["send"] is None:
+            current["send"] = time.perf_counter()
+
+    def on_recv(self):
+        current = getattr(self._local, "current", None)
+        if current is not None:
+            current["recv"] = time.perf_counter()
+
+    def end(self):
+        current = getattr(self._local, "current", None)
+        self._local.current = None
+        if current is None or current["send"] is None or current["recv"] is None:
+            return
+        end = time.perf_counter()
+        record = {
+            "op": current["op"],
+            "encode": current["send"] - current["start"],
+            "rpc": current["recv"] - current["send"],
+            "decode": end - current["recv"]
+        }
+        with self._lock:
+            self._records.append(record)
+        self._local.last = record
+
+    def add_decode(self, seconds):
+        # result decoding after the request returned, such as get_ids
+        record = getattr(self._local, "last", None)
+        if record is not None:
+            with self._lock:
+                record["decode"] += seconds
+
+    def reset(self):
+        with self._lock:
+            self._records = []
+
+    def summary(self):
+        '''
+        @return:
+            {op: {count, encode/rpc/decode in ms, overhead: client time percent of the request time}}
+        '''
+        with self._lock:
+            records = list(self._records)
+        res = {}
+        for op in sorted(set(r["op"] for r in records)):
+            items = [r for r in records if r["op"] == op]
+            encode = np.array([r["encode"] for r in items]) * 1000
+            rpc = np.array([r["rpc"] for r in items]) * 1000
+            decode = np.array([r["decode"] for r in items]) * 1000
+            total = encode.sum() + rpc.sum() + decode.sum()
+            res[op] = {
+                "count": len(items),
+                "encode_ms": round(float(encode.mean()), 3),
+                "rpc_ms": round(float(rpc.mean()), 3),
+                "decode_ms": round(float(decode.mean()), 3),
+                "p99_encode_ms": round(float(np.percentile(encode, 99)), 3),
+                "p99_decode_ms": round(float(np.percentile(decode, 99)), 3),
+                "overhead": round(float((encode.sum() + decode.sum()) / total * 100), 2) if total else 0.0
+            }
+        return res
+
+    def get_overhead(self):
+        """
+        Client overhead percent of all profiled requests
+        """
+        with self._lock:
+            records = list(self._records)
+        client_time = sum(r["encode"] + r["decode"] for r in records)
+        total = client_time + sum(r["rpc"] for r in records)
+        return round(client_time / total * 100, 2) if total else 0.0
+
+
+class _TimedStub(object):
+    def __init__(self, stub, profiler):
+        self._stub = stub
+        self._profiler = profiler
+
+    def __getattr__(self, item):
+        # kept as an attribute, so the next requests do not get here
+        method = _TimedMethod(getattr(self._stub, item), self._profiler)
+        setattr(self, item, method)
+        return method
+
+
+class _TimedMethod(object):
+    def __init__(self, method, profiler):
+        self._method = method
+        self._profiler = profiler
+
+    def __call__(self, *args, **kwargs):
+        self._profiler.on_send()
+        res = self._method(*args, **kwargs)
+        self._profiler.on_recv()
+        return res
+
+    def future(self, *args, **kwargs):
+        self._profiler.on_send()
+        return _TimedFuture(self._method.future(*args, **kwargs), self._profiler)
+
+    def __getattr__(self, item):
+        return getattr(self._method, item)
+
+
+class _TimedFuture(object):
+    def __init__(self, future, profiler):
+        self._future = future
+        self._profiler = profiler
+
+    def result(self, *args, **kwargs):
+        res = self._future.result(*args, **kwargs)
+        self._profiler.on_recv()
+        return res
+
+    def __getattr__(self, item):
+        return getattr(self._future, item)
@@ -0,0 +1,166 @@
+import logging
+import numpy as np
+
+logger = logging.getLogger("milvus_benchmark.result_adapter")
+
+PAD_ID = -1
+PAD_DISTANCE = -1.0
+
+
+def _pad(array, top_k, value):
+    if top_k is None or array.shape[1] == top_k:
+        return array
+    if array.shape[1] > top_k:
+        return array[:, :top_k]
+    padded = np.full((array.shape[0], top_k), value, dtype=array.dtype)
+    padded[:, :array.shape[1]] = array
+    return padded
+
+
+def _read_varint(data, pos):
+    value, shift = 0, 0
+    while True:
+        b = data[pos]
+        pos += 1
+        value |= (b & 0x7f) << shift
+        if not b & 0x80:
+            return value, pos
+        shift += 7
+
+
+def _get_packed_bytes(message, field_name):
+    """
+    Bytes of a packed repeated field: the field is copied into an empty message in C and serialized,
+    so no python object is made for its values, None if the field is not packed
+    """
+    owner = type(message)()
+    getattr(owner, field_name).MergeFrom(getattr(message, field_name))
+    data = owner.SerializeToString()
+    if not data:
+        return b""
+    tag, pos = _read_varint(data, 0)
+    if tag & 0x7 != 2:
+        return None
+    length, pos = _read_varint(data, pos)
+    if pos + length != len(data):
+        return None
+    return memoryview(data)[pos:]
+
+
+def _decode_varints(data):
+    """
+    Decode int64 varints with numpy: the 7 bit groups of each value are shifted into place and or-ed
+    """
+    buf = np.frombuffer(data, dtype=np.uint8)
+    if not len(buf):
+        return np.zeros(0, dtype=np.int64)
+    ends = (buf & 0x80) == 0
+    starts = np.flatnonzero(np.concatenate([[True], ends[:-1]]))
+    group = np.cumsum(np.concatenate([[0], ends[:-1].astype(np.int64)]))
+    shifts = (np.arange(len(buf)) - starts[group]) * 7
+    if not ends[-1] or shifts.max() > 63:
+        raise Exception("Invalid int64 varints")
+    values = (buf & 0x7f).astype(np.uint64) << shifts.astype(np.uint64)
+    return np.bitwise_or.reduceat(values, starts).view(np.int64)
+
+
+def _get_raw_ids(result):
+    try:
+        data = _get_packed_bytes(result._raw.entities, "ids")
+        ids = _decode_varints(data) if data is not None else None
+        # the decoded count is checked against the field, any doubt falls back to the plain conversion
+        if ids is not None and len(ids) != len(result._raw.entities.ids):
+            logger.warning("Decoded %d ids of %d, fall back" % (len(ids), len(result._raw.entities.ids)))
+            ids = None
+    except Exception as e:
+        logger.debug("Packed ids not decoded: %s" % str(e))
+        ids = None
+    if ids is None:
+        # not a protobuf result, or not packed
+        return np.array(result._entities.ids, dtype=np.int64)
+    return ids
+
+
+def _get_raw_distances(result):
+    try:
+        data = _get_packed_bytes(result._raw, "distances")
+        # packed floats are little endian float32
+        distances = np.frombuffer(data, dtype="<f4").astype(np.float32) if data is not None else None
+        if distances is not None and len(distances) != len(result._raw.distances):
+            logger.warning("Decoded %d distances of %d, fall back" % (len(distances), len(result._raw.distances)))
+            distances = None
+    except Exception as e:
+        logger.debug("Packed distances not decoded: %s" % str(e))
+        distances = None
+    if distances is None:
+        return np.fromiter(result._raw.distances, dtype=np.float32, count=len(result._raw.distances))
+    return distances
+
+
+def _get_raw_arrays(result):
+    # ids and distances of the whole search, kept on the result since a batched result is shared by its callers
+    arrays = getattr(result, "_benchmark_arrays", None)
+    if arrays is None:
+        nq = len(result)
+        ids = _get_raw_ids(result)
+        distances = _get_raw_distances(result)
+        top_k = len(ids) // nq if nq else 0
+        ids, distances = ids[:nq * top_k].reshape(nq, top_k), distances[:nq * top_k].reshape(nq, top_k)
+        distances[ids == PAD_ID] = PAD_DISTANCE
+        arrays = (ids, distances)
+        result._benchmark_arrays = arrays
+    return arrays
+
+
+def get_result_arrays(result, top_k=None):
+    '''
+    Convert a search result to numpy arrays without creating a python object per hit
+    @params:
+        result: QueryResult, or SubQueryResult of a coalesced search
+        top_k: pad (with -1) or cut the columns to top_k, the width of the result is kept if None
+    @return:
+        ids: (nq, top_k) int64 array, -1 for no hit
+        distances: (nq, top_k) float32 array, -1 for no hit
+    '''
+    if hasattr(result, "_index"):
+        # one query of a batched search
+        ids, distances = _get_raw_arrays(result._result)
+        ids, distances = ids[result._index:result._index + 1], distances[result._index:result._index + 1]
+    else:
+        ids, distances = _get_raw_arrays(result)
+    return _pad(ids, top_k, PAD_ID), _pad(distances, top_k, PAD_DISTANCE)
+
+
+def get_recall(true_ids, result_ids):
+    """
+    Mean of |true ∩ result| / hits over the queries, both are (nq, top_k) int arrays, the hits of a
+    query are its ids which are not padding, as len(ids) of the lists before the padding
+    """
+    true_ids = np.asarray(true_ids, dtype=np.int64)
+    result_ids = np.asarray(result_ids, dtype=np.int64)
+    nq, top_k = result_ids.shape
+    if not nq or not top_k:
+        return 0.0
+    true_ids = true_ids[:nq]
+    # ids are replaced by their rank among all the ids, and each row gets its own range of ranks,
+    # so one isin finds the hits of all queries whatever the values of the ids
+    _, ranks = np.unique(np.concatenate([true_ids.ravel(), result_ids.ravel()]), return_inverse=True)
+    ranks = ranks.reshape(-1)
+    span = int(ranks.max()) + 1
+    true_ranks = ranks[:true_ids.size].reshape(true_ids.shape) + np.arange(len(true_ids))[:, None] * span
+    result_ranks = ranks[true_ids.size:].reshape(nq, top_k) + np.arange(nq)[:, None] * span
+    returned = (result_ids != PAD_ID).sum(axis=1)
+    hits = np.isin(result_ranks, true_ranks) & (result_ids != PAD_ID)
+    ratios = np.divide(hits.sum(axis=1), returned, out=np.zeros(nq), where=returned > 0)
+    return round(float(ratios.mean()), 3)
+
+
+def get_recall_by_sets(true_ids, result_ids):
+    """
+    Mean of |true ∩ result| / len(result) over the queries, for lists of ids of any length
+    """
+    sum_radio = 0.0
+    for index, item in enumerate(result_ids):
+        tmp = set(true_ids[index]).intersection(set(item))
+        sum_radio = sum_radio + len(tmp) / len(item)
+    return round(sum_radio / len(result_ids), 3)
@@ -0,0 +1,150 @@
+import json
+import time
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+import numpy as np
+
+logger = logging.getLogger("milvus_benchmark.result_cache")
+
+DEFAULT_MAX_BYTES = 64 * 1024 * 1024
+DEFAULT_TTL = 300
+# estimated size of the result object itself, besides ids and distances
+RESULT_OVERHEAD = 512
+
+
+def get_key(collection_name, vector_query, filter_query=None):
+    """
+    Hash of the query vectors, topk, metric type, params, filter and collection
+    """
+    h = hashlib.sha1()
+    h.update(json.dumps([collection_name, filter_query], sort_keys=True, default=str).encode())
+    for field_name, vector_param in sorted(vector_query["vector"].items()):
+        params = {k: v for k, v in vector_param.items() if k != "query"}
+        h.update(json.dumps([field_name, params], sort_keys=True, default=str).encode())
+        query = vector_param["query"]
+        if query and isinstance(query[0], bytes):
+            # binary vectors
+            h.update(b"".join(query))
+        else:
+            h.update(np.asarray(query, dtype=np.float32).tobytes())
+    return h.hexdigest()
+
+
+def get_result_size(result):
+    # ids are int64 and distances are float32
+    try:
+        return len(result._entities.ids) * 12 + RESULT_OVERHEAD
+    except AttributeError:
+        return RESULT_OVERHEAD
+
+
+class ResultCache(object):
+    """
+    LRU cache of search results, bounded by the estimated bytes of the cached results.
+    Entries expire after ttl seconds, and the entries of a collection are dropped
+    when the client writes to it. Each invalidation bumps the generation of the collection,
+    a result searched before it is not put, as it may not see the write.
+    """
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, ttl=DEFAULT_TTL):
+        self._max_bytes = max_bytes
+        self._ttl = ttl
+        self._lock = threading.Lock()
+        # key -> (collection_name, expire_time, size, result)
+        self._entries = OrderedDict()
+        self._bytes = 0
+        # collection -> generation, _generation is bumped when all entries are dropped
+        self._generations = {}
+        self._generation = 0
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self.expirations = 0
+        self.invalidations = 0
+        self.stale_puts = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def get(self, key):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                self.misses += 1
+                return None
+            if entry[1] < time.time():
+                self._remove(key)
+                self.expirations += 1
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[3]
+
+    def get_generation(self, collection_name):
+        """
+        Take it before the search and give it to put
+        """
+        with self._lock:
+            return (self._generation, self._generations.get(collection_name, 0))
+
+    def put(self, key, collection_name, result, generation=None):
+        size = get_result_size(result)
+        if size > self._max_bytes:
+            return
+        with self._lock:
+            if generation is not None and generation != (self._generation, self._generations.get(collection_name, 0)):
+                # the collection was written during the search
+                self.stale_puts += 1
+                return
+            if key in self._entries:
+                self._remove(key)
+            self._entries[key] = (collection_name, time.time() + self._ttl, size, result)
+            self._bytes += size
+            while self._bytes > self._max_bytes:
+                oldest = next(iter(self._entries))
+                self._remove(oldest)
+                self.evictions += 1
+
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        self._bytes -= entry[2]
+
+    def invalidate(self, collection_name=None):
+        """
+        Drop the entries of the collection, or all entries if collection_name is None
+        """
+        with self._lock:
+            keys = [k for k, v in self._entries.items() if collection_name is None or v[0] == collection_name]
+            for key in keys:
+                self._remove(key)
+            self.invalidations += len(keys)
+            if collection_name is None:
+                self._generation += 1
+            else:
+                self._generations[collection_name] = self._generations.get(collection_name, 0) + 1
+
+    def get_stats(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / total, 4) if total else 0.0,
+                "entries": len(self._entries),
+                "bytes": self._bytes,
+                "evictions": self.evictions,
+                "expirations": self.expirations,
+                "invalidations": self.invalidations,
+                "stale_puts": self.stale_puts
+            }
+
+    def reset_stats(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+            self.evictions = 0
+            self.expirations = 0
+            self.invalidations = 0
+            self.stale_puts = 0
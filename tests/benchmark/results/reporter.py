@@ -0,0 +1,207 @@
+import os
+import time
+import pickle
+import logging
+import threading
+from results import Reporter
+
+logger = logging.getLogger("milvus_benchmark.results.reporter")
+
+SPOOL_SUFFIX = ".metric"
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_INTERVAL = 5
+MAX_RETRY_INTERVAL = 300
+MAX_ATTEMPTS = 5
+DEAD_DIR = "dead"
+# errors of the metric itself, retrying does not help, mongoengine validation errors are AssertionError
+NON_RETRYABLE_ERRORS = (TypeError, ValueError, AssertionError)
+
+
+def _get_pid(file_name):
+    # spooled files are named <ms>_<pid>_<seq>.metric
+    items = file_name.split("_")
+    return int(items[1]) if len(items) > 2 and items[1].isdigit() else None
+
+
+def _pid_alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        pass
+    return True
+
+
+class SpoolReporter(Reporter):
+    """
+    Report metrics in background: each metric is first written to a spool directory,
+    then a thread uploads the spooled metrics in batches and retries on failure.
+    Metrics not uploaded before exit stay in the spool and are uploaded by the next run.
+    Several processes can share a spool directory, a file is claimed by renaming it.
+    A metric which can not be loaded, is rejected with a non retryable error, or fails max_attempts
+    times while other metrics are uploaded is moved to the dead directory of the spool, so it does
+    not block the metrics after it.
+    """
+    def __init__(self, upload, spool_dir, batch_size=DEFAULT_BATCH_SIZE, interval=DEFAULT_INTERVAL,
+                 max_attempts=MAX_ATTEMPTS):
+        super(SpoolReporter, self).__init__()
+        # upload: callable sending one metric, raise if failed
+        self._upload = upload
+        self._spool_dir = spool_dir
+        self._batch_size = batch_size
+        self._interval = interval
+        self._retry_interval = interval
+        self._max_attempts = max_attempts
+        self._dead_dir = os.path.join(spool_dir, DEAD_DIR)
+        # file name -> failed uploads, all of them / only those while other metrics were uploaded
+        self._failures = {}
+        self._attempts = {}
+        self._seq = 0
+        self._lock = threading.Lock()
+        self._wake_event = threading.Event()
+        self._stop_event = threading.Event()
+        self._thread = None
+        self.uploaded = 0
+        self.failed = 0
+
+    def start(self):
+        if not os.path.isdir(self._spool_dir):
+            os.makedirs(self._spool_dir, exist_ok=True)
+        self._recover()
+        if self.pending():
+            self._wake_event.set()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def _recover(self):
+        # clean up the files of processes which have exited: half written metrics are removed,
+        # claimed metrics may be uploaded already, they are moved to the dead directory
+        for file_name in os.listdir(self._spool_dir):
+            file_path = os.path.join(self._spool_dir, file_name)
+            name, ext = os.path.splitext(file_name)
+            if ext == ".tmp" and name.endswith(SPOOL_SUFFIX):
+                pid = _get_pid(name)
+                if pid is not None and not _pid_alive(pid):
+                    os.remove(file_path)
+                    logger.info("Remove orphaned spool file: %s" % file_name)
+            elif name.endswith(SPOOL_SUFFIX) and ext[1:].isdigit() and not _pid_alive(int(ext[1:])):
+                self._move_dead(file_path, name, "claimed by exited process %s" % ext[1:])
+
+    def _move_dead(self, file_path, file_name, reason):
+        if not os.path.isdir(self._dead_dir):
+            os.makedirs(self._dead_dir, exist_ok=True)
+        try:
+            os.rename(file_path, os.path.join(self._dead_dir, file_name))
+        except FileNotFoundError:
+            # claimed by another process
+            return
+        self._failures.pop(file_name, None)
+        self._attempts.pop(file_name, None)
+        logger.error("Move spooled metric: %s to %s, %s" % (file_name, self._dead_dir, reason))
+
+    def report(self, result):
+        """
+        Write the metric to the spool and return immediately
+        """
+        with self._lock:
+            self._seq += 1
+            file_name = "%d_%d_%06d%s" % (int(time.time() * 1000), os.getpid(), self._seq, SPOOL_SUFFIX)
+        file_path = os.path.join(self._spool_dir, file_name)
+        with open(file_path + ".tmp", "wb") as f:
+            pickle.dump(result, f)
+        os.rename(file_path + ".tmp", file_path)
+        self._wake_event.set()
+
+    def pending(self):
+        # metrics which failed go after the others
+        files = [f for f in os.listdir(self._spool_dir) if f.endswith(SPOOL_SUFFIX)]
+        return sorted(files, key=lambda f: (self._failures.get(f, 0), f))
+
+    def _loop(self):
+        while not self._stop_event.is_set():
+            if self._retry_interval > self._interval:
+                self._stop_event.wait(self._retry_interval)
+            else:
+                self._wake_event.wait()
+                self._wake_event.clear()
+                # batch the metrics reported in the meantime
+                self._stop_event.wait(self._interval)
+            if self._stop_event.is_set():
+                break
+            self.flush()
+            if self.pending():
+                self._wake_event.set()
+
+    def flush(self):
+        '''
+        Upload at most batch_size spooled metrics, a failed metric does not stop the batch
+        @return:
+            True if all metrics in the batch uploaded
+        '''
+        failed = []
+        uploaded = 0
+        for file_name in self.pending()[:self._batch_size]:
+            file_path = os.path.join(self._spool_dir, file_name)
+            claimed_path = "%s.%d" % (file_path, os.getpid())
+            try:
+                os.rename(file_path, claimed_path)
+            except FileNotFoundError:
+                # claimed by another process
+                continue
+            try:
+                with open(claimed_path, "rb") as f:
+                    metric = pickle.load(f)
+            except Exception as e:
+                self.failed += 1
+                self._move_dead(claimed_path, file_name, "load failed: %s" % str(e))
+                continue
+            try:
+                self._upload(metric)
+            except NON_RETRYABLE_ERRORS as e:
+                self.failed += 1
+                self._move_dead(claimed_path, file_name, "rejected: %s" % str(e))
+                continue
+            except Exception as e:
+                os.rename(claimed_path, file_path)
+                self.failed += 1
+                self._failures[file_name] = self._failures.get(file_name, 0) + 1
+                failed.append(file_name)
+                logger.error("Report metric: %s failed: %s" % (file_name, str(e)))
+                continue
+            os.remove(claimed_path)
+            self._failures.pop(file_name, None)
+            self._attempts.pop(file_name, None)
+            self.uploaded += 1
+            uploaded += 1
+        if failed and not uploaded:
+            # nothing uploaded, the reporter is not available, back off and keep the attempts
+            self._retry_interval = min(self._retry_interval * 2, MAX_RETRY_INTERVAL)
+            logger.error("Report metrics failed, retry in %ds" % self._retry_interval)
+            return False
+        for file_name in failed:
+            # other metrics were uploaded, the failure is of this metric
+            self._attempts[file_name] = self._attempts.get(file_name, 0) + 1
+            if self._attempts[file_name] >= self._max_attempts:
+                self._move_dead(os.path.join(self._spool_dir, file_name), file_name,
+                                "failed %d times" % self._attempts[file_name])
+        self._retry_interval = self._interval
+        return not failed
+
+    def close(self, timeout=60):
+        """
+        Stop the thread and try to upload the left metrics until timeout
+        """
+        self._stop_event.set()
+        self._wake_event.set()
+        if self._thread:
+            self._thread.join()
+        deadline = time.time() + timeout
+        while self.pending() and time.time() < deadline:
+            if not self.flush():
+                time.sleep(min(self._retry_interval, max(deadline - time.time(), 0)))
+        left = len(self.pending())
+        if left:
+            logger.warning("%d metrics left in spool: %s" % (left, self._spool_dir))
+        logger.info("Metrics uploaded: %d, upload failures: %d" % (self.uploaded, self.failed))
@@ -0,0 +1,66 @@
+import os
+import json
+import logging
+import threading
+import numpy as np
+from results import Reporter
+
+logger = logging.getLogger("milvus_benchmark.results.store")
+
+
+def to_dict(obj):
+    """
+    Convert a metric, or any value in it, to json types
+    """
+    if obj is None or isinstance(obj, (bool, int, float, str)):
+        return obj
+    if isinstance(obj, np.generic):
+        return obj.item()
+    if isinstance(obj, np.ndarray):
+        return obj.tolist()
+    if isinstance(obj, dict):
+        return {str(k): to_dict(v) for k, v in obj.items()}
+    if isinstance(obj, (list, tuple, set)):
+        return [to_dict(v) for v in obj]
+    if hasattr(obj, "to_mongo"):
+        # document models of the metrics api
+        return to_dict(obj.to_mongo().to_dict())
+    if hasattr(obj, "__dict__"):
+        return {k: to_dict(v) for k, v in vars(obj).items() if not k.startswith("_")}
+    return str(obj)
+
+
+class FileStore(Reporter):
+    """
+    Keep the metrics of a run in a local json lines file, one metric per line,
+    the report tool builds the html report from this file
+    """
+    def __init__(self, file_path):
+        super(FileStore, self).__init__()
+        self.file_path = file_path
+        self._lock = threading.Lock()
+        dir_name = os.path.dirname(file_path)
+        if dir_name and not os.path.isdir(dir_name):
+            os.makedirs(dir_name, exist_ok=True)
+
+    def report(self, result):
+        try:
+            line = json.dumps(to_dict(result))
+        except Exception as e:
+            logger.error("Store metric failed: %s" % str(e))
+            return
+        with self._lock:
+            with open(self.file_path, "a") as f:
+                f.write(line + "\n")
+
+
+def load_results(file_path):
+    """
+    Return the metrics stored in a file, in report order
+    """
+    results = []
+    with open(file_path) as f:
+        for line in f:
+            if line.strip():
+                results.append(json.loads(line))
+    return results
@@ -3,6 +3,7 @@ import threading
 import logging
 import pdb
 import time
+import json
 import random
 import grpc
 from multiprocessing import Process
@@ -13,15 +14,15 @@ from milvus import DataType
 from client import MilvusClient
 import utils
 import parser
+import dataset_store
+import load_generator
+import build_monitor
+import result_adapter
+import workload
 
 logger = logging.getLogger("milvus_benchmark.runner")
 
-VECTORS_PER_FILE = 1000000
-SIFT_VECTORS_PER_FILE = 100000
-BINARY_VECTORS_PER_FILE = 2000000
-
 MAX_NQ = 10001
-FILE_PREFIX = "binary_"
 
 # FOLDER_NAME = 'ann_1000m/source_data'
 SRC_BINARY_DATA_DIR = '/test/milvus/raw_data/random/'
@@ -49,34 +50,24 @@ GROUNDTRUTH_MAP = {
 }
 
 
-def gen_file_name(idx, dimension, data_type):
-    s = "%05d" % idx
-    fname = FILE_PREFIX + str(dimension) + "d_" + s + ".npy"
-    if data_type == "random":
-        fname = SRC_BINARY_DATA_DIR+fname
-    elif data_type == "sift":
-        fname = SIFT_SRC_DATA_DIR+fname
-    elif data_type == "deep":
-        fname = DEEP_SRC_DATA_DIR+fname
-    elif data_type == "binary":
-        fname = BINARY_SRC_DATA_DIR+fname
-    return fname
+DATA_DIRS = {
+    "random": SRC_BINARY_DATA_DIR,
+    "sift": SIFT_SRC_DATA_DIR,
+    "deep": DEEP_SRC_DATA_DIR,
+    "binary": BINARY_SRC_DATA_DIR
+}
+
+
+def get_dataset_store(data_type, dimension):
+    if data_type not in DATA_DIRS:
+        raise Exception("data_type: %s not supported" % data_type)
+    return dataset_store.open_store(DATA_DIRS[data_type], dimension)
 
 
 def get_vectors_from_binary(nq, dimension, data_type):
-    # use the first file, nq should be less than VECTORS_PER_FILE
     if nq > MAX_NQ:
         raise Exception("Over size nq")
-    if data_type == "random":
-        file_name = SRC_BINARY_DATA_DIR+'query_%d.npy' % dimension
-    elif data_type == "sift":
-        file_name = SIFT_SRC_DATA_DIR+'query.npy'
-    elif data_type == "deep":
-        file_name = DEEP_SRC_DATA_DIR+'query.npy'
-    elif data_type == "binary":
-        file_name = BINARY_SRC_DATA_DIR+'query.npy'
-    data = np.load(file_name)
-    vectors = data[0:nq].tolist()
+    vectors = get_dataset_store(data_type, dimension).get_queries(nq).tolist()
     return vectors
 
 
@@ -102,6 +93,14 @@ class Runner(object):
             raise Exception("Data type: %s not defined" % data_type)
         return vector_type
 
+    def get_index_info(self, milvus, vec_field_name):
+        """
+        Index of the vector field, the run types describe the index through here so the field is always given
+        """
+        index_info = milvus.describe_index(vec_field_name)
+        logger.info(index_info)
+        return index_info
+
     def get_vector_type_from_metric(self, metric_type):
         vector_type = ''
         if metric_type in ["hamming", "jaccard"]:
@@ -158,92 +157,34 @@ class Runner(object):
         total_time = 0.0
         qps = 0.0
         ni_time = 0.0
-        if data_type == "random":
-            if dimension == 512:
-                vectors_per_file = VECTORS_PER_FILE
-            elif dimension == 4096:
-                vectors_per_file = 100000
-            elif dimension == 16384:
-                vectors_per_file = 10000
-        elif data_type == "sift":
-            vectors_per_file = SIFT_VECTORS_PER_FILE
-        elif data_type in ["binary"]:
-            vectors_per_file = BINARY_VECTORS_PER_FILE
-        else:
-            raise Exception("data_type: %s not supported" % data_type)
-        if size % vectors_per_file or size % ni:
+        store = get_dataset_store(data_type, dimension)
+        if size > len(store) or size % ni:
             raise Exception("Not invalid collection size or ni")
-        i = 0
-        while i < (size // vectors_per_file):
-            vectors = []
-            if vectors_per_file >= ni:
-                file_name = gen_file_name(i, dimension, data_type)
-                # logger.info("Load npy file: %s start" % file_name)
-                data = np.load(file_name)
-                # logger.info("Load npy file: %s end" % file_name)
-                for j in range(vectors_per_file // ni):
-                    vectors = data[j*ni:(j+1)*ni].tolist()
-                    if vectors:
-                        # start insert vectors
-                        start_id = i * vectors_per_file + j * ni
-                        end_id = start_id + len(vectors)
-                        logger.debug("Start id: %s, end id: %s" % (start_id, end_id))
-                        ids = [k for k in range(start_id, end_id)]
-                        entities = milvus.generate_entities(vectors, ids)
-                        ni_start_time = time.time()
-                        try:
-                            res_ids = milvus.insert(entities, ids=ids)
-                        except grpc.RpcError as e:
-                            if e.code() == grpc.StatusCode.UNAVAILABLE:
-                                logger.debug("Retry insert")
-                                def retry():
-                                    res_ids = milvus.insert(entities, ids=ids)
-
-                                t0 = threading.Thread(target=retry)
-                                t0.start()
-                                t0.join()
-                                logger.debug("Retry successfully")
-                            raise e
-                        assert ids == res_ids
-                        # milvus.flush()
-                        logger.debug(milvus.count())
-                        ni_end_time = time.time()
-                        total_time = total_time + ni_end_time - ni_start_time
-                i += 1
-            else:
-                vectors.clear()
-                loops = ni // vectors_per_file
-                for j in range(loops):
-                    file_name = gen_file_name(loops*i+j, dimension, data_type)
-                    data = np.load(file_name)
-                    vectors.extend(data.tolist())
-                if vectors:
-                    start_id = i * vectors_per_file
-                    end_id = start_id + len(vectors)
-                    logger.info("Start id: %s, end id: %s" % (start_id, end_id))
-                    ids = [k for k in range(start_id, end_id)]
-                    entities = milvus.generate_entities(vectors, ids)
-                    ni_start_time = time.time()
-                    try:
+        for start_id, data in store.iter_batches(ni, end=size):
+            vectors = data.tolist()
+            end_id = start_id + len(vectors)
+            logger.debug("Start id: %s, end id: %s" % (start_id, end_id))
+            ids = [k for k in range(start_id, end_id)]
+            entities = milvus.generate_entities(vectors, ids)
+            ni_start_time = time.time()
+            try:
+                res_ids = milvus.insert(entities, ids=ids)
+            except grpc.RpcError as e:
+                if e.code() == grpc.StatusCode.UNAVAILABLE:
+                    logger.debug("Retry insert")
+                    def retry():
                         res_ids = milvus.insert(entities, ids=ids)
-                    except grpc.RpcError as e:
-                        if e.code() == grpc.StatusCode.UNAVAILABLE:
-                            logger.debug("Retry insert")
-                            def retry():
-                                res_ids = milvus.insert(entities, ids=ids)
-
-                            t0 = threading.Thread(target=retry)
-                            t0.start()
-                            t0.join()
-                            logger.debug("Retry successfully")
-                        raise e
-
-                    assert ids == res_ids
-                    # milvus.flush()
-                    logger.debug(milvus.count())
-                    ni_end_time = time.time()
-                    total_time = total_time + ni_end_time - ni_start_time
-                i += loops
+
+                    t0 = threading.Thread(target=retry)
+                    t0.start()
+                    t0.join()
+                    logger.debug("Retry successfully")
+                raise e
+            assert ids == res_ids
+            # milvus.flush()
+            logger.debug(milvus.count())
+            ni_end_time = time.time()
+            total_time = total_time + ni_end_time - ni_start_time
         qps = round(size / total_time, 2)
         ni_time = round(total_time / (size / ni), 2)
         bi_res["total_time"] = round(total_time, 2)
@@ -301,6 +242,447 @@ class Runner(object):
         result_ids = milvus.get_ids(query_res)
         return result_ids
 
+    def do_meta_scalability(self, milvus, collection_nums, dimension, partition_num=0, sample_count=10,
+                            growth_threshold=1.0, clean=True):
+        '''
+        @params:
+            milvus: server connect instance
+            collection_nums: collection count checkpoints, each one is measured after the ramp reaches it
+            partition_num: partitions created in each collection
+            sample_count: requests per metadata operation at each checkpoint
+            growth_threshold: growth exponent above which an operation is reported as superlinear
+        @return:
+            levels: latency stats(ms) of each metadata operation at each checkpoint
+            growth: fitted growth exponent of avg latency against collection count
+            superlinear: operations whose growth exponent is over the threshold
+        '''
+        ops = ["create_collection", "create_partition", "has_collection", "describe_collection",
+               "list_collections", "drop_collection"]
+        prefix = utils.get_unique_name(prefix="meta_scale_")
+        names = []
+        levels = []
+        try:
+            for collection_num in sorted(collection_nums):
+                latencies = dict((op, []) for op in ops)
+                logger.info("Ramp collections from %d to %d" % (len(names), collection_num))
+                while len(names) < collection_num:
+                    name = "%s_%d" % (prefix, len(names))
+                    start_time = time.time()
+                    milvus.create_collection(dimension, collection_name=name)
+                    latencies["create_collection"].append(time.time() - start_time)
+                    names.append(name)
+                    for j in range(partition_num):
+                        start_time = time.time()
+                        milvus.create_partition("partition_%d" % j, collection_name=name)
+                        latencies["create_partition"].append(time.time() - start_time)
+                for name in random.sample(names, min(sample_count, len(names))):
+                    start_time = time.time()
+                    milvus.exists_collection(collection_name=name)
+                    latencies["has_collection"].append(time.time() - start_time)
+                    start_time = time.time()
+                    milvus.get_info(collection_name=name)
+                    latencies["describe_collection"].append(time.time() - start_time)
+                for i in range(sample_count):
+                    start_time = time.time()
+                    milvus.show_collections()
+                    latencies["list_collections"].append(time.time() - start_time)
+                # drop extra collections so the checkpoint size is kept for the next ramp
+                for i in range(sample_count):
+                    name = "%s_tmp_%d" % (prefix, i)
+                    milvus.create_collection(dimension, collection_name=name)
+                    start_time = time.time()
+                    milvus.drop(collection_name=name, wait=False)
+                    latencies["drop_collection"].append(time.time() - start_time)
+                    # not timed, the wait polls has_collection
+                    milvus.wait_dropped(collection_name=name)
+                level = {
+                    "collection_num": collection_num,
+                    "partition_num": collection_num * partition_num
+                }
+                for op in ops:
+                    level[op] = utils.get_latency_stats(latencies[op])
+                logger.info(level)
+                levels.append(level)
+        finally:
+            if clean:
+                logger.info("Drop %d collections created by meta scalability test" % len(names))
+                for name in names:
+                    milvus.drop(collection_name=name)
+        growth = {}
+        superlinear = []
+        sizes = [level["collection_num"] for level in levels]
+        for op in ops:
+            avgs = [level[op]["avg"] for level in levels]
+            growth[op] = utils.get_growth_exponent(sizes, avgs)
+            if growth[op] > growth_threshold:
+                logger.error("Superlinear latency growth of %s: exponent %s" % (op, growth[op]))
+                superlinear.append(op)
+        return {"levels": levels, "growth": growth, "superlinear": superlinear}
+
+    def do_search_throughput(self, milvus, vec_field_name, query_vectors, top_k, metric_type, search_param,
+                             concurrency, during_time, filter_query=None, query_pool=None, latency_log=None,
+                             tags=None):
+        '''
+        @params:
+            query_vectors: vectors of one request
+            concurrency: count of threads sending requests
+            during_time: seconds to run
+            query_pool: if given, the requests take len(query_vectors) vectors from it in turn,
+                instead of all sending query_vectors
+            latency_log: if given, the latency of each request is appended to this file, with the tags
+        @return:
+            qps and latency(ms) stats of the requests
+        '''
+        vector_param = {
+            "topk": top_k,
+            "query": query_vectors,
+            "metric_type": utils.metric_type_trans(metric_type),
+            "params": search_param}
+        vector_query = {"vector": {vec_field_name: vector_param}}
+        nq = len(query_vectors)
+        lock = threading.Lock()
+        offset = {"next": 0}
+
+        def request(worker_idx):
+            query = vector_query
+            if query_pool is not None:
+                with lock:
+                    start = offset["next"]
+                    offset["next"] = (start + nq) % (len(query_pool) - nq + 1)
+                query = {"vector": {vec_field_name: dict(vector_param, query=query_pool[start:start + nq])}}
+            milvus.query(query, filter_query=filter_query, log=False)
+
+        res = load_generator.run_closed_loop(request, concurrency, during_time=during_time, latency_log=latency_log,
+                                             tags=tags)
+        stats = utils.get_latency_stats(res["latencies"])
+        stats.update({"qps": res["qps"], "errors": res["errors"]})
+        return stats
+
+    def do_coalesce_compare(self, milvus, vec_field_name, query_vectors, top_k, metric_type, search_param,
+                            concurrency, during_time, windows, max_batch=None):
+        '''
+        Send nq=1 requests in concurrency threads without coalescing and with each wait window
+        @params:
+            query_vectors: each request searches one vector picked from them
+            windows: wait windows(s) of the coalescer to compare
+        @return:
+            list of qps and latency(ms) stats, the first one without coalescing
+        '''
+        def request(worker_idx):
+            vector_query = {"vector": {vec_field_name: {
+                "topk": top_k,
+                "query": [random.choice(query_vectors)],
+                "metric_type": utils.metric_type_trans(metric_type),
+                "params": search_param}
+            }}
+            milvus.query(vector_query, log=False)
+
+        results = []
+        for window in [None] + list(windows):
+            coalescer = milvus.enable_coalescer(window=window, max_batch=max_batch)
+            try:
+                res = load_generator.run_closed_loop(request, concurrency, during_time=during_time)
+            finally:
+                milvus.enable_coalescer(None)
+            stats = utils.get_latency_stats(res["latencies"])
+            stats.update({"window": window, "qps": res["qps"], "errors": res["errors"]})
+            stats["avg_batch_size"] = coalescer.get_stats()["avg_batch_size"] if coalescer else 1.0
+            logger.info("Coalesce window: %s, stats: %s" % (window, stats))
+            results.append(stats)
+        return results
+
+    def do_cache_replay(self, milvus, vec_field_name, query_vectors, top_k, metric_type, search_param,
+                        concurrency, total, cache_sizes, zipf_s=1.0, ttl=None):
+        '''
+        Replay a Zipfian mix of nq=1 queries without result cache and with each cache size
+        @params:
+            query_vectors: distinct queries, the i-th one is sent with probability ~ 1 / (i + 1)^zipf_s
+            total: count of queries to replay
+            cache_sizes: size limits(bytes) of the cache to compare
+        @return:
+            list of qps, latency(ms) and hit rate stats, the first one without cache
+        '''
+        indices = utils.get_zipf_indices(len(query_vectors), total, s=zipf_s, seed=0)
+        logger.info("Replay %d queries, %d distinct" % (total, len(set(indices.tolist()))))
+        lock = threading.Lock()
+        cursor = {"pos": 0}
+
+        def request(worker_idx):
+            with lock:
+                index = indices[cursor["pos"] % total]
+                cursor["pos"] += 1
+            vector_query = {"vector": {vec_field_name: {
+                "topk": top_k,
+                "query": [query_vectors[index]],
+                "metric_type": utils.metric_type_trans(metric_type),
+                "params": search_param}
+            }}
+            milvus.query(vector_query, log=False)
+
+        results = []
+        for cache_size in [None] + list(cache_sizes):
+            cursor["pos"] = 0
+            kwargs = {"ttl": ttl} if ttl else {}
+            cache = milvus.enable_result_cache(max_bytes=cache_size, **kwargs)
+            try:
+                res = load_generator.run_closed_loop(request, concurrency, total=total)
+            finally:
+                milvus.enable_result_cache(None)
+            stats = utils.get_latency_stats(res["latencies"])
+            stats.update({"cache_size": cache_size, "qps": res["qps"], "errors": res["errors"]})
+            if cache:
+                cache_stats = cache.get_stats()
+                stats.update({"hit_rate": cache_stats["hit_rate"], "cached_bytes": cache_stats["bytes"],
+                              "evictions": cache_stats["evictions"]})
+            else:
+                stats.update({"hit_rate": 0.0, "cached_bytes": 0, "evictions": 0})
+            logger.info("Cache size: %s, stats: %s" % (cache_size, stats))
+            results.append(stats)
+        return results
+
+    def do_get_bulk(self, milvus, get_ids, chunk_sizes, concurrencies, run_count=1):
+        '''
+        Get the ids with each chunk size and concurrency
+        @return:
+            dict of (chunk_size, concurrency) -> min time(s), ids/s and count of found entities
+        '''
+        res = {}
+        for chunk_size, concurrency in product(chunk_sizes, concurrencies):
+            # warm up the connections of the threads
+            milvus.get_entities_bulk(get_ids[:chunk_size * concurrency], chunk_size, concurrency, log=False)
+            min_time = None
+            for i in range(run_count):
+                start_time = time.time()
+                entities = milvus.get_entities_bulk(get_ids, chunk_size, concurrency, log=False)
+                interval_time = time.time() - start_time
+                if min_time is None or interval_time < min_time:
+                    min_time = interval_time
+            found = sum(1 for entity in entities if entity is not None)
+            if len(entities) != len(get_ids):
+                raise Exception("Get %d entities for %d ids" % (len(entities), len(get_ids)))
+            logger.info("Chunk size: %d, concurrency: %d, time: %.3f, found: %d" % (chunk_size, concurrency, min_time, found))
+            res[(chunk_size, concurrency)] = {
+                "time": round(min_time, 3),
+                "throughput": round(len(get_ids) / min_time, 1) if min_time else 0.0,
+                "found": found
+            }
+        return res
+
+    def do_build_monitor(self, milvus, collection_name, index_field_name, index_type, metric_type, index_param, query_vectors,
+                         top_k, search_param, cpu_probe, monitor_config):
+        '''
+        Drop the index, then build it async while searching, and sample the build progress on a fixed interval
+        @params:
+            cpu_probe: callable returning the cpu cores used by the server
+            monitor_config: interval, search_threads, baseline_time, timeout and timeline_path
+        @return:
+            analysis of the build monitor, with the timeline path
+        '''
+        vector_query = {"vector": {index_field_name: {
+            "topk": top_k,
+            "query": query_vectors,
+            "metric_type": utils.metric_type_trans(metric_type),
+            "params": search_param}
+        }}
+
+        def search():
+            milvus.query(vector_query, log=False)
+
+        def progress_probe():
+            return milvus.get_index_progress(index_field_name)
+
+        monitor = build_monitor.BuildMonitor(
+            progress_probe, cpu_probe, search,
+            interval=monitor_config.get("interval", build_monitor.DEFAULT_SAMPLE_INTERVAL),
+            search_threads=monitor_config.get("search_threads", build_monitor.DEFAULT_SEARCH_THREADS))
+        milvus.drop_index(index_field_name)
+        baseline_time = utils.timestr_to_int(monitor_config.get("baseline_time", build_monitor.DEFAULT_BASELINE_TIME))
+        monitor.measure_baseline(baseline_time)
+        timeout = utils.timestr_to_int(monitor_config["timeout"]) if "timeout" in monitor_config else None
+        monitor.run(lambda: milvus.create_index(index_field_name, index_type, metric_type, _async=True,
+                                                index_param=index_param), timeout=timeout)
+        timeline_path = monitor_config["timeline_path"] if "timeline_path" in monitor_config \
+            else os.path.join("logs", "build_%s_%d.json" % (collection_name, int(time.time())))
+        monitor.save(timeline_path)
+        res = monitor.analyze()
+        res["timeline_path"] = timeline_path
+        logger.info(res)
+        return res, monitor.series
+
+    def do_find_max_qps(self, milvus, vec_field_name, query_vectors, top_k, metric_type, search_param, p99_slo,
+                        min_clients, max_clients, step_time, warm_up=0, max_error_rate=0.0, query_pool=None,
+                        latency_log=None):
+        '''
+        Binary search the clients count for the highest qps with p99 latency under the slo
+        @params:
+            p99_slo: p99 latency limit(ms) of one request
+            min_clients, max_clients: range of the concurrent clients, qps is assumed to grow with the clients
+            step_time: seconds each step holds the load, after warm_up seconds not measured
+            query_pool: vectors the requests take their query vectors from in turn
+            latency_log: if given, the latency of each measured request is appended to this file
+        @return:
+            stats of the best passed step, None if even min_clients fails, and stats of all steps
+        '''
+        steps = []
+        best = None
+        low, high = min_clients, max_clients
+        while low <= high:
+            clients = (low + high) // 2
+            if warm_up:
+                self.do_search_throughput(milvus, vec_field_name, query_vectors, top_k, metric_type, search_param,
+                                          clients, warm_up, query_pool=query_pool)
+            stats = self.do_search_throughput(milvus, vec_field_name, query_vectors, top_k, metric_type,
+                                              search_param, clients, step_time, query_pool=query_pool,
+                                              latency_log=latency_log, tags={"clients": clients})
+            total = stats["count"] + stats["errors"]
+            error_rate = stats["errors"] / total if total else 1.0
+            stats.update({"clients": clients, "error_rate": round(error_rate, 4),
+                          "passed": stats["count"] > 0 and stats["p99"] <= p99_slo and error_rate <= max_error_rate})
+            logger.info("Clients: %d, qps: %s, p99: %s, error rate: %s, passed: %s" % (
+                clients, stats["qps"], stats["p99"], stats["error_rate"], stats["passed"]))
+            steps.append(stats)
+            if stats["passed"]:
+                if best is None or stats["qps"] > best["qps"]:
+                    best = stats
+                low = clients + 1
+            else:
+                high = clients - 1
+        return best, steps
+
+    def do_find_best_nq(self, milvus, vec_field_name, query_vectors, top_k, metric_type, search_param, latency_cap,
+                        min_nq=1, max_nq=None, run_count=10, percentile="p99", tolerance=0.05, concurrency=1):
+        '''
+        Probe the nq of one request for the highest vectors/s with latency under the cap: nq is doubled from min_nq
+        until the cap is passed, then the nq between the last passed and the failed probe is interpolated from
+        their latencies, with bisection when the interpolation does not halve the range
+        @params:
+            latency_cap: limit(ms) of the percentile latency of a request
+            run_count: requests of each probe, sent by concurrency threads
+            tolerance: the probing stops when the range is under this ratio of the passed nq
+        @return:
+            best: stats of the passed probe with the highest vectors/s, None if min_nq fails
+            max_nq: highest passed nq
+            fixed_cost, marginal_cost: avg latency(ms) ~ fixed_cost + marginal_cost * nq, fitted on the probes
+            steps: stats of the probes sorted by nq, with the marginal cost from the previous probe
+        '''
+        max_nq = min(max_nq or len(query_vectors), len(query_vectors))
+        probes = {}
+
+        def probe(nq):
+            vector_query = {"vector": {vec_field_name: {
+                "topk": top_k,
+                "query": query_vectors[:nq],
+                "metric_type": utils.metric_type_trans(metric_type),
+                "params": search_param}
+            }}
+
+            def request(worker_idx):
+                milvus.query(vector_query, log=False)
+
+            res = load_generator.run_closed_loop(request, concurrency, total=run_count)
+            stats = utils.get_latency_stats(res["latencies"])
+            stats.update({"nq": nq, "qps": res["qps"], "vectors_per_second": round(nq * res["qps"], 2),
+                          "errors": res["errors"],
+                          "passed": stats["count"] > 0 and not res["errors"] and stats[percentile] <= latency_cap})
+            logger.info("Nq: %d, %s latency: %s, vectors/s: %s, passed: %s" % (
+                nq, percentile, stats[percentile], stats["vectors_per_second"], stats["passed"]))
+            probes[nq] = stats
+            return stats
+
+        low, high = None, None
+        nq = min_nq
+        while True:
+            if not probe(nq)["passed"]:
+                high = nq
+                break
+            low = nq
+            if nq >= max_nq:
+                break
+            nq = min(nq * 2, max_nq)
+        bisect = False
+        while low is not None and high is not None and high - low > max(1, int(low * tolerance)):
+            low_latency, high_latency = probes[low][percentile], probes[high][percentile]
+            if not bisect and high_latency > low_latency:
+                # latency is about linear in nq between two probes
+                nq = low + int((latency_cap - low_latency) * (high - low) / (high_latency - low_latency))
+            else:
+                nq = (low + high) // 2
+            nq = min(max(nq, low + 1), high - 1)
+            width = high - low
+            if probe(nq)["passed"]:
+                low = nq
+            else:
+                high = nq
+            bisect = (high - low) * 2 > width
+        steps = [probes[nq] for nq in sorted(probes)]
+        measured = [s for s in steps if s["count"]]
+        for prev, s in zip(measured, measured[1:]):
+            s["marginal_cost"] = round((s["avg"] - prev["avg"]) / (s["nq"] - prev["nq"]), 4)
+        fixed_cost, marginal_cost = utils.get_linear_fit([s["nq"] for s in measured], [s["avg"] for s in measured])
+        passed = [s for s in steps if s["passed"]]
+        best = max(passed, key=lambda s: s["vectors_per_second"]) if passed else None
+        return {"best": best, "max_nq": low, "fixed_cost": fixed_cost, "marginal_cost": marginal_cost, "steps": steps}
+
+    def get_workload_operations(self, milvus, vec_field_name, dimension, metric_type, operations):
+        '''
+        @params:
+            operations: params of each operation, search: nq, top_k, search_param; insert: ni; delete: nd
+        @return:
+            dict of operation name -> callable sending one request
+        '''
+        search_config = operations.get("search", {})
+        nq = search_config.get("nq", 1)
+        query_vectors = utils.generate_vectors(max(nq, 1000), dimension)
+        vector_query = {"vector": {vec_field_name: {
+            "topk": search_config.get("top_k", 10),
+            "query": query_vectors[:nq],
+            "metric_type": utils.metric_type_trans(metric_type),
+            "params": search_config.get("search_param", {})}
+        }}
+        ni = operations.get("insert", {}).get("ni", 100)
+        nd = operations.get("delete", {}).get("nd", 1)
+        insert_vectors = utils.generate_vectors(ni, dimension)
+        # fields of the collection, got once, values are replaced for each insert
+        template = milvus.generate_entities(insert_vectors, ids=list(range(ni)))
+        lock = threading.Lock()
+        # new ids start after the rows in the collection
+        next_id = {"value": milvus.count()}
+
+        def search():
+            milvus.query(vector_query, log=False)
+
+        def insert():
+            with lock:
+                ids = list(range(next_id["value"], next_id["value"] + ni))
+                next_id["value"] += ni
+            entities = [dict(field, values=milvus.generate_values(field["type"], insert_vectors, ids))
+                        for field in template]
+            if milvus.insert(entities, ids=ids, log=False) is None:
+                raise Exception("Insert failed")
+
+        def delete():
+            milvus.delete(milvus.get_rand_ids(nd), log=False)
+
+        def flush():
+            milvus.flush(log=False)
+
+        return {"search": search, "insert": insert, "delete": delete, "flush": flush}
+
+    def do_workload(self, milvus, vec_field_name, dimension, metric_type, operations, workload_config,
+                    latency_log=None):
+        '''
+        Run the phases of the workload config, the latency of each request is appended to latency_log if given
+        @return:
+            stats of each phase
+        '''
+        phases = workload.get_phases(workload_config)
+        max_workers = workload_config.get("max_workers", workload.DEFAULT_MAX_WORKERS)
+        ops = self.get_workload_operations(milvus, vec_field_name, dimension, metric_type, operations)
+        res = workload.PhasedWorkload(ops, phases, max_workers=max_workers, latency_log=latency_log).run()
+        for stats in res:
+            logger.info("Phase: %s, stats: %s" % (stats["phase"], json.dumps(stats)))
+        return res
+
     def do_query_acc(self, milvus, collection_name, top_k, nq, id_store_name, search_param=None):
         (data_type, collection_size, index_file_size, dimension, metric_type) = parser.collection_parser(collection_name)
         base_query_vectors = get_vectors_from_binary(MAX_NQ, dimension, data_type)
@@ -338,24 +720,14 @@ class Runner(object):
         """
         Use the intersection length
         """
-        sum_radio = 0.0
-        for index, item in enumerate(result_ids):
-            # tmp = set(item).intersection(set(flat_id_list[index]))
-            tmp = set(true_ids[index]).intersection(set(item))
-            sum_radio = sum_radio + len(tmp) / len(item)
-            # logger.debug(sum_radio)
-        return round(sum_radio / len(result_ids), 3)
-
-    """
-    Implementation based on:
-        https://github.com/facebookresearch/faiss/blob/master/benchs/datasets.py
-    """
+        if isinstance(result_ids, np.ndarray) and result_ids.ndim == 2:
+            return result_adapter.get_recall(true_ids, result_ids)
+        return result_adapter.get_recall_by_sets(true_ids, result_ids)
+
     def get_groundtruth_ids(self, collection_size):
         fname = GROUNDTRUTH_MAP[str(collection_size)]
         fname = SIFT_SRC_GROUNDTRUTH_DATA_DIR + "/" + fname
-        a = np.fromfile(fname, dtype='int32')
-        d = a[0]
-        true_ids = a.reshape(-1, d + 1)[:, 1:].copy()
+        true_ids = np.array(dataset_store.load_vectors(fname))
         return true_ids
 
     def get_fields(self, milvus, collection_name):
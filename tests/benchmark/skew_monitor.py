@@ -0,0 +1,142 @@
+import os
+import re
+import time
+import json
+import logging
+import threading
+import numpy as np
+
+logger = logging.getLogger("milvus_benchmark.skew_monitor")
+
+DEFAULT_SAMPLE_INTERVAL = 30
+# metric name patterns of the query node metrics endpoint
+DEFAULT_METRIC_PATTERNS = {
+    "search": r"search.*(count|total)|sq_req_count",
+    "segments": r"segment_(num|count)"
+}
+# search is a counter, its rate in each interval is compared across the nodes
+COUNTER_KEYS = ["search"]
+
+
+def parse_prometheus_text(text, patterns):
+    """
+    Sum the samples of the metrics matching each pattern in prometheus text format
+    """
+    compiled = {key: re.compile(pattern) for key, pattern in patterns.items()}
+    res = {}
+    for line in text.splitlines():
+        if not line or line.startswith("#"):
+            continue
+        items = line.rsplit("}", 1) if "}" in line else line.split(None, 1)
+        name = items[0].split("{")[0].strip()
+        try:
+            value = float(items[1].split()[0])
+        except (IndexError, ValueError):
+            continue
+        for key, pattern in compiled.items():
+            if pattern.search(name):
+                res[key] = res.get(key, 0.0) + value
+    return res
+
+
+def get_imbalance(values):
+    '''
+    @return:
+        max / mean of the values, 1 means balanced, and the coefficient of variation
+    '''
+    values = np.array([v for v in values if v is not None], dtype=np.float64)
+    if len(values) < 2 or values.mean() <= 0:
+        return None, None
+    return round(float(values.max() / values.mean()), 3), round(float(values.std() / values.mean()), 3)
+
+
+class SkewMonitor(object):
+    """
+    Sample the load of each query node on an interval during a run and compute how unevenly
+    the searches, segments, memory and cpu are spread over the nodes
+    """
+    def __init__(self, node_probe, interval=DEFAULT_SAMPLE_INTERVAL):
+        # node_probe: callable returning {node name: {"search", "segments", "memory", "cpu"}}, any may be None
+        self._node_probe = node_probe
+        self._interval = interval
+        self._stop_event = threading.Event()
+        self._thread = None
+        self._start_time = None
+        self._last = {}
+        self._first = {}
+        self.series = []
+
+    def start(self):
+        self._start_time = time.time()
+        self._stop_event.clear()
+        self._sample()
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop_event.set()
+        if self._thread:
+            self._thread.join()
+        self._sample()
+
+    def _loop(self):
+        while not self._stop_event.wait(self._interval):
+            self._sample()
+
+    def _sample(self):
+        try:
+            nodes = self._node_probe()
+        except Exception as e:
+            logger.error("Get query node stats failed: %s" % str(e))
+            return
+        now = time.time()
+        point = {"time": round(now - self._start_time, 1), "nodes": {}, "imbalance": {}}
+        for node, stats in nodes.items():
+            item = dict(stats)
+            for key in COUNTER_KEYS:
+                value = stats.get(key)
+                if value is None:
+                    continue
+                self._first.setdefault(node, {}).setdefault(key, value)
+                last = self._last.get(node, {}).get(key)
+                # rate of the counter since the last sample, None on the first one or after a restart
+                item[key] = round((value - last[1]) / (now - last[0]), 3) \
+                    if last and value >= last[1] and now > last[0] else None
+                self._last.setdefault(node, {})[key] = (now, value)
+            point["nodes"][node] = item
+        for key in ["search", "segments", "memory", "cpu"]:
+            point["imbalance"][key] = get_imbalance([item.get(key) for item in point["nodes"].values()])[0]
+        logger.debug(point)
+        self.series.append(point)
+
+    def analyze(self):
+        '''
+        @return:
+            imbalance (max / mean over the nodes) of each metric: at the end and the worst one during the run,
+            the imbalance of the total searches of the run, and the node most often the busiest
+        '''
+        res = {"nodes": sorted({node for p in self.series for node in p["nodes"]}), "samples": len(self.series)}
+        for key in ["search", "segments", "memory", "cpu"]:
+            values = [p["imbalance"][key] for p in self.series if p["imbalance"].get(key) is not None]
+            res["max_%s_imbalance" % key] = max(values) if values else None
+            res["last_%s_imbalance" % key] = values[-1] if values else None
+        totals = {node: self._last[node]["search"][1] - self._first[node]["search"]
+                  for node in self._last if "search" in self._last[node]}
+        res["search_totals"] = totals
+        res["search_imbalance"], res["search_cv"] = get_imbalance(list(totals.values()))
+        busiest = {}
+        for p in self.series:
+            rates = {node: item.get("search") for node, item in p["nodes"].items() if item.get("search") is not None}
+            if rates:
+                node = max(rates, key=rates.get)
+                busiest[node] = busiest.get(node, 0) + 1
+        res["hot_node"] = max(busiest, key=busiest.get) if busiest else None
+        return res
+
+    def save(self, file_path):
+        dir_name = os.path.dirname(file_path)
+        if dir_name and not os.path.isdir(dir_name):
+            os.makedirs(dir_name, exist_ok=True)
+        with open(file_path, "w") as f:
+            json.dump({"interval": self._interval, "series": self.series}, f)
+        logger.info("Query node load series saved in: %s" % file_path)
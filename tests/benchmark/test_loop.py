@@ -15,7 +15,7 @@ if __name__ == "__main__":
     index_param = {"nlist": 2048}
     collection_names = []
     milvus_instances_map = {}
-    insert_vectors = [[random.random() for _ in range(dimension)] for _ in range(insert_xb)]
+    insert_vectors = utils.generate_vectors(insert_xb, dimension)
 
     for i in range(collection_num):
         name = utils.get_unique_name(prefix="collection_")
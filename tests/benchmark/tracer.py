@@ -0,0 +1,213 @@
+"""
+Span tracing of the benchmark client operations.
+
+Spans are written to a Chrome trace file (viewable in chrome://tracing or Perfetto),
+or to OpenTelemetry JSON lines (one OTLP ExportTraceServiceRequest per line, as written
+by the collector file exporter) which can be loaded next to the server traces in Jaeger.
+Finished spans are put into a queue and written by a background thread, so writing
+never blocks the traced call.
+"""
+import os
+import json
+import time
+import queue
+import random
+import logging
+import threading
+from contextlib import contextmanager
+
+logger = logging.getLogger("milvus_benchmark.tracer")
+
+FORMATS = ["chrome", "otlp"]
+SERVICE_NAME = "milvus_benchmark"
+QUEUE_SIZE = 100000
+FLUSH_INTERVAL = 1
+
+
+class Span(object):
+    def __init__(self, name, trace_id, parent_id=None, attributes=None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = "%016x" % random.getrandbits(64)
+        self.parent_id = parent_id
+        self.attributes = dict(attributes) if attributes else {}
+        self.error = None
+        self.start_ns = time.time_ns()
+        self._start = time.perf_counter()
+        self.duration_ns = 0
+        self.pid = os.getpid()
+        self.tid = threading.get_ident()
+
+    def set_attributes(self, **attributes):
+        self.attributes.update(attributes)
+
+    def finish(self):
+        self.duration_ns = int((time.perf_counter() - self._start) * 1e9)
+
+
+class Tracer(object):
+    def __init__(self, file_path, file_format="chrome"):
+        if file_format not in FORMATS:
+            raise Exception("Trace format: %s not supported" % file_format)
+        self._file_path = file_path
+        self._format = file_format
+        self._queue = queue.Queue(maxsize=QUEUE_SIZE)
+        self._local = threading.local()
+        self._stop_event = threading.Event()
+        self.dropped = 0
+        dir_name = os.path.dirname(file_path)
+        if dir_name and not os.path.isdir(dir_name):
+            os.makedirs(dir_name, exist_ok=True)
+        self._file = open(file_path, "w")
+        if self._format == "chrome":
+            # the closing bracket is optional for the chrome trace json array format
+            self._file.write("[\n")
+            self._first = True
+        self._thread = threading.Thread(target=self._loop, daemon=True)
+        self._thread.start()
+
+    def _stack(self):
+        if not hasattr(self._local, "stack"):
+            self._local.stack = []
+        return self._local.stack
+
+    @contextmanager
+    def span(self, name, **attributes):
+        stack = self._stack()
+        parent = stack[-1] if stack else None
+        trace_id = parent.trace_id if parent else "%032x" % random.getrandbits(128)
+        span = Span(name, trace_id, parent_id=parent.span_id if parent else None, attributes=attributes)
+        stack.append(span)
+        try:
+            yield span
+        except Exception as e:
+            span.error = str(e)
+            raise
+        finally:
+            span.finish()
+            stack.pop()
+            try:
+                self._queue.put_nowait(span)
+            except queue.Full:
+                self.dropped += 1
+
+    def set_attributes(self, **attributes):
+        # add attributes to the current span of this thread
+        stack = self._stack()
+        if stack:
+            stack[-1].set_attributes(**attributes)
+
+    def _loop(self):
+        while not self._stop_event.is_set():
+            self._stop_event.wait(FLUSH_INTERVAL)
+            self._write_batch()
+
+    def _write_batch(self):
+        spans = []
+        while True:
+            try:
+                spans.append(self._queue.get_nowait())
+            except queue.Empty:
+                break
+        if not spans:
+            return
+        if self._format == "chrome":
+            for span in spans:
+                if not self._first:
+                    self._file.write(",\n")
+                self._first = False
+                self._file.write(json.dumps(self._to_chrome(span)))
+        else:
+            self._file.write(json.dumps(self._to_otlp(spans)) + "\n")
+        self._file.flush()
+
+    def _to_chrome(self, span):
+        args = dict(span.attributes)
+        if span.error:
+            args["error"] = span.error
+        return {
+            "name": span.name,
+            "cat": SERVICE_NAME,
+            "ph": "X",
+            "ts": span.start_ns / 1000,
+            "dur": span.duration_ns / 1000,
+            "pid": span.pid,
+            "tid": span.tid,
+            "args": args
+        }
+
+    def _to_otlp(self, spans):
+        items = []
+        for span in spans:
+            item = {
+                "traceId": span.trace_id,
+                "spanId": span.span_id,
+                "name": span.name,
+                "kind": 3,
+                "startTimeUnixNano": str(span.start_ns),
+                "endTimeUnixNano": str(span.start_ns + span.duration_ns),
+                "attributes": [{"key": k, "value": _to_otlp_value(v)} for k, v in span.attributes.items()],
+                "status": {"code": 2, "message": span.error} if span.error else {"code": 1}
+            }
+            if span.parent_id:
+                item["parentSpanId"] = span.parent_id
+            items.append(item)
+        return {"resourceSpans": [{
+            "resource": {"attributes": [{"key": "service.name", "value": {"stringValue": SERVICE_NAME}}]},
+            "scopeSpans": [{"scope": {"name": SERVICE_NAME}, "spans": items}]
+        }]}
+
+    def close(self):
+        self._stop_event.set()
+        self._thread.join()
+        self._write_batch()
+        if self._format == "chrome":
+            self._file.write("\n]\n")
+        self._file.close()
+        if self.dropped:
+            logger.warning("%d spans dropped since the trace queue is full" % self.dropped)
+        logger.info("Trace saved in: %s" % self._file_path)
+
+
+def _to_otlp_value(value):
+    if isinstance(value, bool):
+        return {"boolValue": value}
+    if isinstance(value, int):
+        return {"intValue": str(value)}
+    if isinstance(value, float):
+        return {"doubleValue": value}
+    if isinstance(value, str):
+        return {"stringValue": value}
+    return {"stringValue": json.dumps(value)}
+
+
+class NoopTracer(object):
+    @contextmanager
+    def span(self, name, **attributes):
+        yield None
+
+    def set_attributes(self, **attributes):
+        pass
+
+    def close(self):
+        pass
+
+
+_tracer = NoopTracer()
+
+
+def init_tracer(file_path, file_format="chrome"):
+    global _tracer
+    _tracer.close()
+    _tracer = Tracer(file_path, file_format=file_format)
+    return _tracer
+
+
+def get_tracer():
+    return _tracer
+
+
+def close_tracer():
+    global _tracer
+    _tracer.close()
+    _tracer = NoopTracer()
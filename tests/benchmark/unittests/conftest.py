@@ -0,0 +1,5 @@
+import os
+import sys
+
+# the benchmark modules are imported by their names, as main.py does
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
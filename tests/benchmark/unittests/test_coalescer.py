@@ -0,0 +1,52 @@
+import threading
+from coalescer import SearchCoalescer
+
+
+class FakeEntities(object):
+    def __init__(self, ids):
+        self.ids = ids
+
+
+class FakeRaw(object):
+    def __init__(self, distances=()):
+        self.distances = list(distances)
+
+
+class FakeResult(object):
+    def __init__(self, ids, distances, nq):
+        self._entities = FakeEntities(ids)
+        self._raw = FakeRaw(distances)
+        self._nq = nq
+
+    def __len__(self):
+        return self._nq
+
+    def __getitem__(self, item):
+        return item
+
+
+def test_split_result_narrower_than_topk():
+    # topk 10 requested, the collection has 2 entities so each query returns 2 hits
+    coalescer = SearchCoalescer(window=0.2, max_batch=3)
+    searched = []
+
+    def run(vectors):
+        searched.append(len(vectors))
+        ids = []
+        for vector in vectors:
+            ids.extend([vector[0], vector[0] + 100])
+        return FakeResult(ids, [0.1] * len(ids), len(vectors))
+
+    results = {}
+
+    def search(i):
+        results[i] = coalescer.search("key", [i], run)
+
+    threads = [threading.Thread(target=search, args=(i,)) for i in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert searched == [3]
+    for i, res in results.items():
+        assert res._entities.ids == [i, i + 100]
@@ -0,0 +1,35 @@
+import pytest
+import local_scheduler
+
+
+def get_core_of(cpu, siblings):
+    return tuple(sorted(siblings[cpu]))
+
+
+def test_allocate_slots_keeps_siblings_together():
+    # 8 cpus with 2 hyperthreads per core, siblings are numbered n and n + 4 as on most hosts
+    siblings = {cpu: [cpu % 4, cpu % 4 + 4] for cpu in range(8)}
+    slots = local_scheduler.allocate_slots(2, 1, nodes=[(0, list(range(8)))], siblings=siblings)
+    assert slots == [
+        {"node": 0, "client_cpus": [0, 4], "server_cpus": [1, 5]},
+        {"node": 0, "client_cpus": [2, 6], "server_cpus": [3, 7]}
+    ]
+    for slot in slots:
+        client_cores = set(get_core_of(cpu, siblings) for cpu in slot["client_cpus"])
+        server_cores = set(get_core_of(cpu, siblings) for cpu in slot["server_cpus"])
+        assert not client_cores & server_cores
+    cores = [set(get_core_of(cpu, siblings) for cpu in slot["client_cpus"] + slot["server_cpus"]) for slot in slots]
+    assert not cores[0] & cores[1]
+
+
+def test_allocate_slots_without_smt():
+    siblings = {cpu: [cpu] for cpu in range(8)}
+    slots = local_scheduler.allocate_slots(2, 2, nodes=[(0, list(range(8)))], siblings=siblings)
+    assert [slot["client_cpus"] for slot in slots] == [[0, 1], [4, 5]]
+    assert [slot["server_cpus"] for slot in slots] == [[2, 3], [6, 7]]
+
+
+def test_allocate_slots_not_enough_cores():
+    siblings = {cpu: [cpu % 2, cpu % 2 + 2] for cpu in range(4)}
+    with pytest.raises(Exception):
+        local_scheduler.allocate_slots(2, 1, nodes=[(0, list(range(4)))], siblings=siblings)
@@ -0,0 +1,79 @@
+import threading
+import pytest
+from profiler import ClientProfiler
+
+
+class FakeStub(object):
+    def Search(self, request):
+        return "result of %s" % request
+
+
+class FakeHandler(object):
+    def __init__(self):
+        self._stub = FakeStub()
+
+
+class FakeConnection(object):
+    def __init__(self, handler):
+        self._handler = handler
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        pass
+
+    def client(self):
+        return self._handler
+
+
+class FakeMilvus(object):
+    """
+    A handler per thread, as the SingletonThread pool of pymilvus
+    """
+    def __init__(self):
+        self._local = threading.local()
+        self.fetched = 0
+
+    def _connection(self):
+        self.fetched += 1
+        if not hasattr(self._local, "handler"):
+            self._local.handler = FakeHandler()
+        return FakeConnection(self._local.handler)
+
+    def search(self, request):
+        return self._local.handler._stub.Search(request)
+
+
+def profiled_search(profiler, milvus, request):
+    profiler.attach(milvus)
+    profiler.start("search")
+    try:
+        return milvus.search(request)
+    finally:
+        profiler.end()
+
+
+def test_attach_once_per_thread():
+    milvus = FakeMilvus()
+    profiler = ClientProfiler()
+
+    def run():
+        for i in range(5):
+            assert profiled_search(profiler, milvus, i) == "result of %d" % i
+
+    threads = [threading.Thread(target=run) for i in range(3)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    assert milvus.fetched == 3
+    assert profiler.summary()["search"]["count"] == 15
+
+
+def test_attach_without_stub():
+    milvus = FakeMilvus()
+    milvus._connection()
+    del milvus._local.handler._stub
+    with pytest.raises(Exception):
+        ClientProfiler().attach(milvus)
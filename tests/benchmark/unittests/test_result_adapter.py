@@ -0,0 +1,132 @@
+import struct
+import numpy as np
+import pytest
+import result_adapter
+
+
+def encode_varint(value):
+    value &= (1 << 64) - 1
+    data = bytearray()
+    while True:
+        b = value & 0x7f
+        value >>= 7
+        if value:
+            data.append(b | 0x80)
+        else:
+            data.append(b)
+            return bytes(data)
+
+
+class FakeRepeated(list):
+    def MergeFrom(self, other):
+        self.extend(other)
+
+
+class FakeMessage(object):
+    """
+    Message with one packed repeated field, serialized as protobuf does
+    """
+    field_number = 1
+    field_name = None
+    encode = None
+
+    def __init__(self, values=()):
+        setattr(self, self.field_name, FakeRepeated(values))
+
+    def SerializeToString(self):
+        values = getattr(self, self.field_name)
+        if not values:
+            return b""
+        payload = b"".join(self.encode(v) for v in values)
+        return encode_varint(self.field_number << 3 | 2) + encode_varint(len(payload)) + payload
+
+
+class FakeEntities(FakeMessage):
+    field_name = "ids"
+    encode = staticmethod(encode_varint)
+
+
+class FakeRaw(FakeMessage):
+    field_number = 2
+    field_name = "distances"
+    encode = staticmethod(lambda v: struct.pack("<f", v))
+
+
+class FakeResult(object):
+    def __init__(self, ids, distances, nq):
+        self._raw = FakeRaw(distances)
+        self._raw.entities = FakeEntities(ids)
+        self._entities = self._raw.entities
+        self._nq = nq
+
+    def __len__(self):
+        return self._nq
+
+
+@pytest.mark.parametrize("ids", [[], [0, 1, 127, 128, 300, 2 ** 62 + 3, 2 ** 63 - 1, -1, -2 ** 63]])
+def test_decode_varints(ids):
+    data = b"".join(encode_varint(v) for v in ids)
+    assert result_adapter._decode_varints(data).tolist() == ids
+
+
+def test_decode_varints_invalid():
+    with pytest.raises(Exception):
+        result_adapter._decode_varints(b"\x80\x80")
+
+
+def test_get_result_arrays():
+    ids = [5, 2 ** 62 + 1, -1, 7, 8, 9]
+    distances = [0.5, 1.25, 0.0, 0.1, 0.2, 0.3]
+    res_ids, res_distances = result_adapter.get_result_arrays(FakeResult(ids, distances, 2), top_k=4)
+    assert res_ids.tolist() == [[5, 2 ** 62 + 1, -1, -1], [7, 8, 9, -1]]
+    assert np.allclose(res_distances, [[0.5, 1.25, -1, -1], [0.1, 0.2, 0.3, -1]])
+
+
+def test_get_result_arrays_fallback():
+    # a field which is not packed falls back to the conversion of the values
+    result = FakeResult([1, 2], [0.5, 0.25], 1)
+    result._raw.entities.SerializeToString = lambda: encode_varint(1 << 3) + encode_varint(1)
+    res_ids, res_distances = result_adapter.get_result_arrays(result)
+    assert res_ids.tolist() == [[1, 2]]
+    assert res_distances.tolist() == [[0.5, 0.25]]
+
+
+@pytest.mark.parametrize("base", [0, 2 ** 62, 4 * 10 ** 17])
+def test_get_recall_same_as_sets(base):
+    rng = np.random.RandomState(7)
+    nq, top_k = 50, 10
+    # the ids of a row are unique, as in a search result
+    true_ids = np.array([base + rng.permutation(40)[:top_k] for i in range(nq)], dtype=np.int64)
+    result_ids = np.array([base + rng.permutation(40)[:top_k] for i in range(nq)], dtype=np.int64)
+    expected = result_adapter.get_recall_by_sets(true_ids.tolist(), result_ids.tolist())
+    assert result_adapter.get_recall(true_ids, result_ids) == expected
+
+
+def test_get_recall_no_false_match_across_rows():
+    nq = 5
+    true_ids = np.array([[2 ** 62 + i] for i in range(nq)], dtype=np.int64)
+    result_ids = np.array([[2 ** 62 + (i + 1) % nq] for i in range(nq)], dtype=np.int64)
+    assert result_adapter.get_recall_by_sets(true_ids.tolist(), result_ids.tolist()) == 0.0
+    assert result_adapter.get_recall(true_ids, result_ids) == 0.0
+
+
+def test_get_recall_padding():
+    true_ids = np.array([[1, 2, 3], [4, 5, 6]])
+    result_ids = np.array([[1, 9, -1], [-1, -1, -1]])
+    # the hits of a query are the ids which are not padding, a query without hits counts as 0
+    assert result_adapter.get_recall(true_ids, result_ids) == round((1 / 2 + 0) / 2, 3)
+    assert result_adapter.get_recall_by_sets(true_ids.tolist(), [[1, 9]]) == 0.5
+
+
+def test_get_result_arrays_pymilvus():
+    milvus_pb2 = pytest.importorskip("milvus.grpc_gen.milvus_pb2")
+    from milvus.client.abstract import QueryResult
+    raw = milvus_pb2.QueryResult(row_num=2, distances=[0.5, 0.25, 0.1, -1.0])
+    raw.entities.ids.extend([2 ** 62 + 5, 3, 7, -1])
+    result = QueryResult(raw)
+    assert result_adapter._get_packed_bytes(raw.entities, "ids") is not None
+    ids, distances = result_adapter.get_result_arrays(result)
+    assert ids.tolist() == [[2 ** 62 + 5, 3], [7, -1]]
+    assert distances.tolist() == [[0.5, 0.25], [0.10000000149011612, -1.0]]
+    # the same as the plain conversion of the fields
+    assert ids.ravel().tolist() == list(result._entities.ids)
@@ -0,0 +1,47 @@
+import os
+import ast
+import glob
+import pytest
+import yaml
+
+BENCHMARK_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RUNNER_FILES = ["k8s_runner.py", "local_runner.py"]
+SUITE_FILES = sorted(glob.glob(os.path.join(BENCHMARK_DIR, "suites", "*.yaml")))
+
+
+def parse_runner(file_name):
+    with open(os.path.join(BENCHMARK_DIR, file_name)) as f:
+        return ast.parse(f.read(), filename=file_name)
+
+
+def get_handled_run_types(tree):
+    # the run types compared with run_type in the branches of the runner
+    run_types = set()
+    for node in ast.walk(tree):
+        if isinstance(node, ast.Compare) and isinstance(node.left, ast.Name) and node.left.id == "run_type":
+            for comparator in node.comparators:
+                items = comparator.elts if isinstance(comparator, (ast.List, ast.Tuple)) else [comparator]
+                run_types.update(item.value for item in items if isinstance(item, ast.Constant))
+    return run_types
+
+
+@pytest.mark.parametrize("suite_file", SUITE_FILES, ids=os.path.basename)
+def test_suite_run_types_handled(suite_file):
+    with open(suite_file) as f:
+        suite = yaml.safe_load(f)
+    handled = set()
+    for file_name in RUNNER_FILES:
+        handled |= get_handled_run_types(parse_runner(file_name))
+    for run_type, run_params in suite.items():
+        assert run_type in handled, "%s not handled by the runners" % run_type
+        assert run_params["collections"], "%s has no collections" % run_type
+
+
+@pytest.mark.parametrize("file_name", RUNNER_FILES)
+def test_runner_index_described_with_field(file_name):
+    # describe_index needs the vector field, the runners go through Runner.get_index_info
+    for node in ast.walk(parse_runner(file_name)):
+        if isinstance(node, ast.Call) and isinstance(node.func, ast.Attribute):
+            assert node.func.attr != "describe_index", "%s:%d calls describe_index" % (file_name, node.lineno)
+            if node.func.attr == "get_index_info":
+                assert len(node.args) == 2, "%s:%d get_index_info without field" % (file_name, node.lineno)
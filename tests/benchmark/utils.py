@@ -9,6 +9,7 @@ import argparse
 import threading
 import logging
 import string
+import socket
 import random
 # import multiprocessing
 import numpy as np
@@ -21,6 +22,7 @@ import yaml
 import tableprint as tp
 from pprint import pprint
 from milvus import DataType
+import dataset_store
 
 logger = logging.getLogger("milvus_benchmark.utils")
 
@@ -28,6 +30,8 @@ DEFAULT_F_FIELD_NAME = 'float_vector'
 DEFAULT_B_FIELD_NAME = 'binary_vector'
 DEFAULT_INT_FIELD_NAME = 'int64'
 DEFAULT_FLOAT_FIELD_NAME = 'float'
+# file names in collection stats which are not index files
+RAW_FILE_NAMES = ["", "IDMAP", "FLAT", "_raw", "_blf", "_del"]
 
 METRIC_MAP = {
     "l2": "L2",
@@ -177,6 +181,14 @@ def get_unique_name(prefix=None):
     return prefix + "".join(random.choice(string.ascii_letters + string.digits) for _ in range(8)).lower()
 
 
+def generate_vectors(nb, dimension, seed=None):
+    """
+    Generate random float vectors with numpy, returned as lists for the client
+    """
+    rng = np.random.default_rng(seed)
+    return rng.random((nb, dimension), dtype=np.float32).tolist()
+
+
 def get_current_time():
     return time.strftime('%Y-%m-%d %H:%M:%S', time.localtime())
 
@@ -190,9 +202,189 @@ def print_table(headers, columns, data):
     tp.table(bodys, headers)
 
 
+def get_latency_stats(latencies):
+    """
+    Summarize latencies given in seconds, the returned values are in milliseconds
+    """
+    if not latencies:
+        return {"count": 0, "avg": 0.0, "p50": 0.0, "p90": 0.0, "p99": 0.0, "max": 0.0}
+    values = np.array(latencies, dtype=np.float64) * 1000
+    p50, p90, p99 = np.percentile(values, [50, 90, 99])
+    return {
+        "count": len(values),
+        "avg": round(float(values.mean()), 3),
+        "p50": round(float(p50), 3),
+        "p90": round(float(p90), 3),
+        "p99": round(float(p99), 3),
+        "max": round(float(values.max()), 3)
+    }
+
+
+def get_zipf_indices(n, count, s=1.0, seed=None):
+    """
+    Draw count indices in [0, n), index i is drawn with probability ~ 1 / (i + 1)^s
+    """
+    weights = 1.0 / np.power(np.arange(1, n + 1, dtype=np.float64), s)
+    rng = np.random.default_rng(seed)
+    return rng.choice(n, size=count, p=weights / weights.sum())
+
+
+def get_growth_exponent(sizes, values):
+    """
+    Fit values ~ sizes^k in log-log space and return k, k > 1 means superlinear growth
+    """
+    points = [(s, v) for s, v in zip(sizes, values) if s > 0 and v > 0]
+    if len(points) < 2:
+        return 0.0
+    x = np.log([p[0] for p in points])
+    y = np.log([p[1] for p in points])
+    k, _ = np.polyfit(x, y, 1)
+    return round(float(k), 3)
+
+
+def get_linear_fit(sizes, values):
+    """
+    Fit values ~ a + b * sizes and return (a, b), the fixed cost and the cost of each more unit
+    """
+    points = [(s, v) for s, v in zip(sizes, values)]
+    if len(set(p[0] for p in points)) < 2:
+        return None, None
+    b, a = np.polyfit([p[0] for p in points], [p[1] for p in points], 1)
+    return round(float(a), 3), round(float(b), 4)
+
+
+def get_scaling_stats(cores, throughputs):
+    """
+    Speedup and parallel efficiency of each core count, relative to the smallest one
+    """
+    base = min(range(len(cores)), key=lambda i: cores[i])
+    res = []
+    for core, throughput in zip(cores, throughputs):
+        speedup = throughput / throughputs[base] if throughputs[base] else 0.0
+        efficiency = speedup / (core / cores[base])
+        res.append({"speedup": round(speedup, 3), "efficiency": round(efficiency, 3)})
+    return res
+
+
+MEMORY_UNITS = {
+    "Ki": 1024,
+    "Mi": 1024 ** 2,
+    "Gi": 1024 ** 3,
+    "Ti": 1024 ** 4,
+    "k": 1000,
+    "M": 1000 ** 2,
+    "G": 1000 ** 3,
+    "T": 1000 ** 4
+}
+
+
+def parse_memory_quantity(quantity):
+    """
+    Convert k8s memory quantity like "1024Ki" to bytes
+    """
+    for unit in sorted(MEMORY_UNITS.keys(), key=len, reverse=True):
+        if quantity.endswith(unit):
+            return float(quantity[:-len(unit)]) * MEMORY_UNITS[unit]
+    return float(quantity)
+
+
+def is_segment_indexed(segment, field_name):
+    """
+    Check the files of the segment in collection stats for an index file of the field
+    """
+    if "index_name" in segment:
+        return segment["index_name"] not in RAW_FILE_NAMES
+    for item in segment.get("files", []):
+        if item.get("field") == field_name and item.get("name") not in RAW_FILE_NAMES:
+            return True
+    return False
+
+
+def parse_cpu_quantity(quantity):
+    """
+    Convert k8s cpu quantity like "250m" or "123456789n" to cores
+    """
+    units = {"n": 1e-9, "u": 1e-6, "m": 1e-3}
+    if quantity[-1] in units:
+        return float(quantity[:-1]) * units[quantity[-1]]
+    return float(quantity)
+
+
+def get_process_cpu_time(process_name="milvus_server"):
+    """
+    Sum the user and system cpu time(s) of the local processes with the given name
+    """
+    ticks = os.sysconf("SC_CLK_TCK")
+    cpu_time = 0
+    found = False
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            with open("/proc/%s/comm" % pid) as f:
+                if f.read().strip() != process_name:
+                    continue
+            with open("/proc/%s/stat" % pid) as f:
+                # the fields after the command name, utime and stime are the 12th and 13th of them
+                fields = f.read().rsplit(")", 1)[1].split()
+                cpu_time = cpu_time + int(fields[11]) + int(fields[12])
+                found = True
+        except (IOError, OSError):
+            continue
+    if not found:
+        raise Exception("Process: %s not found" % process_name)
+    return cpu_time / ticks
+
+
+def is_local_host(host):
+    """
+    Check if the host is this machine, so its processes can be read from the local /proc
+    """
+    try:
+        address = socket.gethostbyname(host)
+    except socket.error:
+        return False
+    if address.startswith("127.") or address == "0.0.0.0":
+        return True
+    try:
+        return address in socket.gethostbyname_ex(socket.gethostname())[2]
+    except socket.error:
+        return False
+
+
+def get_process_rss(process_name="milvus_server"):
+    """
+    Sum the rss(MB) of the local processes with the given name
+    """
+    rss = 0.0
+    found = False
+    for pid in os.listdir("/proc"):
+        if not pid.isdigit():
+            continue
+        try:
+            with open("/proc/%s/comm" % pid) as f:
+                if f.read().strip() != process_name:
+                    continue
+            with open("/proc/%s/status" % pid) as f:
+                for line in f:
+                    if line.startswith("VmRSS:"):
+                        # VmRSS:   123456 kB
+                        rss = rss + int(line.split()[1]) / 1024
+                        found = True
+        except (IOError, OSError):
+            continue
+    if not found:
+        raise Exception("Process: %s not found" % process_name)
+    return round(rss, 2)
+
+
 def get_dataset(hdf5_file_path):
     if not os.path.exists(hdf5_file_path):
         raise Exception("%s not existed" % hdf5_file_path)
+    if os.path.isdir(hdf5_file_path):
+        # converted by dataset_store.py, keep the keys of ann-benchmarks hdf5 files
+        store = dataset_store.open_store(hdf5_file_path)
+        return {"train": store, "test": store.get_queries(), "neighbors": store.get_groundtruth()}
     dataset = h5py.File(hdf5_file_path)
     return dataset
 
@@ -0,0 +1,70 @@
+import time
+import logging
+import threading
+
+logger = logging.getLogger("milvus_benchmark.waiter")
+
+DEFAULT_TIMEOUT = 300
+DEFAULT_INTERVAL = 0.1
+DEFAULT_MAX_INTERVAL = 5
+BACKOFF = 1.5
+
+# name -> {"count", "total", "max"} of the waits in this process
+_stats = {}
+_lock = threading.Lock()
+
+
+def wait_for(condition, name, timeout=DEFAULT_TIMEOUT, interval=DEFAULT_INTERVAL, max_interval=DEFAULT_MAX_INTERVAL):
+    '''
+    Poll the condition until it is true, the interval grows by BACKOFF up to max_interval,
+    an exception raised by the condition counts as not ready
+    @params:
+        condition: callable returning True when ready
+        name: what is waited for, the time spent is recorded under it
+    @return:
+        seconds waited
+    '''
+    start_time = time.time()
+    deadline = start_time + timeout
+    error = None
+    while True:
+        try:
+            if condition():
+                break
+            error = None
+        except Exception as e:
+            error = e
+        now = time.time()
+        if now >= deadline:
+            _record(name, now - start_time)
+            raise Exception("Wait for %s timeout after %ss%s" % (
+                name, timeout, ", last error: %s" % str(error) if error else ""))
+        time.sleep(min(interval, deadline - now))
+        interval = min(interval * BACKOFF, max_interval)
+    waited = time.time() - start_time
+    _record(name, waited)
+    logger.debug("Waited %.3fs for %s" % (waited, name))
+    return round(waited, 3)
+
+
+def _record(name, waited):
+    with _lock:
+        stats = _stats.setdefault(name, {"count": 0, "total": 0.0, "max": 0.0})
+        stats["count"] += 1
+        stats["total"] += waited
+        stats["max"] = max(stats["max"], waited)
+
+
+def get_stats():
+    '''
+    @return:
+        {name: {"count", "total", "max"}} of the waits since the last reset, times in seconds
+    '''
+    with _lock:
+        return {name: {"count": s["count"], "total": round(s["total"], 3), "max": round(s["max"], 3)}
+                for name, s in _stats.items()}
+
+
+def reset_stats():
+    with _lock:
+        _stats.clear()
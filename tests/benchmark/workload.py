@@ -0,0 +1,248 @@
+"""
+Phased workload: a run is a list of phases, each with its own duration, load level and operation mix.
+
+    workload:
+      max_workers: 64
+      phases:
+        - {name: ramp, type: ramp, during_time: 2m, users: 32, ops: {search: 9, insert: 1}}
+        - {name: steady, type: steady, during_time: 5m, users: 32}
+        - {name: spike, type: spike, during_time: 30s, users: 128}
+        - {name: after_spike, type: steady, during_time: 3m, users: 32}
+        - {name: drain, type: drain, during_time: 1m}
+
+The level of a phase is either `users`, closed loop clients, or `rate`, requests per second sent
+on schedule whatever the latency. A ramp goes linearly from the level of the previous phase to its
+own, a drain goes down to 0, steady and spike phases hold their level. A phase without `ops` keeps
+the mix of the previous one.
+"""
+import time
+import random
+import logging
+import threading
+from collections import defaultdict
+import numpy as np
+import utils
+import load_generator
+
+logger = logging.getLogger("milvus_benchmark.workload")
+
+PHASE_TYPES = ["ramp", "steady", "spike", "drain"]
+DEFAULT_MAX_WORKERS = 64
+IDLE_INTERVAL = 0.05
+RECOVERY_BUCKET = 1
+RECOVERY_TOLERANCE = 0.2
+RECOVERY_STABLE_BUCKETS = 3
+
+
+def get_phases(workload_config):
+    """
+    Parse the phases and fill the start level, end level and mix of each one
+    """
+    phases = []
+    prev_level = 0
+    prev_ops = None
+    mode = None
+    for i, item in enumerate(workload_config["phases"]):
+        phase_type = item["type"] if "type" in item else "steady"
+        if phase_type not in PHASE_TYPES:
+            raise Exception("Phase type: %s not in %s" % (phase_type, PHASE_TYPES))
+        phase_mode = "rate" if "rate" in item else "users"
+        if phase_type != "drain":
+            if "rate" not in item and "users" not in item:
+                raise Exception("Phase: %s needs users or rate" % item.get("name", i))
+            if mode and phase_mode != mode:
+                raise Exception("Phases mix users and rate")
+            mode = phase_mode
+        ops = item["ops"] if "ops" in item else prev_ops
+        if not ops:
+            raise Exception("Phase: %s has no ops" % item.get("name", i))
+        target = 0 if phase_type == "drain" else item[phase_mode]
+        phase = {
+            "name": item["name"] if "name" in item else "%s_%d" % (phase_type, i),
+            "type": phase_type,
+            "during_time": utils.timestr_to_int(item["during_time"]),
+            "start_level": prev_level if phase_type in ["ramp", "drain"] else target,
+            "end_level": target,
+            "ops": ops
+        }
+        phases.append(phase)
+        prev_level, prev_ops = target, ops
+    for phase in phases:
+        phase["mode"] = mode or "users"
+    return phases
+
+
+def get_level(phase, elapsed):
+    ratio = min(elapsed / phase["during_time"], 1.0) if phase["during_time"] else 1.0
+    return phase["start_level"] + (phase["end_level"] - phase["start_level"]) * ratio
+
+
+class PhasedWorkload(object):
+    """
+    Run the phases in order with a fixed pool of worker threads, each request is recorded with
+    its phase, operation, start time and latency
+    """
+    def __init__(self, operations, phases, max_workers=DEFAULT_MAX_WORKERS, latency_log=None):
+        # operations: dict of operation name -> callable sending one request
+        self._operations = operations
+        # if given, one line per request is appended to this file when the run ends, as run_closed_loop does
+        self._latency_log = latency_log
+        self._phases = phases
+        self._max_workers = max_workers
+        self._lock = threading.Lock()
+        self._stop_event = threading.Event()
+        self._phase_index = 0
+        self._phase_start = None
+        self._next_send = None
+        self._records = []
+        for phase in phases:
+            unknown = set(phase["ops"]) - set(operations)
+            if unknown:
+                raise Exception("Operations: %s not supported" % ",".join(unknown))
+        if phases and phases[0]["mode"] == "users":
+            max_users = max(max(p["start_level"], p["end_level"]) for p in phases)
+            self._max_workers = max(self._max_workers, int(np.ceil(max_users)))
+
+    def _current(self):
+        with self._lock:
+            phase = self._phases[self._phase_index]
+            return self._phase_index, phase, time.time() - self._phase_start
+
+    def _choose(self, phase):
+        names = list(phase["ops"].keys())
+        return random.choices(names, weights=[phase["ops"][name] for name in names])[0]
+
+    def _send(self, worker_idx, phase_index, phase, scheduled=None):
+        name = self._choose(phase)
+        start_time = time.time()
+        ok = True
+        try:
+            self._operations[name]()
+        except Exception as e:
+            ok = False
+            logger.debug(str(e))
+        end_time = time.time()
+        # with a rate, latency counts from the scheduled time, so a late request is not hidden
+        latency = end_time - (scheduled if scheduled is not None else start_time)
+        with self._lock:
+            self._records.append((phase_index, name, start_time, latency, ok, worker_idx))
+
+    def _next_slot(self, phase_index, phase, elapsed):
+        # next send time of the rate schedule, None if the rate is 0 now
+        with self._lock:
+            rate = get_level(phase, elapsed)
+            if rate <= 0:
+                self._next_send = None
+                return None
+            now = time.time()
+            if self._next_send is None or self._next_send < now - 1:
+                # do not send a burst to catch up after an idle or overloaded time
+                self._next_send = now
+            scheduled = self._next_send
+            self._next_send += 1.0 / rate
+            return scheduled
+
+    def _worker(self, worker_idx):
+        while not self._stop_event.is_set():
+            phase_index, phase, elapsed = self._current()
+            if phase["mode"] == "users":
+                if worker_idx < int(round(get_level(phase, elapsed))):
+                    self._send(worker_idx, phase_index, phase)
+                else:
+                    time.sleep(IDLE_INTERVAL)
+            else:
+                scheduled = self._next_slot(phase_index, phase, elapsed)
+                if scheduled is None:
+                    time.sleep(IDLE_INTERVAL)
+                    continue
+                delay = scheduled - time.time()
+                if delay > 0:
+                    time.sleep(delay)
+                self._send(worker_idx, phase_index, phase, scheduled=scheduled)
+
+    def run(self):
+        self._phase_start = time.time()
+        threads = [threading.Thread(target=self._worker, args=(i,), daemon=True) for i in range(self._max_workers)]
+        for t in threads:
+            t.start()
+        for i, phase in enumerate(self._phases):
+            with self._lock:
+                self._phase_index = i
+                self._phase_start = time.time()
+                phase["start_time"] = self._phase_start
+            logger.info("Start phase: %s, %s %s -> %s, during %ds" % (
+                phase["name"], phase["mode"], phase["start_level"], phase["end_level"], phase["during_time"]))
+            time.sleep(phase["during_time"])
+        self._stop_event.set()
+        for t in threads:
+            t.join()
+        if self._latency_log:
+            load_generator.write_latency_log(self._latency_log, [
+                {"ts": r[2], "worker": r[5], "latency_ms": round(r[3] * 1000, 3), "ok": r[4],
+                 "phase": self._phases[r[0]]["name"], "op": r[1]} for r in self._records])
+        return self.get_stats()
+
+    def get_stats(self):
+        '''
+        @return:
+            list of the stats of each phase: qps, errors, latency(ms) of all and of each operation,
+            and the recovery time(s) of the phases after a spike
+        '''
+        by_phase = defaultdict(list)
+        for record in self._records:
+            by_phase[record[0]].append(record)
+        res = []
+        for i, phase in enumerate(self._phases):
+            records = by_phase[i]
+            latencies = [r[3] for r in records if r[4]]
+            stats = utils.get_latency_stats(latencies)
+            stats.update({
+                "phase": phase["name"],
+                "type": phase["type"],
+                "during_time": phase["during_time"],
+                "qps": round(len(latencies) / phase["during_time"], 2) if phase["during_time"] else 0.0,
+                "errors": sum(1 for r in records if not r[4]),
+                "ops": {}
+            })
+            for name in phase["ops"]:
+                op_latencies = [r[3] for r in records if r[1] == name and r[4]]
+                op_stats = utils.get_latency_stats(op_latencies)
+                op_stats["errors"] = sum(1 for r in records if r[1] == name and not r[4])
+                stats["ops"][name] = op_stats
+            res.append(stats)
+        for i, phase in enumerate(self._phases):
+            if phase["type"] == "spike" and i + 1 < len(self._phases):
+                baseline = self._get_baseline(res, i)
+                res[i + 1]["recovery_time"] = self.get_recovery_time(by_phase[i + 1], self._phases[i + 1], baseline)
+        return res
+
+    def _get_baseline(self, res, spike_index):
+        # p99 of the last steady phase before the spike
+        for j in range(spike_index - 1, -1, -1):
+            if self._phases[j]["type"] == "steady" and res[j]["count"]:
+                return res[j]["p99"]
+        return None
+
+    def get_recovery_time(self, records, phase, baseline):
+        """
+        Seconds from the start of the phase until the p99 of RECOVERY_STABLE_BUCKETS buckets in a row
+        is back within RECOVERY_TOLERANCE of the baseline, None if it does not recover in the phase
+        """
+        if baseline is None or not records:
+            return None
+        limit = baseline * (1 + RECOVERY_TOLERANCE)
+        buckets = defaultdict(list)
+        for r in records:
+            if r[4]:
+                buckets[int((r[2] - phase["start_time"]) // RECOVERY_BUCKET)].append(r[3])
+        bucket_num = int(phase["during_time"] // RECOVERY_BUCKET)
+        stable = 0
+        for b in range(bucket_num):
+            p99 = utils.get_latency_stats(buckets[b])["p99"] if buckets[b] else None
+            if p99 is not None and p99 <= limit:
+                stable += 1
+                if stable >= RECOVERY_STABLE_BUCKETS:
+                    return (b - RECOVERY_STABLE_BUCKETS + 1) * RECOVERY_BUCKET
+            else:
+                stable = 0
+        return None